@@ -0,0 +1,295 @@
+"""Benchmark harness: ``python -m benchmarks.harness [--quick] [--baseline FILE]``.
+
+Measures CLI cold-start cost (``python -X importtime``), end-to-end ``run``
+latency (with per-stage times from ``--trace``), patch-application
+throughput, guard validation throughput on large diffs and receipts HTML
+rendering time and memory. Results are written as JSON; with
+``--baseline`` they are compared against an earlier result and the exit code
+is 1 if any metric regressed by more than ``--threshold``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from mechanic import trace
+from mechanic.guards import validate_patch
+from mechanic.patches import apply_patches
+from mechanic.receipts import ReceiptRun, list_runs
+from mechanic.tools.shell import run as shell_run
+from mechanic.ui.receipts_html import build_html
+
+from .synth import SynthSpec, generate, make_diffs, make_module
+
+RESULTS_DIR = Path(__file__).parent / "results"
+DEFAULT_THRESHOLD = 0.25
+
+# Workload sizes per profile; ``repeat`` is the number of timed repetitions (median kept).
+PROFILES: dict[str, dict[str, Any]] = {
+    "quick": {
+        "synth": SynthSpec(modules=5, tests=20, bugs=3),
+        "patches": 20,
+        "patch_lines": 10,
+        "guard_lines": 5_000,
+        "render_events": 200,
+        "render_patches": 20,
+        "repeat": 3,
+    },
+    "full": {
+        "synth": SynthSpec(modules=50, functions=8, tests=400, bugs=20),
+        "patches": 200,
+        "patch_lines": 20,
+        "guard_lines": 50_000,
+        "render_events": 5_000,
+        "render_patches": 200,
+        "repeat": 5,
+    },
+}
+
+
+# Import-time budget (ms) for modules ``mechanic.cli`` loads beyond ``typer``; enforced by
+# tests/test_startup.py so shell hooks invoking the CLI stay fast.
+STARTUP_BUDGET_MS = 25.0
+
+
+def _metric(value: float, unit: str, better: str = "lower") -> dict[str, Any]:
+    return {"value": round(value, 6), "unit": unit, "better": better}
+
+
+def _median(fn: Callable[[], Any], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+@contextlib.contextmanager
+def _chdir(path: Path) -> Iterator[None]:
+    old = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+
+def importtime(
+    module: str = "mechanic.cli", env: dict[str, str] | None = None
+) -> dict[str, tuple[int, int]]:
+    """(self, cumulative) import time in microseconds per module for a cold ``import module``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) == 3 and parts[0].strip().isdigit():
+            times[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+    return times
+
+
+def cli_import_ms(env: dict[str, str] | None = None) -> tuple[float, float]:
+    """(whole ``mechanic.cli`` import, modules ``import typer`` alone does not load) in ms."""
+    base = importtime("typer", env)
+    times = importtime("mechanic.cli", env)
+    own = sum(own for name, (own, _) in times.items() if name not in base)
+    return times["mechanic.cli"][1] / 1000, own / 1000
+
+
+def bench_startup(repeat: int) -> dict[str, dict[str, Any]]:
+    """Cold ``import mechanic.cli`` (median over ``repeat`` interpreters) and ``--help`` wall."""
+    importtime("mechanic.cli")  # compile bytecode outside the measurement
+    runs = [cli_import_ms() for _ in range(repeat)]
+    help_cmd = [sys.executable, "-m", "mechanic.cli", "--help"]
+    secs = _median(lambda: subprocess.run(help_cmd, capture_output=True, check=True), repeat)
+    return {
+        "startup.import": _metric(statistics.median(r[0] for r in runs), "ms"),
+        "startup.import_own": _metric(statistics.median(r[1] for r in runs), "ms"),
+        "startup.help": _metric(secs, "s"),
+    }
+
+
+def bench_e2e(ws: Path, spec: SynthSpec) -> dict[str, dict[str, Any]]:
+    """``repo-mechanic run --fix-tests --trace`` on a fresh synthetic repo (dry run)."""
+    repo = generate(ws / "fixtures" / "synth", spec)
+    cmd = [sys.executable, "-m", "mechanic.cli", "run", str(repo.root), "--fix-tests", "--trace"]
+    res = shell_run(cmd, cwd=ws)
+    if res.get("code") != 0:
+        raise RuntimeError(f"run failed: {res.get('err') or res.get('out')}")
+    out = {"e2e.wall": _metric(float(res["duration"]), "s")}
+    if res.get("peak_rss"):
+        out["e2e.peak_rss"] = _metric(int(res["peak_rss"]) / 2**20, "MiB")
+    run_dir = list_runs(ws / "receipts")[-1]
+    with (run_dir / "steps.jsonl").open(encoding="utf-8") as f:
+        spans = trace.spans_from_events(json.loads(line) for line in f if line.strip())
+    for row in trace.summarize(spans):
+        if row["cat"] in ("stage", "tool") and not row["name"].startswith("candidate "):
+            out[f"e2e.{row['cat']}.{row['name']}"] = _metric(row["wall"], "s")
+    return out
+
+
+def bench_patches(ws: Path, count: int, lines: int, repeat: int) -> dict[str, dict[str, Any]]:
+    """Dry-run ``apply_patches`` of ``count`` disjoint ``lines``-line diffs as one plan."""
+    rel = "src/bench_patch.py"
+    make_module(ws / rel, count * (lines + 8))
+    diffs = make_diffs(ws / rel, rel, count, lines)
+    with _chdir(ws):
+        results = apply_patches(diffs, root=ws, dry_run=True)
+        if not all(r.ok for r in results):
+            raise RuntimeError(f"benchmark diffs did not apply: {results[0].reasons}")
+        secs = _median(lambda: apply_patches(diffs, root=ws, dry_run=True), repeat)
+    return {
+        "patch.apply": _metric(count / secs, "patches/s", "higher"),
+        "patch.lines": _metric(count * lines / secs, "lines/s", "higher"),
+    }
+
+
+def bench_guards(ws: Path, lines: int, repeat: int) -> dict[str, dict[str, Any]]:
+    """``validate_patch`` on one large diff text (parsed from scratch each time)."""
+    rel = "src/bench_guard.py"
+    make_module(ws / rel, lines + 8)
+    (diff,) = make_diffs(ws / rel, rel, 1, lines)
+    secs = _median(lambda: validate_patch(diff), repeat)
+    return {"guard.validate": _metric(len(diff.encode()) / secs / 2**20, "MiB/s", "higher")}
+
+
+def bench_render(
+    ws: Path, events: int, patches: int, repeat: int, lines: int = 20
+) -> dict[str, dict[str, Any]]:
+    """Write a synthetic receipts run and time/measure a cold ``build_html``."""
+    rel = "src/bench_render.py"
+    make_module(ws / rel, patches * (lines + 8))
+    diffs = make_diffs(ws / rel, rel, patches, lines)
+    with _chdir(ws):
+        run = ReceiptRun.start_run(meta={"path": str(ws), "benchmark": True}, durability="none")
+        for n in range(events):
+            run.log_event({"type": "pytest", "phase": "before", "code": 1, "counts": {"passed": n}})
+        for i, diff in enumerate(diffs):
+            run.log_event({"type": "patch", "index": i, "ok": True, "files": [rel], "diff": diff})
+        run.write_summary("Benchmark", [f"{events} events", f"{patches} patches"])
+        run.close()
+    run_dir = ws / run.run_dir
+
+    def cold() -> None:
+        (run_dir / ".summary.html.key").unlink(missing_ok=True)
+        build_html(run_dir)
+
+    secs = _median(cold, repeat)
+    tracemalloc.start()
+    cold()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "render.wall": _metric(secs, "s"),
+        "render.peak_mem": _metric(peak / 2**20, "MiB"),
+    }
+
+
+def run_suite(profile: str = "quick", only: set[str] | None = None) -> dict[str, Any]:
+    p = PROFILES[profile]
+    metrics: dict[str, dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="mechanic-bench-") as tmp:
+        ws = Path(tmp)
+        benches: dict[str, Callable[[], dict[str, dict[str, Any]]]] = {
+            "startup": lambda: bench_startup(p["repeat"]),
+            "e2e": lambda: bench_e2e(ws / "e2e", p["synth"]),
+            "patch": lambda: bench_patches(
+                ws / "patch", p["patches"], p["patch_lines"], p["repeat"]
+            ),
+            "guard": lambda: bench_guards(ws / "guard", p["guard_lines"], p["repeat"]),
+            "render": lambda: bench_render(
+                ws / "render", p["render_events"], p["render_patches"], p["repeat"]
+            ),
+        }
+        for name, bench in benches.items():
+            if only and name not in only:
+                continue
+            (ws / name).mkdir()
+            metrics.update(bench())
+    return {
+        "meta": {
+            "profile": profile,
+            "timestamp": datetime.now(UTC).replace(tzinfo=None).isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "metrics": metrics,
+    }
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float = DEFAULT_THRESHOLD
+) -> list[dict[str, Any]]:
+    """One row per metric present in both results; ``regressed`` marks slowdowns."""
+    rows = []
+    base = baseline.get("metrics", {})
+    for name, cur in sorted(current.get("metrics", {}).items()):
+        old = base.get(name)
+        if not old or not old.get("value"):
+            continue
+        ratio = cur["value"] / old["value"]
+        worse = ratio - 1 if cur.get("better", "lower") == "lower" else 1 - ratio
+        rows.append(
+            {
+                "metric": name,
+                "baseline": old["value"],
+                "current": cur["value"],
+                "unit": cur.get("unit", ""),
+                "change": round(ratio - 1, 4),
+                "regressed": worse > threshold,
+            }
+        )
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--quick", action="store_const", const="quick", dest="profile")
+    parser.add_argument(
+        "--only", action="append", choices=["startup", "e2e", "patch", "guard", "render"]
+    )
+    parser.add_argument("--out", type=Path, help="result file (default: benchmarks/results/)")
+    parser.add_argument("--baseline", type=Path, help="earlier result to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    result = run_suite(args.profile, set(args.only or []))
+    out = args.out or RESULTS_DIR / f"{args.profile}-{result['meta']['timestamp'][:19]}.json"
+    out = out.with_name(out.name.replace(":", ""))
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    for name, m in sorted(result["metrics"].items()):
+        print(f"{name:40} {m['value']:>14.4f} {m['unit']}")
+    print(f"Results: {out}")
+    if args.baseline is None:
+        return 0
+    rows = compare(result, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+    for r in rows:
+        flag = "REGRESSED" if r["regressed"] else ""
+        print(f"{r['metric']:40} {r['change']:+8.1%} {flag}")
+    return 1 if any(r["regressed"] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
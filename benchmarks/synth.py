@@ -0,0 +1,182 @@
+"""Synthetic broken repositories for benchmarking.
+
+``generate`` writes a small package (``pkg/mod_<i>.py``) with a pytest suite
+and injects bugs of the kinds ``mechanic.failure_classifier`` recognizes.
+With ``fixable=True`` it also adds the broken-calculator pattern the planner
+knows how to patch, so end-to-end runs exercise evaluation and patching.
+``make_diffs`` builds large non-overlapping diffs against a generated module.
+"""
+
+from __future__ import annotations
+
+import difflib
+import random
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+# Bug bodies per failure_classifier category; ``{op}`` is the function's correct expression.
+BUG_KINDS: dict[str, str] = {
+    "ZeroDivision": "return ({op}) / (b - b)",
+    "ImportError": "from .missing_module import helper\n    return helper({op})",
+    "NameError": "return undefined_name + ({op})",
+    "AttributeError": "return a.no_such_attribute + ({op})",
+    "Assertion": "return ({op}) + 1",
+}
+
+_CONFTEST = """import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+"""
+
+_CALC = """def add(a, b):
+    return a + b
+
+
+def sub(a, b):
+    return a + b
+
+
+def mul(a, b):
+    return a * b
+
+
+def div(a, b):
+    return a * b
+"""
+
+_CALC_TESTS = """import pytest
+
+from calc import add, div, mul, sub
+
+
+def test_add():
+    assert add(2, 3) == 5
+
+
+def test_sub():
+    assert sub(5, 2) == 3
+
+
+def test_mul():
+    assert mul(3, 4) == 12
+
+
+def test_div():
+    with pytest.raises(ZeroDivisionError):
+        div(1, 0)
+"""
+
+
+@dataclass
+class SynthSpec:
+    modules: int = 10
+    functions: int = 5  # per module
+    tests: int = 50  # spread over the modules' functions
+    bugs: int = 5
+    kinds: tuple[str, ...] = tuple(BUG_KINDS)
+    fixable: bool = True
+    seed: int = 0
+
+
+@dataclass
+class SynthRepo:
+    root: Path
+    spec: SynthSpec
+    bugs: list[dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"root": str(self.root), "spec": asdict(self.spec), "bugs": self.bugs}
+
+
+def _op(i: int, j: int) -> str:
+    return f"a * {j + 1} + b - {i % 7}"
+
+
+def generate(root: Path, spec: SynthSpec | None = None) -> SynthRepo:
+    """Write a synthetic repo under ``root`` and return its bug manifest."""
+    spec = spec or SynthSpec()
+    unknown = set(spec.kinds) - set(BUG_KINDS)
+    if unknown:
+        raise ValueError(f"unknown bug kinds: {', '.join(sorted(unknown))}")
+    rng = random.Random(spec.seed)
+    funcs = [(i, j) for i in range(spec.modules) for j in range(spec.functions)]
+    buggy = dict(
+        zip(
+            rng.sample(funcs, min(spec.bugs, len(funcs))),
+            (spec.kinds[k % len(spec.kinds)] for k in range(spec.bugs)),
+            strict=False,
+        )
+    )
+    repo = SynthRepo(root=root, spec=spec)
+
+    (root / "pkg").mkdir(parents=True, exist_ok=True)
+    (root / "tests").mkdir(exist_ok=True)
+    (root / "pkg" / "__init__.py").write_text("", encoding="utf-8")
+    (root / "tests" / "conftest.py").write_text(_CONFTEST, encoding="utf-8")
+    for i in range(spec.modules):
+        body = []
+        for j in range(spec.functions):
+            kind = buggy.get((i, j))
+            stmt = BUG_KINDS[kind] if kind else "return {op}"
+            body.append(f"def f_{i}_{j}(a, b):\n    {stmt.format(op=_op(i, j))}\n")
+            if kind:
+                repo.bugs.append(
+                    {"module": f"pkg/mod_{i}.py", "function": f"f_{i}_{j}", "kind": kind}
+                )
+        (root / "pkg" / f"mod_{i}.py").write_text("\n\n".join(body), encoding="utf-8")
+
+    # Tests cycle through the functions so every bug has at least one failing test.
+    per_module: dict[int, list[str]] = {}
+    order = sorted(funcs, key=lambda f: (f not in buggy, f))
+    for t in range(spec.tests):
+        i, j = order[t % len(order)]
+        a, b = 3 + t % 5, 2 + t % 3
+        expected = eval(_op(i, j), {"a": a, "b": b})  # noqa: S307 - generated arithmetic
+        per_module.setdefault(i, []).append(
+            f"def test_f_{i}_{j}_{t}():\n    assert mod_{i}.f_{i}_{j}({a}, {b}) == {expected}\n"
+        )
+    for i, tests in per_module.items():
+        header = f"from pkg import mod_{i}\n\n\n"
+        (root / "tests" / f"test_mod_{i}.py").write_text(
+            header + "\n\n".join(tests), encoding="utf-8"
+        )
+
+    if spec.fixable:
+        (root / "calc").mkdir(exist_ok=True)
+        (root / "calc" / "__init__.py").write_text(_CALC, encoding="utf-8")
+        (root / "tests" / "test_calc.py").write_text(_CALC_TESTS, encoding="utf-8")
+        repo.bugs += [
+            {"module": "calc/__init__.py", "function": "sub", "kind": "Assertion"},
+            {"module": "calc/__init__.py", "function": "div", "kind": "Assertion"},
+        ]
+    return repo
+
+
+def make_module(path: Path, lines: int) -> None:
+    """A plain module of ``lines`` assignment lines, used as a patch target."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(f"value_{n} = {n}\n" for n in range(lines)), encoding="utf-8")
+
+
+def make_diffs(path: Path, rel: str, count: int, lines: int) -> list[str]:
+    """``count`` unified diffs against ``path``, each rewriting its own ``lines``-line block.
+
+    Blocks are disjoint and separated by untouched context, so the whole set
+    applies as one plan. ``rel`` is the path the diffs name (cwd-relative).
+    """
+    src = path.read_text(encoding="utf-8").splitlines()
+    stride = lines + 8
+    if count * stride > len(src):
+        raise ValueError(f"{path} has {len(src)} lines; need {count * stride}")
+    diffs = []
+    for k in range(count):
+        new = list(src)
+        for n in range(k * stride, k * stride + lines):
+            new[n] = new[n].replace(" = ", " = -")
+        diff = difflib.unified_diff(src, new, f"a/{rel}", f"b/{rel}", lineterm="")
+        diffs.append("\n".join(diff) + "\n")
+    return diffs
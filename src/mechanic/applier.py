@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+from .diffmodel import FilePatch, ParsedPatch, parse_patch
+from .sandbox import Sandbox
+
+DEFAULT_FUZZ = 2
+
+
+class PatchApplyError(Exception):
+    pass
+
+
+def _norm(line: str) -> str:
+    # Only trailing whitespace is insignificant: indentation decides where added lines belong.
+    return line.rstrip()
+
+
+def _trimmed(body: list[str], fuzz: int) -> tuple[list[str], int]:
+    """Hunk body with up to ``fuzz`` leading/trailing context lines dropped."""
+    lead = 0
+    while lead < fuzz and lead < len(body) and body[lead][:1] == " ":
+        lead += 1
+    trail = 0
+    while trail < fuzz and trail < len(body) - lead and body[len(body) - 1 - trail][:1] == " ":
+        trail += 1
+    return body[lead : len(body) - trail], lead
+
+
+class _Target:
+    """Source lines of one file plus a line-hash index used to locate hunks."""
+
+    def __init__(self, lines: list[str]) -> None:
+        self.lines = lines
+        self.index: dict[str, list[int]] = {}
+        self.norm_index: dict[str, list[int]] = {}
+        for n, line in enumerate(lines):
+            self.index.setdefault(line, []).append(n)
+            self.norm_index.setdefault(_norm(line), []).append(n)
+
+    def matches(self, pos: int, old: list[str], loose: bool) -> bool:
+        if pos < 0 or pos + len(old) > len(self.lines):
+            return False
+        if loose:
+            return all(_norm(self.lines[pos + k]) == _norm(o) for k, o in enumerate(old))
+        return self.lines[pos : pos + len(old)] == old
+
+    def find(self, old: list[str], expected: int, lo: int) -> tuple[int, bool] | None:
+        """Closest position >= ``lo`` to ``expected`` where ``old`` matches."""
+        if not old:
+            return max(lo, min(expected, len(self.lines))), False
+        for loose in (False, True):
+            anchor = _norm(old[0]) if loose else old[0]
+            candidates = (self.norm_index if loose else self.index).get(anchor, [])
+            for pos in sorted((p for p in candidates if p >= lo), key=lambda p: abs(p - expected)):
+                if self.matches(pos, old, loose):
+                    return pos, loose
+        return None
+
+
+def apply_hunks(source: list[str], fp: FilePatch, fuzz: int = DEFAULT_FUZZ) -> list[str]:
+    """Apply ``fp``'s hunks to ``source`` lines and return the new lines.
+
+    Hunks are located by offset search from their stated position, then with
+    trailing whitespace ignored, then by dropping up to ``fuzz`` context
+    lines at either end. Context lines keep the file's own text.
+    """
+    target = _Target(source)
+    out: list[str] = []
+    cursor = 0
+    offset = 0
+    for n, hunk in enumerate(fp.hunks, start=1):
+        lines = hunk.lines
+        for f in range(fuzz + 1):
+            body, lead = _trimmed(lines, f)
+            old = [ln[1:] for ln in body if ln[:1] in " -"]
+            # A zero-length old range means "insert after line old_start".
+            base = (hunk.old_start if hunk.old_len == 0 else max(hunk.old_start - 1, 0)) + lead
+            found = target.find(old, base + offset, cursor)
+            if found is not None:
+                break
+        else:
+            raise PatchApplyError(f"{fp.path}: hunk #{n} does not apply")
+        pos, _ = found
+        out.extend(source[cursor:pos])
+        k = pos
+        for ln in body:
+            tag, text = ln[:1], ln[1:]
+            if tag == " ":
+                out.append(source[k])
+                k += 1
+            elif tag == "-":
+                k += 1
+            else:
+                out.append(text)
+        cursor = k
+        offset = pos - base
+    out.extend(source[cursor:])
+    return out
+
+
+def _split(text: str) -> tuple[list[str], str, bool]:
+    """Split file text into lines, its newline style and whether it ends with one."""
+    newline = "\r\n" if "\r\n" in text[: text.find("\n") + 1] else "\n"
+    if not text:
+        return [], newline, True
+    ends = text.endswith("\n")
+    body = text[:-1] if ends else text
+    lines = [ln[:-1] if ln.endswith("\r") else ln for ln in body.split("\n")]
+    return lines, newline, ends
+
+
+def apply_to_text(text: str | None, fp: FilePatch, fuzz: int = DEFAULT_FUZZ) -> str | None:
+    """Apply one file's hunks to its text; None means the file does not exist / is deleted."""
+    if fp.old_path is None and text:
+        raise PatchApplyError(f"{fp.path}: file to be created already exists")
+    if fp.old_path is not None and text is None:
+        raise PatchApplyError(f"{fp.path}: file not found")
+    source, newline, eol = _split(text or "")
+    new = apply_hunks(source, fp, fuzz=fuzz)
+    if fp.new_path is None:
+        if new:
+            raise PatchApplyError(f"{fp.path}: file to be deleted does not match patch")
+        return None
+    last = fp.hunks[-1] if fp.hunks else None
+    if last is not None:
+        end = last.old_start - 1 + last.old_len if last.old_len else last.old_start
+        if end >= len(source):
+            eol = last.new_eof_newline  # the last hunk decides how the file ends
+    if not new:
+        return ""
+    return newline.join(new) + (newline if eol else "")
+
+
+def atomic_write(path: Path, data: str) -> None:
+    """Write ``data`` via a temp file in the same directory and an atomic rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", errors="surrogateescape", newline="") as f:
+            f.write(data)
+        if path.exists():
+            os.chmod(tmp, path.stat().st_mode & 0o7777)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def read_text(path: Path) -> str | None:
+    try:
+        return path.read_bytes().decode("utf-8", errors="surrogateescape")
+    except FileNotFoundError:
+        return None
+
+
+def changed_spans(fp: FilePatch) -> list[tuple[int, int]]:
+    """Old-file ranges each hunk modifies, ignoring context lines.
+
+    Positions are doubled so that a removed line ``n`` is ``2n`` and an
+    insertion just before line ``n`` is ``2n - 1``; two spans conflict when
+    they intersect.
+    """
+    spans: list[tuple[int, int]] = []
+    for hunk in fp.hunks:
+        line = hunk.old_start if hunk.old_len else hunk.old_start + 1
+        marks: list[int] = []
+        for ln in hunk.lines:
+            tag = ln[:1]
+            if tag == "-":
+                marks.append(2 * line)
+                line += 1
+            elif tag == "+":
+                marks.append(2 * line - 1)
+            else:
+                line += 1
+        if marks:
+            spans.append((min(marks), max(marks)))
+    return spans
+
+
+class Transaction:
+    """In-memory view of files under ``root`` that patches are applied to.
+
+    Files are read from disk at most once. ``apply`` is all-or-nothing per
+    call; ``commit`` writes every changed file and restores the originals if
+    any write fails.
+    """
+
+    def __init__(self, root: str | Path = ".") -> None:
+        self.box = Sandbox.from_path(root)
+        self._orig: dict[str, tuple[Path, str | None]] = {}
+        self._view: dict[str, str | None] = {}
+
+    def _load(self, rel: str) -> None:
+        if rel in self._orig:
+            return
+        try:
+            path = self.box.within(rel)
+        except PermissionError as e:
+            raise PatchApplyError(f"{rel}: {e}") from e
+        text = read_text(path)
+        self._orig[rel] = (path, text)
+        self._view[rel] = text
+
+    def read(self, rel: str) -> str | None:
+        self._load(rel)
+        return self._view[rel]
+
+    def apply(self, patches: list[FilePatch], fuzz: int = DEFAULT_FUZZ) -> list[str]:
+        if not patches:
+            raise PatchApplyError("no file patches found in diff")
+        staged: dict[str, str | None] = {}
+        for fp in patches:
+            current = staged[fp.path] if fp.path in staged else self.read(fp.path)
+            staged[fp.path] = apply_to_text(current, fp, fuzz=fuzz)
+        self._view.update(staged)
+        return sorted(staged)
+
+    def changed(self) -> list[str]:
+        return sorted(rel for rel, text in self._view.items() if text != self._orig[rel][1])
+
+    def commit(self) -> list[str]:
+        written: list[str] = []
+        try:
+            for rel in self.changed():
+                path, text = self._orig[rel][0], self._view[rel]
+                if text is None:
+                    path.unlink(missing_ok=True)
+                else:
+                    atomic_write(path, text)
+                written.append(rel)
+        except OSError:
+            for rel in written:
+                path, text = self._orig[rel]
+                try:
+                    if text is None:
+                        path.unlink(missing_ok=True)
+                    else:
+                        atomic_write(path, text)
+                except OSError:
+                    pass
+            raise
+        return written
+
+
+def apply_unified_diff(
+    diff: str | ParsedPatch, root: str | Path = ".", fuzz: int = DEFAULT_FUZZ, dry_run: bool = False
+) -> list[str]:
+    """Apply ``diff`` under ``root`` in-process and return the touched paths.
+
+    Every file is patched in memory first; nothing is written unless all
+    hunks of all files apply. With ``dry_run`` the check is done without
+    writing.
+    """
+    tx = Transaction(root)
+    touched = tx.apply(parse_patch(diff).files, fuzz=fuzz)
+    if not dry_run:
+        tx.commit()
+    return touched
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any
+
+INLINE_LIMIT = 2048  # characters; longer strings in events become artifacts
+EXCERPT = 240
+
+Ref = dict[str, Any]
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and "artifact" in value and "size" in value
+
+
+class ArtifactStore:
+    """Content-addressed gzip blobs shared by all runs under one receipts root.
+
+    Blobs live once in ``<receipts>/.artifacts/<sha>.gz`` and are hardlinked
+    (or copied) into each run's ``artifacts/`` directory, so identical
+    outputs and diffs are stored only once on disk.
+    """
+
+    def __init__(self, run_dir: Path, shared: Path | None = None) -> None:
+        self.run_dir = run_dir
+        self.dir = run_dir / "artifacts"
+        self.shared = shared if shared is not None else run_dir.parent / ".artifacts"
+
+    def put(self, data: str) -> Ref:
+        raw = data.encode("utf-8", errors="surrogateescape")
+        sha = hashlib.sha256(raw).hexdigest()
+        blob = self.shared / f"{sha}.gz"
+        if not blob.exists():
+            self.shared.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=f".{sha}.", dir=self.shared)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(gzip.compress(raw, mtime=0))
+                os.replace(tmp, blob)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+        local = self.dir / blob.name
+        if not local.exists():
+            self.dir.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(blob, local)
+            except FileExistsError:
+                pass
+            except OSError:
+                shutil.copyfile(blob, local)
+        ref: Ref = {"artifact": sha, "size": len(data), "head": data[:EXCERPT]}
+        if len(data) > EXCERPT:
+            ref["tail"] = data[-EXCERPT:]
+        return ref
+
+    def compact(self, value: Any, limit: int = INLINE_LIMIT) -> Any:
+        """``value`` with every string longer than ``limit`` replaced by a ref."""
+        if isinstance(value, str):
+            return self.put(value) if len(value) > limit else value
+        if isinstance(value, dict):
+            return {k: self.compact(v, limit) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.compact(v, limit) for v in value]
+        return value
+
+
+def load(run_dir: Path, value: Any) -> Any:
+    """Resolve an artifact ref read from ``run_dir``'s receipts; other values pass through."""
+    if not is_ref(value):
+        return value
+    name = f"{value['artifact']}.gz"
+    for path in (run_dir / "artifacts" / name, run_dir.parent / ".artifacts" / name):
+        try:
+            return gzip.decompress(path.read_bytes()).decode("utf-8", errors="surrogateescape")
+        except FileNotFoundError:
+            continue
+    head, tail = value.get("head", ""), value.get("tail", "")
+    return f"{head}\n… [artifact {value['artifact'][:12]} missing] …\n{tail}"
+
+
+def size(value: Any) -> int:
+    return int(value["size"]) if is_ref(value) else len(value or "")
@@ -0,0 +1,410 @@
+from __future__ import annotations
+
+import contextlib
+import glob
+import json
+import multiprocessing as mp
+import os
+import secrets
+import signal
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from multiprocessing.connection import Connection, wait
+from pathlib import Path
+from typing import Any
+
+SWEEPS_DIR = ".sweeps"  # under the receipts root; dot-dirs are not listed as runs
+KILL_GRACE = 5.0
+
+
+@dataclass
+class SweepOptions:
+    """``run`` options applied to every target of a sweep."""
+
+    fix_tests: bool = False
+    lint: bool = False
+    dry_run: bool = True
+    max_steps: int = 10
+    full_verify: bool = False
+    evaluate: bool = True
+    scratch: bool = False
+    with_trace: bool = False
+    lint_cache: bool = True
+    format_patched: bool = False
+    shards: int = 1
+
+
+@dataclass
+class TargetResult:
+    target: str
+    status: str  # done, failed (run raised or exited non-zero), timeout, crashed
+    run_dir: str | None = None
+    duration: float = 0.0
+    failures_before: int | None = None
+    failures_after: int | None = None
+    error: str | None = None
+    log: str | None = None
+
+
+@dataclass
+class Sweep:
+    """State of a ``run-many`` sweep, kept in ``<receipts>/.sweeps/<id>/``.
+
+    ``sweep.json`` holds the targets and options; ``results.jsonl`` gets one
+    line per finished target, appended as it finishes, so an interrupted
+    sweep can be resumed by skipping targets already recorded there.
+    """
+
+    id: str
+    dir: Path
+    targets: list[str]
+    options: SweepOptions
+    receipts_root: str = "receipts"
+    timeout: float | None = None
+    results: dict[str, TargetResult] = field(default_factory=dict)
+
+    @classmethod
+    def create(
+        cls,
+        targets: list[str],
+        options: SweepOptions,
+        receipts_root: str = "receipts",
+        timeout: float | None = None,
+    ) -> Sweep:
+        stamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        sweep_id = f"{stamp}-{secrets.token_hex(3)}"
+        sweep = cls(sweep_id, Path(receipts_root) / SWEEPS_DIR / sweep_id, targets, options)
+        sweep.receipts_root, sweep.timeout = receipts_root, timeout
+        sweep.dir.mkdir(parents=True)
+        (sweep.dir / "logs").mkdir()
+        meta = {
+            "id": sweep_id,
+            "targets": targets,
+            "options": asdict(options),
+            "receipts_root": receipts_root,
+            "timeout": timeout,
+        }
+        (sweep.dir / "sweep.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        return sweep
+
+    @classmethod
+    def load(cls, sweep_id: str, receipts_root: str = "receipts") -> Sweep:
+        sweep_dir = Path(receipts_root) / SWEEPS_DIR / sweep_id
+        meta = json.loads((sweep_dir / "sweep.json").read_text(encoding="utf-8"))
+        sweep = cls(
+            sweep_id,
+            sweep_dir,
+            meta["targets"],
+            SweepOptions(**meta["options"]),
+            meta.get("receipts_root", receipts_root),
+            meta.get("timeout"),
+        )
+        results = sweep_dir / "results.jsonl"
+        if results.exists():
+            for line in results.read_text(encoding="utf-8").splitlines():
+                try:
+                    r = TargetResult(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue  # torn last line of an interrupted sweep
+                sweep.results[r.target] = r
+        return sweep
+
+    def pending(self, retry: bool = False) -> list[str]:
+        """Targets without a result; with ``retry`` also those whose result is not ``done``."""
+        return [
+            t
+            for t in self.targets
+            if t not in self.results or (retry and self.results[t].status != "done")
+        ]
+
+    def record(self, result: TargetResult) -> None:
+        self.results[result.target] = result
+        with (self.dir / "results.jsonl").open("a", encoding="utf-8") as f:
+            f.write(json.dumps(asdict(result)) + "\n")
+
+
+def expand_targets(patterns: Iterable[str], from_file: Path | None = None) -> list[str]:
+    """Resolve paths and glob patterns (plus one per line of ``from_file``) to unique dirs."""
+    items = list(patterns)
+    if from_file is not None:
+        for line in from_file.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                items.append(line)
+    out: dict[str, None] = {}
+    for item in items:
+        matches = sorted(glob.glob(item)) if glob.has_magic(item) else [item]
+        for m in matches:
+            p = Path(m)
+            if p.is_dir():
+                out.setdefault(str(p.resolve()), None)
+    return list(out)
+
+
+def cpu_slots(jobs: int, cpus_per_target: int) -> tuple[int, list[list[int] | None]]:
+    """Worker count and the CPUs each worker is pinned to (None where pinning is unsupported).
+
+    ``jobs=0`` fits as many workers as the CPU budget allows.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:  # pragma: no cover - macOS/Windows
+        cpus = list(range(os.cpu_count() or 1))
+    per = max(1, cpus_per_target)
+    n = jobs or max(1, len(cpus) // per)
+    if not hasattr(os, "sched_setaffinity"):  # pragma: no cover - macOS/Windows
+        return n, [None] * n
+    slots = []
+    for i in range(n):
+        start = (i * per) % len(cpus)
+        slots.append([cpus[(start + k) % len(cpus)] for k in range(min(per, len(cpus)))])
+    return n, slots
+
+
+# -- worker process ----------------------------------------------------------
+
+
+def _worker_main(conn: Connection, cpus: list[int] | None) -> None:
+    from .tools import shell
+
+    def stop(*_: object) -> None:
+        shell.kill_all()
+        os._exit(143)
+
+    signal.signal(signal.SIGTERM, stop)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        conn.send(_run_target(task, len(cpus) if cpus else 0))
+
+
+def _run_target(task: dict[str, Any], jobs: int) -> dict[str, Any]:
+    import typer
+
+    from .cli import run_core
+
+    start = time.monotonic()
+    result = TargetResult(target=task["target"], status="done", log=task["log"])
+    try:
+        with (
+            open(task["log"], "w", encoding="utf-8") as log,
+            contextlib.redirect_stdout(log),
+            contextlib.redirect_stderr(log),
+        ):
+            run_dir = run_core(
+                path=task["target"],
+                warm=False,
+                jobs=jobs,
+                receipts_root=task["receipts_root"],
+                **task["options"],
+            )
+        result.run_dir = str(run_dir)
+        result.failures_before, result.failures_after = _failures(run_dir)
+    except typer.Exit as e:
+        if e.exit_code:
+            result.status, result.error = "failed", f"exit code {e.exit_code}"
+    except Exception as e:
+        result.status, result.error = "failed", f"{type(e).__name__}: {e}"
+    result.duration = round(time.monotonic() - start, 3)
+    return asdict(result)
+
+
+def _failures(run_dir: Path) -> tuple[int | None, int | None]:
+    counts: dict[str, int] = {}
+    with (run_dir / "steps.jsonl").open(encoding="utf-8") as f:
+        for line in f:
+            if '"pytest"' not in line:
+                continue
+            ev = json.loads(line)
+            if ev.get("type") == "pytest":
+                counts[ev.get("phase")] = len(ev.get("failures") or [])
+    return counts.get("before"), counts.get("after")
+
+
+# -- scheduler ---------------------------------------------------------------
+
+
+@dataclass
+class _Worker:
+    proc: Any  # multiprocessing.Process (spawn context)
+    conn: Connection
+    cpus: list[int] | None
+    task: str | None = None
+    deadline: float | None = None
+    started: float = 0.0
+
+
+def run_sweep(
+    sweep: Sweep,
+    jobs: int = 0,
+    cpus_per_target: int = 1,
+    retry: bool = False,
+    on_result: Callable[[TargetResult], None] | None = None,
+) -> list[TargetResult]:
+    """Run the sweep's pending targets on a pool of long-lived worker processes.
+
+    Each worker imports mechanic once and runs targets one after another,
+    pinned to its own ``cpus_per_target`` CPUs (which also bounds candidate
+    evaluation inside the run). A target exceeding ``sweep.timeout`` seconds
+    gets its worker terminated (its tool subprocesses are killed too) and a
+    fresh worker takes the slot. Results are recorded as they arrive.
+    """
+    queue = sweep.pending(retry)
+    if not queue:
+        return []
+    n, slots = cpu_slots(jobs, cpus_per_target)
+    n = min(n, len(queue))
+    ctx = mp.get_context("spawn")
+    log_dir = sweep.dir / "logs"
+    done: list[TargetResult] = []
+
+    def spawn(cpus: list[int] | None) -> _Worker:
+        parent, child = ctx.Pipe()
+        proc = ctx.Process(target=_worker_main, args=(child, cpus), daemon=True)
+        proc.start()
+        child.close()
+        return _Worker(proc, parent, cpus)
+
+    def assign(w: _Worker) -> None:
+        target = queue.pop(0)
+        log = log_dir / f"{sweep.targets.index(target)}-{Path(target).name}.log"
+        w.conn.send(
+            {
+                "target": target,
+                "options": asdict(sweep.options),
+                "receipts_root": sweep.receipts_root,
+                "log": str(log),
+            }
+        )
+        w.task, w.started = target, time.monotonic()
+        w.deadline = w.started + sweep.timeout if sweep.timeout else None
+
+    def finish(result: TargetResult) -> None:
+        sweep.record(result)
+        done.append(result)
+        if on_result is not None:
+            on_result(result)
+
+    workers = [spawn(slots[i]) for i in range(n)]
+    try:
+        for w in workers:
+            if queue:
+                assign(w)
+        while any(w.task for w in workers):
+            now = time.monotonic()
+            deadlines = [w.deadline for w in workers if w.task and w.deadline]
+            timeout = max(0.0, min(deadlines) - now) if deadlines else None
+            ready = wait(
+                [w.conn for w in workers if w.task] + [w.proc.sentinel for w in workers if w.task],
+                timeout,
+            )
+            for i, w in enumerate(workers):
+                if not w.task:
+                    continue
+                elapsed = round(time.monotonic() - w.started, 3)
+                if w.conn in ready:
+                    try:
+                        finish(TargetResult(**w.conn.recv()))
+                        w.task = None
+                    except (EOFError, OSError):
+                        pass  # worker died mid-send; handled as a crash below
+                if w.task and (w.proc.sentinel in ready or not w.proc.is_alive()):
+                    finish(
+                        TargetResult(
+                            w.task,
+                            "crashed",
+                            duration=elapsed,
+                            error=f"worker exit code {w.proc.exitcode}",
+                        )
+                    )
+                    w.task = None
+                    w.proc.join(KILL_GRACE)
+                    workers[i] = w = spawn(w.cpus)
+                elif w.task and w.deadline and time.monotonic() >= w.deadline:
+                    _terminate(w)
+                    finish(
+                        TargetResult(
+                            w.task, "timeout", duration=elapsed, error=f"exceeded {sweep.timeout}s"
+                        )
+                    )
+                    w.task = None
+                    workers[i] = w = spawn(w.cpus)
+                if not w.task and queue:
+                    assign(w)
+    finally:
+        for w in workers:
+            if w.task:
+                _terminate(w)
+            else:
+                with contextlib.suppress(OSError):
+                    w.conn.send(None)
+        for w in workers:
+            w.proc.join(KILL_GRACE)
+            if w.proc.is_alive():
+                w.proc.kill()
+    return done
+
+
+def _terminate(w: _Worker) -> None:
+    w.proc.terminate()
+    w.proc.join(KILL_GRACE)
+    if w.proc.is_alive():
+        w.proc.kill()
+        w.proc.join()
+
+
+# -- report ------------------------------------------------------------------
+
+
+def report(sweep: Sweep) -> dict[str, Any]:
+    """Aggregate the sweep's results; also written to ``report.json`` and ``report.md``."""
+    results = [sweep.results[t] for t in sweep.targets if t in sweep.results]
+    by_status: dict[str, int] = {}
+    for r in results:
+        by_status[r.status] = by_status.get(r.status, 0) + 1
+    ran = [r for r in results if r.failures_before is not None]
+    summary = {
+        "id": sweep.id,
+        "targets": len(sweep.targets),
+        "finished": len(results),
+        "pending": len(sweep.targets) - len(results),
+        "by_status": by_status,
+        "fixed": sum(1 for r in ran if r.failures_before and r.failures_after == 0),
+        "still_failing": sum(1 for r in ran if r.failures_after),
+        "clean": sum(1 for r in ran if not r.failures_before and not r.failures_after),
+        "failures_before": sum(r.failures_before or 0 for r in ran),
+        "failures_after": sum(r.failures_after or 0 for r in ran),
+        "duration": round(sum(r.duration for r in results), 3),
+        "results": [asdict(r) for r in results],
+    }
+    (sweep.dir / "report.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    lines = [
+        f"# Sweep {sweep.id}",
+        "",
+        f"- Targets: {summary['targets']} ({summary['finished']} finished, "
+        f"{summary['pending']} pending)",
+        "- Status: " + (", ".join(f"{k} {v}" for k, v in sorted(by_status.items())) or "none"),
+        f"- Fixed: {summary['fixed']}, still failing: {summary['still_failing']}, "
+        f"clean: {summary['clean']}",
+        f"- Failures: {summary['failures_before']} -> {summary['failures_after']}",
+        f"- Total target time: {summary['duration']:.1f}s",
+        "",
+        "| Target | Status | Failures | Time (s) | Run |",
+        "| --- | --- | --- | ---: | --- |",
+    ]
+    for r in sorted(results, key=lambda r: -r.duration):
+        failures = (
+            "-" if r.failures_before is None else f"{r.failures_before} -> {r.failures_after}"
+        )
+        run = Path(r.run_dir).name if r.run_dir else (r.error or "")
+        lines.append(f"| {r.target} | {r.status} | {failures} | {r.duration:.1f} | {run} |")
+    (sweep.dir / "report.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return summary
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from .failure_classifier import classify
+
+CATALOG_NAME = "catalog.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    started TEXT,
+    target TEXT,
+    dry_run INTEGER,
+    failures_before INTEGER,
+    failures_after INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs(started);
+CREATE INDEX IF NOT EXISTS runs_target ON runs(target, started);
+CREATE TABLE IF NOT EXISTS events (
+    run_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    type TEXT,
+    data TEXT,
+    PRIMARY KEY (run_id, seq)
+);
+CREATE INDEX IF NOT EXISTS events_type ON events(type);
+CREATE TABLE IF NOT EXISTS tool_calls (
+    run_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    tool TEXT,
+    phase TEXT,
+    code INTEGER,
+    duration REAL
+);
+CREATE INDEX IF NOT EXISTS tool_calls_tool ON tool_calls(tool);
+CREATE TABLE IF NOT EXISTS failures (
+    run_id TEXT NOT NULL,
+    phase TEXT,
+    nodeid TEXT,
+    category TEXT,
+    file TEXT,
+    msg TEXT
+);
+CREATE INDEX IF NOT EXISTS failures_nodeid ON failures(nodeid);
+CREATE INDEX IF NOT EXISTS failures_run ON failures(run_id, phase);
+CREATE TABLE IF NOT EXISTS patches (
+    run_id TEXT NOT NULL,
+    idx INTEGER,
+    file TEXT,
+    ok INTEGER,
+    added INTEGER,
+    removed INTEGER
+);
+CREATE INDEX IF NOT EXISTS patches_file ON patches(file);
+"""
+
+
+class Catalog:
+    """SQLite index over all runs under one receipts root.
+
+    ``ReceiptRun`` records runs and events as they are logged; ``reindex``
+    rebuilds the catalog from the ``steps.jsonl`` files on disk. Lookups such
+    as the latest run or the runs that touched a file are index scans.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.executescript(SCHEMA)
+
+    @classmethod
+    def open(cls, root: str | Path = "receipts") -> Catalog:
+        return cls(Path(root) / CATALOG_NAME)
+
+    def close(self) -> None:
+        with self._lock:
+            self.db.close()
+
+    def commit(self) -> None:
+        with self._lock:
+            self.db.commit()
+
+    # -- recording -----------------------------------------------------------
+
+    def record_run(self, run_dir: Path, meta: dict[str, Any] | None = None) -> None:
+        meta = meta or {}
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO runs (id, path, started, target, dry_run)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (
+                    run_dir.name,
+                    str(run_dir.resolve()),
+                    meta.get("timestamp") or _mtime_stamp(run_dir),
+                    meta.get("path"),
+                    None if meta.get("dry_run") is None else int(bool(meta["dry_run"])),
+                ),
+            )
+
+    def record_event(self, run_id: str, seq: int, event: dict[str, Any]) -> None:
+        et = event.get("type")
+        with self._lock:
+            db = self.db
+            db.execute(
+                "INSERT OR REPLACE INTO events (run_id, seq, type, data) VALUES (?, ?, ?, ?)",
+                (run_id, seq, et, json.dumps(event, ensure_ascii=False)),
+            )
+            if et == "lint":
+                for tool in ("ruff", "black"):
+                    res = event.get(tool) or {}
+                    db.execute(
+                        "INSERT INTO tool_calls VALUES (?, ?, ?, NULL, ?, ?)",
+                        (run_id, seq, tool, res.get("code"), res.get("duration")),
+                    )
+            elif et == "pytest":
+                phase = event.get("phase")
+                db.execute(
+                    "INSERT INTO tool_calls VALUES (?, ?, 'pytest', ?, ?, ?)",
+                    (run_id, seq, phase, event.get("code"), event.get("duration")),
+                )
+                failures = event.get("failures") or []
+                db.execute("DELETE FROM failures WHERE run_id = ? AND phase = ?", (run_id, phase))
+                db.executemany(
+                    "INSERT INTO failures VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            run_id,
+                            phase,
+                            f.get("nodeid"),
+                            classify(f"{f.get('exc_type') or ''} {f.get('msg') or ''}"),
+                            f.get("file"),
+                            f.get("msg") if isinstance(f.get("msg"), str) else None,
+                        )
+                        for f in failures
+                    ],
+                )
+                if phase in ("before", "after"):
+                    db.execute(
+                        f"UPDATE runs SET failures_{phase} = ? WHERE id = ?",
+                        (len(failures), run_id),
+                    )
+            elif et == "patch":
+                stats = event.get("stats") or {f: [None, None] for f in event.get("files", [])}
+                db.executemany(
+                    "INSERT INTO patches VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (run_id, event.get("index"), f, int(bool(event.get("ok"))), a, r)
+                        for f, (a, r) in stats.items()
+                    ],
+                )
+
+    def record_events(self, run_id: str, events: Iterable[tuple[int, dict[str, Any]]]) -> None:
+        """Record ``(seq, event)`` pairs and commit them as one transaction."""
+        try:
+            for seq, event in events:
+                self.record_event(run_id, seq, event)
+        except BaseException:
+            with self._lock:
+                self.db.rollback()
+            raise
+        self.commit()
+
+    def reindex(self, root: str | Path = "receipts") -> int:
+        """Rebuild every table from the runs under ``root``; returns the run count."""
+        from .receipts import list_runs
+
+        with self._lock:
+            for table in ("runs", "events", "tool_calls", "failures", "patches"):
+                self.db.execute(f"DELETE FROM {table}")
+        runs = list_runs(Path(root))
+        for run_dir in runs:
+            steps = run_dir / "steps.jsonl"
+            events = list(_read_events(steps)) if steps.exists() else []
+            meta = next((e for e in events if e.get("type") == "meta"), {})
+            self.record_run(run_dir, meta)
+            for seq, ev in enumerate(events):
+                self.record_event(run_dir.name, seq, ev)
+        self.commit()
+        return len(runs)
+
+    # -- queries -------------------------------------------------------------
+
+    def latest_run(self) -> Path | None:
+        row = self.db.execute("SELECT id FROM runs ORDER BY started DESC LIMIT 1").fetchone()
+        return self.path.parent / row["id"] if row else None
+
+    def runs(self, limit: int = 20, file: str | None = None) -> list[dict[str, Any]]:
+        """Newest runs first; with ``file`` only runs whose patches touched it.
+
+        ``file`` matches a patch path exactly or as a trailing path suffix.
+        """
+        params: tuple[Any, ...]
+        if file is None:
+            sql, params = "SELECT * FROM runs ORDER BY started DESC LIMIT ?", (limit,)
+        else:
+            sql = (
+                "SELECT * FROM runs WHERE id IN (SELECT run_id FROM patches"
+                " WHERE file = ? OR file LIKE ? ESCAPE '\\') ORDER BY started DESC LIMIT ?"
+            )
+            suffix = file.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params = (file, f"%/{suffix}", limit)
+        return [dict(r) for r in self.db.execute(sql, params)]
+
+    def failure_trend(self, target: str | None = None, limit: int = 50) -> list[dict[str, Any]]:
+        """``started``, ``failures_before`` and ``failures_after`` per run, oldest first."""
+        sql = "SELECT id, started, failures_before, failures_after FROM runs"
+        params: tuple[Any, ...] = ()
+        if target is not None:
+            sql += " WHERE target = ?"
+            params = (target,)
+        rows = self.db.execute(sql + " ORDER BY started DESC LIMIT ?", params + (limit,))
+        return [dict(r) for r in rows][::-1]
+
+    def query(self, sql: str, params: Iterable[Any] = ()) -> list[dict[str, Any]]:
+        """Run a read-only SQL query against the catalog."""
+        db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        db.row_factory = sqlite3.Row
+        try:
+            return [dict(r) for r in db.execute(sql, tuple(params))]
+        finally:
+            db.close()
+
+
+def _mtime_stamp(path: Path) -> str:
+    try:
+        ts = datetime.fromtimestamp(path.stat().st_mtime, tz=UTC)
+    except OSError:
+        return ""
+    return ts.replace(tzinfo=None).isoformat() + "Z"
+
+
+def _read_events(path: Path) -> Iterable[dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
 import datetime as _dt
+import os
+from collections.abc import Callable
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 import typer
 
-from .patches import apply_patch
-from .planner import simple_plan, suggest_minimal_fixes
-from .receipts import ReceiptRun
-from .tools import black_tool, pytest_tool, ruff_tool
-from .tools.shell import run as shell_run
-from .ui.receipts_html import build_html
-from .ui.wizard import run_wizard
+# Subsystems are imported by the commands that use them, keeping `--help` and shell
+# hooks fast; tests/test_startup.py holds the import-time budget.
+if TYPE_CHECKING:
+    from .diffmodel import ParsedPatch
+    from .impact import ImpactIndex
+    from .receipts import ReceiptRun
+    from .snapshot import Snapshot
+    from .tools.shell import LineCallback
 
 app = typer.Typer(
     add_completion=False,
@@ -38,8 +42,67 @@ def run_core(
     lint: bool = typer.Option(False, "--lint", help="Run ruff/black checks"),
     dry_run: bool = typer.Option(True, "--dry-run/--write", help="Plan only vs apply changes"),
     max_steps: int = typer.Option(10, "--max-steps", help="Maximum steps to attempt"),
-) -> None:
-    """Plan fixes for a small Python repo and write receipts."""
+    warm: bool = typer.Option(
+        False, "--warm", help="Reuse a persistent pytest worker across test phases"
+    ),
+    full_verify: bool = typer.Option(
+        False,
+        "--full-verify",
+        help="Re-run the whole suite after patching, not just impacted tests",
+    ),
+    evaluate: bool = typer.Option(
+        True,
+        "--evaluate/--no-evaluate",
+        help="Try candidate patches in parallel workspaces and apply only the best set",
+    ),
+    jobs: int = typer.Option(0, "--jobs", help="Parallel candidate workspaces (0 = CPU count)"),
+    scratch: bool = typer.Option(
+        False,
+        "--scratch",
+        help="In write mode, patch and verify a scratch copy; sync back only if it passes",
+    ),
+    with_trace: bool = typer.Option(
+        False,
+        "--trace",
+        help="Record timing spans; adds a timing table to the receipts and writes trace.json",
+    ),
+    receipts_root: str = typer.Option(
+        "receipts", "--receipts-root", help="Directory that holds run receipts"
+    ),
+    lint_cache: bool = typer.Option(
+        True,
+        "--lint-cache/--no-lint-cache",
+        help="Only lint files changed since their cached verdict (.mechanic/lint-cache.json)",
+    ),
+    format_patched: bool = typer.Option(
+        False, "--format", help="In write mode, format patched files with black before verifying"
+    ),
+    shards: int = typer.Option(
+        1,
+        "--shards",
+        help="Split test runs over N processes balanced by recorded durations (0 = CPU count)",
+    ),
+    on_event: Callable[[dict[str, Any]], None] | None = None,
+    on_output: LineCallback | None = None,
+) -> Path:
+    """Plan fixes for a small Python repo and write receipts; returns the run directory.
+
+    ``on_event`` and ``on_output`` receive the run's events and streamed tool
+    output as they are logged (see ``ReceiptRun``).
+    """
+    from . import trace
+    from .config import get_config
+    from .evaluate import best_set, evaluate_candidates
+    from .impact import ImpactIndex, coverage_available
+    from .patches import apply_patches
+    from .planner import simple_plan, suggest_minimal_fixes
+    from .receipts import ReceiptRun
+    from .sandbox import Sandbox, cwd_relative
+    from .scheduler import Stage, run_stages
+    from .snapshot import Snapshot
+    from .tools import black_tool, pytest_tool, ruff_tool
+    from .ui.receipts_html import build_html
+
     target = Path(path).resolve()
     if not target.exists():
         typer.echo(f"Path does not exist: {target}")
@@ -54,120 +117,393 @@ def run_core(
             "lint": lint,
             "dry_run": dry_run,
             "max_steps": max_steps,
-        }
+            "warm": warm,
+            "full_verify": full_verify,
+            "evaluate": evaluate,
+            "scratch": scratch,
+            "trace": with_trace,
+            "lint_cache": lint_cache,
+            "format": format_patched,
+            "shards": shards,
+        },
+        root=receipts_root,
     )
+    tracer = trace.enable() if with_trace else None
+    try:
+        run.on_event, run.on_output = on_event, on_output
+
+        run.log_event({"type": "start", "cwd": str(target)})
+        actions = []
+        if lint:
+            actions.append("lint")
+        if fix_tests:
+            actions.append("fix-tests")
+        plan = [s.description for s in simple_plan(fix_tests=fix_tests, lint=lint)]
+        run.log_event({"type": "plan", "actions": actions, "dry_run": dry_run, "steps": plan})
+        if dry_run and plan:
+            for step in plan:
+                typer.echo(f"- {step}")
+
+        # Per-test coverage for impact-based verification is recorded during "before"
+        use_impact = fix_tests and not full_verify and coverage_available()
+        impact = ImpactIndex.load(target) if use_impact else None
+        before_args = impact.pytest_args() if impact is not None else []
+
+        # Lint and "before" test stages are independent read-only checks; run them concurrently
+        # pytest output streams to the run's output.log for `receipts tail` / `receipts serve`
+        stages = [
+            Stage(
+                "before",
+                lambda: pytest_tool.run(
+                    target, before_args, warm=warm, on_line=run.output, shards=shards
+                ),
+            )
+        ]
+        if lint:
+            stages += [
+                Stage("ruff", lambda: ruff_tool.run(target, cache=lint_cache)),
+                Stage("black", lambda: black_tool.run(target, check=True, cache=lint_cache)),
+            ]
+        results = run_stages(stages)
+
+        if lint:
+            rr, br = results["ruff"], results["black"]
+            run.log_event(
+                {
+                    "type": "lint",
+                    "results": {"ruff": rr.get("code"), "black": br.get("code")},
+                    "ruff": rr,
+                    "black": br,
+                    "cache": {"ruff": rr.get("cache"), "black": br.get("cache")},
+                }
+            )
 
-    run.log_event({"type": "start", "cwd": str(target)})
-    actions = []
-    if lint:
-        actions.append("lint")
-    if fix_tests:
-        actions.append("fix-tests")
-    plan = [s.description for s in simple_plan(fix_tests=fix_tests, lint=lint)]
-    run.log_event({"type": "plan", "actions": actions, "dry_run": dry_run, "steps": plan})
-    if dry_run and plan:
-        for step in plan:
-            typer.echo(f"- {step}")
-
-    # Lint stage
-    if lint:
-        rr = ruff_tool.run(target)
-        br = black_tool.run(target, check=True)
+        # Test + plan stage
+        before = results["before"]
+        if impact is not None:
+            impact.update(t["nodeid"] for t in before.get("tests", []))
+            impact.save()
         run.log_event(
             {
-                "type": "lint",
-                "results": {"ruff": rr.get("code"), "black": br.get("code")},
-                "ruff": rr,
-                "black": br,
+                "type": "pytest",
+                "phase": "before",
+                "code": before.get("code"),
+                "duration": before.get("duration"),
+                "counts": before.get("counts", {}),
+                "failures": before.get("failures", []),
+                "flaky": before.get("flaky"),
+                "shards": before.get("shards"),
             }
         )
 
-    # Test + plan stage
-    before = pytest_tool.run(target)
-    run.log_event(
-        {
-            "type": "pytest",
-            "phase": "before",
-            "code": before.get("code"),
-            "failures": before.get("failures", []),
-            "out": before.get("out"),
-            "err": before.get("err"),
-        }
-    )
+        planned: list[ParsedPatch] = []
+        applied: dict[int, list[str]] = {}  # written patches, in application order
+        box: Sandbox | None = None
+        snap: Snapshot | None = None
+        work, patch_root = target, Path.cwd()
+        if fix_tests:
+            with trace.span("plan"):
+                diffs = suggest_minimal_fixes(target, failures=before.get("failures", []) or [])
+            planned = diffs[:max_steps]
+            chosen = list(range(len(planned)))
+            if evaluate and planned:
+                with trace.span("evaluate", candidates=len(planned)):
+                    ranking = evaluate_candidates(
+                        target, planned, before, impact=impact, max_workers=jobs or None
+                    )
+                chosen = list(best_set(ranking))
+                run.log_event(
+                    {
+                        "type": "candidates",
+                        "ranking": [c.to_dict() for c in ranking],
+                        "chosen": chosen,
+                    }
+                )
+            selected = [planned[i] for i in chosen]
+            if not dry_run and scratch:
+                box = Sandbox.from_path(target).scratch(
+                    at=cwd_relative(target), dir=get_config().scratch_dir
+                )
+                work, patch_root = box.root, box.base or box.root
+            if not dry_run and selected:
+                # Relative to patch_root, not the target: an allowlisted file outside the
+                # target must be restored too when bisecting culprits.
+                paths = sorted({f for p in selected for f in p.paths})
+                touched = _target_relative(paths, patch_root, base=patch_root)
+                snap = Snapshot.take(patch_root, sorted(touched), use_git=box is None)
+            patch_results = apply_patches(selected, root=patch_root, dry_run=dry_run)
+            for i, patch, res in zip(chosen, selected, patch_results, strict=True):
+                run.log_event(
+                    {
+                        "type": "patch",
+                        "index": i,
+                        "ok": res.ok,
+                        "files": res.files,
+                        "lines": res.changed_lines,
+                        "dry_run": dry_run,
+                        "reasons": res.reasons,
+                        "stats": patch.stats(),
+                        "diff": patch.text,
+                    }
+                )
+                if res.ok:
+                    applied[i] = res.files
+            if format_patched and not dry_run and applied:
+                _format_patched(applied, patch_root, work, run)
 
-    applied: list[str] = []
-    snapshot_sha: str | None = None
-    if fix_tests:
-        diffs = suggest_minimal_fixes(target, failures=before.get("failures", []) or [])
-        if not dry_run:
-            shell_run(["git", "add", "-A"], cwd=Path.cwd())
-            c = shell_run(
-                ["git", "commit", "-m", "chore(mechanic): pre-patch snapshot"], cwd=Path.cwd()
-            )
-            if int(c.get("code", 1)) == 0:
-                h = shell_run(["git", "rev-parse", "HEAD"], cwd=Path.cwd())
-                if int(h.get("code", 1)) == 0:
-                    snapshot_sha = h.get("out", "").strip()
-        for i, diff in enumerate(diffs[:max_steps]):
-            res = apply_patch(diff, root=Path.cwd(), dry_run=dry_run)
+        cwd = box.root if box is not None else None
+        try:
+            with trace.span("verify"):
+                after = _verify(
+                    target,
+                    before,
+                    _changed(applied, target),
+                    impact,
+                    warm,
+                    cwd=cwd,
+                    on_line=run.output,
+                    shards=shards,
+                )
             run.log_event(
                 {
-                    "type": "patch",
-                    "index": i,
-                    "ok": res.ok,
-                    "files": res.files,
-                    "lines": res.changed_lines,
-                    "dry_run": dry_run,
-                    "reasons": res.reasons,
-                    "diff": diff,
+                    "type": "pytest",
+                    "phase": "after",
+                    "code": after.get("code"),
+                    "duration": after.get("duration"),
+                    "counts": after.get("counts", {}),
+                    "failures": after.get("failures", []),
+                    "selected": len(after["selected"]) if "selected" in after else None,
+                    "flaky": after.get("flaky"),
+                    "shards": after.get("shards"),
                 }
             )
-            if res.ok:
-                applied.extend(res.files)
+            # Auto-revert on regression in write mode: drop only the culprit patches
+            if snap is not None and applied and _regressed(before, after):
+                with trace.span("revert"):
+                    culprits = _bisect_revert(
+                        work, patch_root, snap, planned, list(applied), before, after
+                    )
+                restored = sorted({f for i in culprits for f in applied.pop(i)})
+                if format_patched and applied:
+                    _format_patched(applied, patch_root, work, run)
+                with trace.span("verify"):
+                    after = _verify(
+                        target,
+                        before,
+                        _changed(applied, target),
+                        impact,
+                        warm,
+                        cwd=cwd,
+                        on_line=run.output,
+                        shards=shards,
+                    )
+                run.log_event(
+                    {
+                        "type": "revert",
+                        "snapshot": snap.tree,
+                        "culprits": culprits,
+                        "kept": list(applied),
+                        "restored": restored,
+                        "failures": after.get("failures", []),
+                    }
+                )
+            if box is not None:
+                # Verified in the scratch copy; only now does the real tree change.
+                with trace.span("sync"):
+                    synced = box.sync_back(sorted(_changed(applied, target)))
+                run.log_event({"type": "scratch", "mode": box.mode, "synced": synced})
+        finally:
+            if box is not None:
+                box.cleanup()
+
+        # Write the summary, then render HTML receipts from it and finish
+        files = {f for fs in applied.values() for f in fs}
+        timing = ""
+        if tracer is not None:
+            run.log_event({"type": "trace", "spans": [s.to_dict() for s in tracer.spans]})
+            timing = "## Timing\n\n" + trace.summary_table(tracer.spans)
+        run.flush()
+        run.write_summary(
+            title="Repo Mechanic Run",
+            lines=[
+                f"Target: {target}",
+                f"Actions: {', '.join(actions) if actions else 'none'}",
+                f"Mode: {'dry-run' if dry_run else 'write'}",
+                f"Applied files: {', '.join(sorted(files)) if files else 'none'}",
+                f"Failures before: {len(before.get('failures', []))}",
+                f"Failures after: {len(after.get('failures', []))}",
+                *([_cache_line(results["ruff"], results["black"])] if lint else []),
+            ],
+            extra=timing,
+        )
+        html = build_html(run.run_dir)
+        if tracer is not None:
+            # trace.json also covers the HTML render, which the logged spans precede.
+            trace.disable()
+            trace.write(tracer.spans, run.run_dir / "trace.json")
+        typer.echo(f"HTML: {html}")
+        typer.echo(f"Receipts written to: {run.run_dir}")
+        return run.run_dir
+    finally:
+        # Also on failure: a resident daemon or run-many worker outlives the run.
+        run.close()
+        if tracer is not None:
+            trace.disable()  # later runs in this process must not record into it
+
+
+def _format_patched(
+    applied: dict[int, list[str]], patch_root: Path, work: Path, run: ReceiptRun
+) -> None:
+    """Format the Python files the ``applied`` patches wrote, as patches through the guards."""
+    import re
 
-    after = pytest_tool.run(target)
+    from . import trace
+    from .patches import apply_patches
+    from .tools import black_engine, black_tool
+
+    files = sorted({f for fs in applied.values() for f in fs if f.endswith((".py", ".pyi"))})
+    exclude = black_tool.force_exclude(work)
+    if exclude:
+        # black's patterns are relative to the target; patch paths to ``patch_root``.
+        skip = re.compile(exclude)
+        files = [f for f in files if not skip.search("/" + _relative_to(patch_root / f, work))]
+    if not files or not black_engine.available():
+        return
+    with trace.span("format", files=len(files)):
+        records = black_engine.format_files(patch_root, files, black_engine.load_mode(work))
+        changed = [r for r in records if r.changed]
+        results = apply_patches([r.diff for r in changed], root=patch_root, dry_run=False)
+    ok = {r.path: res for r, res in zip(changed, results, strict=True)}
     run.log_event(
         {
-            "type": "pytest",
-            "phase": "after",
-            "code": after.get("code"),
-            "failures": after.get("failures", []),
-            "out": after.get("out"),
-            "err": after.get("err"),
+            "type": "format",
+            "files": [
+                {
+                    **r.to_dict(),
+                    "ok": ok[r.path].ok if r.path in ok else None,
+                    "reasons": ok[r.path].reasons if r.path in ok else [],
+                }
+                for r in records
+            ],
+            "diff": "".join(r.diff for r in changed),
         }
     )
 
-    # Auto-revert on regression in write mode
-    if not dry_run and snapshot_sha is not None:
-        before_n = len(before.get("failures", []) or [])
-        after_n = len(after.get("failures", []) or [])
-        if after_n > before_n:
-            r = shell_run(["git", "reset", "--hard", f"{snapshot_sha}~0"], cwd=Path.cwd())
-            run.log_event(
-                {
-                    "type": "revert",
-                    "snapshot": snapshot_sha,
-                    "ok": int(r.get("code", 1)) == 0,
-                    "exit": r.get("code"),
-                    "err": r.get("err"),
-                }
-            )
 
-    # Build HTML receipts and finish
-    html = build_html(run.run_dir)
-    run.write_summary(
-        title="Repo Mechanic Run",
-        lines=[
-            f"Target: {target}",
-            f"Actions: {', '.join(actions) if actions else 'none'}",
-            f"Mode: {'dry-run' if dry_run else 'write'}",
-            f"Applied files: {', '.join(sorted(set(applied))) if applied else 'none'}",
-            f"Failures before: {len(before.get('failures', []))}",
-            f"Failures after: {len(after.get('failures', []))}",
-        ],
+def _relative_to(path: Path, root: Path) -> str:
+    try:
+        return path.resolve().relative_to(root.resolve()).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def _cache_line(*results: dict[str, Any]) -> str:
+    parts = []
+    for name, res in zip(("ruff", "black"), results, strict=True):
+        c = res.get("cache")
+        parts.append(f"{name} {c['hits']}/{c['files']} files cached" if c else f"{name} off")
+    return "Lint cache: " + ", ".join(parts)
+
+
+def _target_relative(files: list[str], target: Path, base: Path | None = None) -> set[str]:
+    """Map patch paths relative to ``base`` (default: the cwd) to paths relative to ``target``."""
+    root = target.resolve()
+    out: set[str] = set()
+    for f in files:
+        try:
+            out.add(((base or Path.cwd()) / f).resolve().relative_to(root).as_posix())
+        except ValueError:
+            continue
+    return out
+
+
+def _changed(applied: dict[int, list[str]], target: Path) -> set[str]:
+    return _target_relative([f for files in applied.values() for f in files], target)
+
+
+def _regressed(before: dict[str, Any], after: dict[str, Any]) -> bool:
+    from .tools import pytest_tool
+
+    new = pytest_tool.failed_nodeids(after) - pytest_tool.failed_nodeids(before)
+    return bool(new) or len(after.get("failures", [])) > len(before.get("failures", []))
+
+
+def _bisect_revert(
+    work: Path,
+    patch_root: Path,
+    snap: Snapshot,
+    patches: list[ParsedPatch],
+    stack: list[int],
+    before: dict[str, Any],
+    after: dict[str, Any],
+) -> list[int]:
+    """Find the applied patches behind a regression and leave the others applied.
+
+    Each probe restores the snapshot, applies a subset of ``stack`` and
+    re-runs just the newly failing tests.
+    """
+    from .patches import apply_patches
+    from .snapshot import bisect_culprits
+    from .tools import pytest_tool
+
+    regressed = pytest_tool.failed_nodeids(after) - pytest_tool.failed_nodeids(before)
+
+    def apply(subset: list[int]) -> None:
+        snap.restore()
+        apply_patches([patches[i] for i in subset], root=patch_root, dry_run=False)
+
+    def is_bad(subset: list[int]) -> bool:
+        apply(subset)
+        res = pytest_tool.run(work, ["-p", "no:cacheprovider"] + sorted(regressed))
+        if regressed:
+            return bool(pytest_tool.failed_nodeids(res) & regressed)
+        return len(res.get("failures", [])) > len(before.get("failures", []))
+
+    culprits = bisect_culprits(stack, is_bad)
+    apply([i for i in stack if i not in culprits])
+    return culprits
+
+
+def _verify(
+    target: Path,
+    before: dict[str, Any],
+    changed: set[str],
+    impact: ImpactIndex | None,
+    warm: bool,
+    cwd: Path | None = None,
+    on_line: LineCallback | None = None,
+    shards: int = 1,
+) -> dict[str, Any]:
+    """Run the "after" phase: impacted and previously failing tests and changed test modules.
+
+    With ``cwd`` (a scratch copy of ``target``) tests run there and the
+    impact index is only read, since coverage would not map to ``target``.
+    """
+    from .impact import merge_results
+    from .tools import pytest_tool
+
+    where = cwd or target
+    if not impact:
+        return pytest_tool.run(where, warm=warm, on_line=on_line, shards=shards)
+    files = changed | impact.changed_files()
+    selected = impact.impacted(files)
+    selected |= {f["nodeid"] for f in before.get("failures", []) if f.get("nodeid")}
+    # Changed test modules run whole: tests a patch added to them are not indexed yet.
+    modules = impact.test_modules(files)
+    selected = {n for n in selected if n.split("::", 1)[0] not in modules} | modules
+    if not selected:
+        return merge_results(before, {})
+    cov_args = impact.pytest_args() if cwd is None else ["-p", "no:cacheprovider"]
+    subset = pytest_tool.run(
+        where, sorted(selected) + cov_args, warm=warm, on_line=on_line, shards=shards
     )
-    typer.echo(f"HTML: {html}")
-    typer.echo(f"Receipts written to: {run.run_dir}")
+    if subset.get("code") not in (0, 1):
+        # Selection no longer matches the suite (e.g. a test was removed): verify everything.
+        return pytest_tool.run(where, warm=warm, on_line=on_line, shards=shards)
+    if cwd is None:
+        impact.update(selected | {t["nodeid"] for t in subset.get("tests", [])})
+        impact.save()
+    return merge_results(before, subset)
 
 
 @app.command(help="Run planner/patcher on a target repo")
@@ -177,35 +513,376 @@ def run(
     lint: bool = typer.Option(False, "--lint"),
     dry_run: bool = typer.Option(True, "--dry-run/--write"),
     max_steps: int = typer.Option(10, "--max-steps"),
+    warm: bool = typer.Option(False, "--warm"),
+    full_verify: bool = typer.Option(False, "--full-verify"),
+    evaluate: bool = typer.Option(True, "--evaluate/--no-evaluate"),
+    jobs: int = typer.Option(0, "--jobs"),
+    scratch: bool = typer.Option(False, "--scratch"),
+    with_trace: bool = typer.Option(False, "--trace"),
+    receipts_root: str = typer.Option("receipts", "--receipts-root"),
+    lint_cache: bool = typer.Option(True, "--lint-cache/--no-lint-cache"),
+    format_patched: bool = typer.Option(False, "--format"),
+    shards: int = typer.Option(1, "--shards"),
+    daemon: bool = typer.Option(
+        False, "--daemon", help="Send the run to a running `repo-mechanic serve` daemon"
+    ),
+    socket_path: Path | None = typer.Option(
+        None, "--socket", help="Daemon socket (default: .mechanic/daemon.sock)"
+    ),
 ) -> None:
-    run_core(path=path, fix_tests=fix_tests, lint=lint, dry_run=dry_run, max_steps=max_steps)
+    options = {
+        "path": path,
+        "fix_tests": fix_tests,
+        "lint": lint,
+        "dry_run": dry_run,
+        "max_steps": max_steps,
+        "warm": warm,
+        "full_verify": full_verify,
+        "evaluate": evaluate,
+        "jobs": jobs,
+        "scratch": scratch,
+        "with_trace": with_trace,
+        "receipts_root": receipts_root,
+        "lint_cache": lint_cache,
+        "format_patched": format_patched,
+        "shards": shards,
+    }
+    if daemon:
+        from .daemon import SOCKET_PATH, DaemonError, DaemonUnavailable, submit_run
+
+        options["path"] = str(Path(path).resolve())
+        try:
+            done = submit_run(
+                options,
+                socket_path or SOCKET_PATH,
+                lambda msg: msg["type"] == "echo" and typer.echo(msg["text"]),
+            )
+        except DaemonUnavailable as e:
+            typer.echo(f"{e}; running in-process", err=True)
+        except DaemonError as e:
+            # The daemon may have started (and half-applied) this run: do not repeat it here.
+            typer.echo(f"Daemon run did not finish: {e}", err=True)
+            raise typer.Exit(code=1) from e
+        else:
+            if done.get("error"):
+                typer.echo(f"Run failed in daemon: {done['error']}", err=True)
+            if done.get("code"):
+                raise typer.Exit(code=done["code"])
+            return
+    run_core(**options)
+
+
+@app.command(help="Run a daemon that serves `run --daemon` requests over a Unix socket")
+def serve(
+    socket_path: Path | None = typer.Option(
+        None, "--socket", help="Daemon socket (default: .mechanic/daemon.sock)"
+    ),
+    status: bool = typer.Option(False, "--status", help="Show a running daemon's status"),
+    stop: bool = typer.Option(False, "--stop", help="Stop a running daemon"),
+) -> None:
+    import json
+    import signal
+    import threading
+
+    from .daemon import SOCKET_PATH, DaemonError, make_server, request
+
+    socket_path = socket_path or SOCKET_PATH
+    if status or stop:
+        try:
+            for msg in request({"op": "stop" if stop else "status"}, socket_path):
+                typer.echo(json.dumps(msg, indent=2) if status else "Daemon stopping.")
+        except DaemonError as e:
+            typer.echo(str(e))
+            raise typer.Exit(code=1) from e
+        return
+    try:
+        server = make_server(socket_path)
+    except DaemonError as e:
+        typer.echo(str(e))
+        raise typer.Exit(code=1) from e
+    typer.echo(f"Listening on {socket_path} (pid {os.getpid()}; Ctrl-C or --stop to stop)")
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@app.command("run-many", help="Run many targets on a bounded pool of worker processes")
+def run_many(
+    targets: list[str] = typer.Argument(None, help="Target paths or glob patterns"),
+    from_file: Path | None = typer.Option(
+        None, "--from-file", help="File with one target per line"
+    ),
+    fix_tests: bool = typer.Option(False, "--fix-tests"),
+    lint: bool = typer.Option(False, "--lint"),
+    dry_run: bool = typer.Option(True, "--dry-run/--write"),
+    max_steps: int = typer.Option(10, "--max-steps"),
+    full_verify: bool = typer.Option(False, "--full-verify"),
+    evaluate: bool = typer.Option(True, "--evaluate/--no-evaluate"),
+    scratch: bool = typer.Option(False, "--scratch"),
+    with_trace: bool = typer.Option(False, "--trace"),
+    lint_cache: bool = typer.Option(True, "--lint-cache/--no-lint-cache"),
+    format_patched: bool = typer.Option(False, "--format"),
+    shards: int = typer.Option(1, "--shards"),
+    jobs: int = typer.Option(0, "--jobs", help="Worker processes (0 = CPUs / --cpus-per-target)"),
+    cpus_per_target: int = typer.Option(
+        1, "--cpus-per-target", help="CPUs each worker is pinned to and may use for evaluation"
+    ),
+    timeout: float = typer.Option(
+        0, "--timeout", help="Per-target time limit in seconds (0 = none)"
+    ),
+    receipts_root: str = typer.Option("receipts", "--receipts-root"),
+    resume: str | None = typer.Option(None, "--resume", help="Continue an earlier sweep by id"),
+    retry: bool = typer.Option(False, "--retry", help="With --resume, rerun targets not done"),
+) -> None:
+    from .batch import Sweep, SweepOptions, expand_targets, report, run_sweep
+
+    if resume:
+        try:
+            sweep = Sweep.load(resume, receipts_root)
+        except FileNotFoundError as e:
+            typer.echo(f"No sweep {resume} under {receipts_root}")
+            raise typer.Exit(code=2) from e
+        if timeout:
+            sweep.timeout = timeout
+    else:
+        paths = expand_targets(targets or [], from_file)
+        if not paths:
+            typer.echo("No target directories matched.")
+            raise typer.Exit(code=2)
+        options = SweepOptions(
+            fix_tests=fix_tests,
+            lint=lint,
+            dry_run=dry_run,
+            max_steps=max_steps,
+            full_verify=full_verify,
+            evaluate=evaluate,
+            scratch=scratch,
+            with_trace=with_trace,
+            lint_cache=lint_cache,
+            format_patched=format_patched,
+            shards=shards,
+        )
+        sweep = Sweep.create(paths, options, receipts_root, timeout or None)
+    typer.echo(f"Sweep {sweep.id}: {len(sweep.pending(retry))} of {len(sweep.targets)} targets")
+
+    def progress(r: Any) -> None:
+        failures = "" if r.failures_before is None else f" {r.failures_before}->{r.failures_after}"
+        typer.echo(f"[{r.status}] {r.target}{failures} ({r.duration:.1f}s)")
+
+    try:
+        run_sweep(
+            sweep, jobs=jobs, cpus_per_target=cpus_per_target, retry=retry, on_result=progress
+        )
+    except KeyboardInterrupt:
+        typer.echo(f"Interrupted; resume with --resume {sweep.id}")
+    summary = report(sweep)
+    typer.echo(
+        f"Finished {summary['finished']}/{summary['targets']}: "
+        + ", ".join(f"{k} {v}" for k, v in sorted(summary["by_status"].items()))
+        + f"; failures {summary['failures_before']} -> {summary['failures_after']}"
+    )
+    typer.echo(f"Report: {sweep.dir / 'report.md'}")
 
 
 @app.command(help="Interactive wizard to select path and options")
 def wizard() -> None:
+    from .ui.wizard import run_wizard
+
     run_wizard()
 
 
-@app.command(help="Open the latest receipts HTML")
+@app.command(help="Browse receipts in a terminal UI (needs the optional `tui` extra)")
+def tui(
+    live: bool = typer.Option(False, "--live", help="Follow the newest run as it progresses"),
+) -> None:
+    from .ui.tui import run_tui
+
+    run_tui(live=live)
+
+
+receipts_app = typer.Typer(help="Browse and query receipts")
+app.add_typer(receipts_app, name="receipts")
+
+
+def _latest_run() -> Path | None:
+    from .catalog import CATALOG_NAME, Catalog
+    from .receipts import list_runs
+
+    catalog_path = Path("receipts") / CATALOG_NAME
+    if catalog_path.exists():
+        catalog = Catalog(catalog_path)
+        try:
+            latest = catalog.latest_run()
+        finally:
+            catalog.close()
+        if latest is not None and latest.exists():
+            return latest
+    runs = list_runs()
+    return runs[-1] if runs else None
+
+
+@receipts_app.callback(invoke_without_command=True)
 def receipts(
-    open_latest: bool = typer.Option(True, "--open-latest", help="Open newest run HTML")
+    ctx: typer.Context,
+    open_latest: bool = typer.Option(True, "--open-latest", help="Open newest run HTML"),
 ) -> None:
+    """Open the latest receipts HTML (or run a subcommand)."""
+    if ctx.invoked_subcommand is not None:
+        return
     import webbrowser
 
-    root = Path("receipts")
-    if not root.exists():
-        typer.echo("No receipts yet.")
-        raise typer.Exit(code=0)
-    runs = sorted([p for p in root.iterdir() if p.is_dir()])
-    if not runs:
+    from .ui.receipts_html import build_html
+
+    latest = _latest_run()
+    if latest is None:
         typer.echo("No receipts yet.")
         raise typer.Exit(code=0)
-    latest = runs[-1]
     html = build_html(latest)
     typer.echo(f"Latest: {html}")
     if open_latest:
         webbrowser.open(html.as_uri())
 
 
+@receipts_app.command("list", help="List recent runs from the receipts catalog")
+def receipts_list(
+    limit: int = typer.Option(20, "--limit", help="Maximum runs to show"),
+    file: str | None = typer.Option(None, "--file", help="Only runs that patched this file"),
+) -> None:
+    from .catalog import Catalog
+
+    catalog = Catalog.open()
+    try:
+        rows = catalog.runs(limit=limit, file=file)
+    finally:
+        catalog.close()
+    if not rows:
+        typer.echo("No runs found.")
+        return
+    for r in rows:
+        typer.echo(
+            f"{r['id']}  {r['started'] or '-'}  failures "
+            f"{_fmt(r['failures_before'])} -> {_fmt(r['failures_after'])}  {r['target'] or ''}"
+        )
+
+
+@receipts_app.command("query", help="Run a read-only SQL query against the receipts catalog")
+def receipts_query(
+    sql: str = typer.Argument(..., help="SQL, e.g. SELECT * FROM failures LIMIT 5"),
+    as_json: bool = typer.Option(False, "--json", help="Print rows as JSON lines"),
+) -> None:
+    import json
+    import sqlite3
+
+    from .catalog import Catalog
+
+    catalog = Catalog.open()
+    try:
+        rows = catalog.query(sql)
+    except sqlite3.Error as e:
+        typer.echo(f"Query failed: {e}")
+        raise typer.Exit(code=1) from e
+    finally:
+        catalog.close()
+    for r in rows:
+        typer.echo(
+            json.dumps(r, ensure_ascii=False) if as_json else "\t".join(map(str, r.values()))
+        )
+
+
+@receipts_app.command("reindex", help="Rebuild the receipts catalog from existing runs")
+def receipts_reindex() -> None:
+    from .catalog import Catalog
+
+    catalog = Catalog.open()
+    try:
+        n = catalog.reindex()
+    finally:
+        catalog.close()
+    typer.echo(f"Indexed {n} runs.")
+
+
+@receipts_app.command("tail", help="Follow a run's events and output as they are written")
+def receipts_tail(
+    run_id: str | None = typer.Argument(None, help="Run to follow (default: newest)"),
+    tui: bool = typer.Option(False, "--tui", help="Follow in the terminal UI instead"),
+) -> None:
+    from .ui.live import RunFollower, Watcher, describe
+
+    if tui:
+        from .ui.tui import run_tui
+
+        run_tui(live=True)
+        return
+    run_dir = Path("receipts") / run_id if run_id else _latest_run()
+    if run_dir is None or not run_dir.is_dir():
+        typer.echo("No such run.")
+        raise typer.Exit(code=1)
+    follower, watcher = RunFollower(run_dir), Watcher([run_dir])
+    try:
+        while True:
+            data = follower.wait(watcher, 5.0)
+            for ev in data["events"]:
+                typer.echo(describe(ev))
+            for line in data["output"]:
+                typer.echo(f"  | {line}")
+            if data["finished"]:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+@receipts_app.command("serve", help="Serve receipts over HTTP with live pages for active runs")
+def receipts_serve(
+    host: str = typer.Option("127.0.0.1", "--host"),
+    port: int = typer.Option(8765, "--port"),
+) -> None:
+    from .ui.serve import make_server
+
+    server = make_server(Path("receipts"), host=host, port=port)
+    typer.echo(f"Serving receipts on http://{host}:{server.server_address[1]}/ (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@receipts_app.command("trace", help="Export a traced run's spans (see run --trace)")
+def receipts_trace(
+    run_id: str | None = typer.Argument(None, help="Run to export (default: newest)"),
+    fmt: str = typer.Option("chrome", "--format", help="chrome or speedscope"),
+    out: Path | None = typer.Option(None, "--out", help="Output file (default: in the run)"),
+) -> None:
+    from . import trace
+    from .receipts import iter_events
+
+    run_dir = Path("receipts") / run_id if run_id else _latest_run()
+    if run_dir is None or not run_dir.is_dir():
+        typer.echo("No such run.")
+        raise typer.Exit(code=1)
+    spans = trace.spans_from_events(iter_events(run_dir / "steps.jsonl"))
+    if not spans:
+        typer.echo("Run has no trace; re-run with --trace.")
+        raise typer.Exit(code=1)
+    try:
+        path = trace.write(spans, out or run_dir / f"trace.{fmt}.json", fmt)
+    except ValueError as e:
+        typer.echo(str(e))
+        raise typer.Exit(code=2) from e
+    typer.echo(f"Trace: {path}")
+    typer.echo(trace.summary_table(spans).rstrip())
+
+
+def _fmt(n: int | None) -> str:
+    return "-" if n is None else str(n)
+
+
 if __name__ == "__main__":  # pragma: no cover
     app()
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from functools import lru_cache
 from pathlib import Path
 
 try:
@@ -10,6 +9,7 @@ except Exception:  # pragma: no cover
     tomllib = None  # type: ignore
 
 
+CONFIG_NAME = "repo-mechanic.toml"
 DEFAULT_ALLOWLIST_PREFIXES: tuple[str, ...] = ("src/", "tests/", "fixtures/")
 DEFAULT_MAX_PATCH_LINES: int = 200
 
@@ -19,25 +19,50 @@ class MechanicConfig:
     allowlist_prefixes: tuple[str, ...] = DEFAULT_ALLOWLIST_PREFIXES
     max_patch_lines: int = DEFAULT_MAX_PATCH_LINES
     fixtures_root: str | None = None
+    scratch_dir: str | None = None
+    receipts_durability: str = "none"
 
 
 def _load_from_toml(root: Path) -> MechanicConfig | None:
     if tomllib is None:
         return None
-    cfg_path = root / "repo-mechanic.toml"
+    cfg_path = root / CONFIG_NAME
     if not cfg_path.exists():
         return None
     data = tomllib.loads(cfg_path.read_text(encoding="utf-8"))
     allow = data.get("allowlist", {}).get("prefixes") or list(DEFAULT_ALLOWLIST_PREFIXES)
     max_lines = data.get("guards", {}).get("max_patch_lines") or DEFAULT_MAX_PATCH_LINES
     fixtures_root = data.get("fixtures", {}).get("root")
+    scratch_dir = data.get("sandbox", {}).get("scratch_dir")
+    durability = data.get("receipts", {}).get("durability") or "none"
     return MechanicConfig(
-        allowlist_prefixes=tuple(allow), max_patch_lines=int(max_lines), fixtures_root=fixtures_root
+        allowlist_prefixes=tuple(allow),
+        max_patch_lines=int(max_lines),
+        fixtures_root=fixtures_root,
+        scratch_dir=scratch_dir,
+        receipts_durability=durability,
     )
 
 
-@lru_cache(maxsize=1)
-def get_config() -> MechanicConfig:
-    root = Path.cwd()
-    cfg = _load_from_toml(root)
-    return cfg or MechanicConfig()
+# Parsed configs per directory, keyed by the file's (mtime, size); ``None`` when absent.
+_cache: dict[Path, tuple[tuple[int, int] | None, MechanicConfig]] = {}
+
+
+def get_config(root: Path | None = None) -> MechanicConfig:
+    """Config for ``root`` (default: the cwd), re-read whenever ``repo-mechanic.toml`` changes.
+
+    Each call costs one ``stat``, so a long-lived process (see ``daemon``)
+    picks up edits without restarting.
+    """
+    root = root or Path.cwd()
+    try:
+        st = (root / CONFIG_NAME).stat()
+        key: tuple[int, int] | None = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = None
+    cached = _cache.get(root)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    cfg = (_load_from_toml(root) if key is not None else None) or MechanicConfig()
+    _cache[root] = (key, cfg)
+    return cfg
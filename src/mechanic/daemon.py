@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+SOCKET_PATH = Path(".mechanic") / "daemon.sock"
+
+# ``run_core`` keyword arguments a client may send, with the CLI defaults.
+RUN_OPTIONS: dict[str, Any] = {
+    "path": ".",
+    "fix_tests": False,
+    "lint": False,
+    "dry_run": True,
+    "max_steps": 10,
+    "warm": False,
+    "full_verify": False,
+    "evaluate": True,
+    "jobs": 0,
+    "scratch": False,
+    "with_trace": False,
+    "receipts_root": "receipts",
+    "lint_cache": True,
+    "format_patched": False,
+    "shards": 1,
+}
+
+Send = Callable[[dict[str, Any]], None]
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+class DaemonUnavailable(DaemonError):
+    """No daemon accepted the connection, so nothing was sent to one."""
+
+
+class _Lines(io.TextIOBase):
+    """A text stream that hands each complete line to ``emit``."""
+
+    def __init__(self, emit: Callable[[str], None]) -> None:
+        self._emit = emit
+        self._partial = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        *lines, self._partial = (self._partial + s).split("\n")
+        for line in lines:
+            self._emit(line)
+        return len(s)
+
+    def flush(self) -> None:
+        if self._partial:
+            self._emit(self._partial)
+            self._partial = ""
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: Daemon
+
+    def setup(self) -> None:
+        super().setup()
+        # The run thread and shell's stdout/stderr readers all send on this connection.
+        self._send_lock = threading.Lock()
+        self._gone = False
+
+    def handle(self) -> None:
+        try:
+            req = json.loads(self.rfile.readline() or b"{}")
+        except ValueError:
+            req = {}
+        op = req.get("op")
+        if op == "run":
+            self.server.run(req, self._send)
+        elif op == "status":
+            self._send({"type": "status", **self.server.status()})
+        elif op == "stop":
+            self._send({"type": "stopping"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            self._send({"type": "error", "error": f"unknown op: {op!r}"})
+
+    def _send(self, msg: dict[str, Any]) -> None:
+        data = (json.dumps(msg, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._send_lock:
+            # A client that went away must not abort the run: its receipts still complete.
+            if self._gone:
+                return
+            try:
+                self.wfile.write(data)
+                self.wfile.flush()
+            except OSError:
+                self._gone = True
+
+
+class Daemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves ``run`` requests over a Unix socket as JSON lines.
+
+    A client sends one request line: ``{"op": "run", "cwd": ..., "options":
+    {...}}`` with ``run_core`` keyword arguments (see ``RUN_OPTIONS``),
+    ``{"op": "status"}`` or ``{"op": "stop"}``. A run replies with
+    ``queued`` while another run is in progress, then ``event`` (receipts
+    events), ``output`` (tool output lines) and ``echo`` (CLI text) messages
+    as they happen, and finally ``done`` with ``code`` and ``run_dir``.
+
+    Runs execute one at a time in this process, in the client's cwd, so the
+    imports, parsed configs and warm pytest workers (``warm=True``) stay
+    resident between them.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: Path) -> None:
+        self.path = path.absolute()
+        self.started = time.time()
+        self.runs = 0
+        self._run_lock = threading.Lock()
+        old = os.umask(0o177)  # the socket accepts code-running requests: owner only
+        try:
+            super().__init__(str(path), _Handler)
+        finally:
+            os.umask(old)
+
+    def run(self, req: dict[str, Any], send: Send) -> None:
+        import typer
+
+        from .cli import run_core
+
+        options = {k: v for k, v in (req.get("options") or {}).items() if k in RUN_OPTIONS}
+        cwd = req.get("cwd") or os.getcwd()
+        if not self._run_lock.acquire(blocking=False):
+            send({"type": "queued"})
+            self._run_lock.acquire()
+        home = os.getcwd()
+        code, run_dir, error = 0, None, None
+        try:
+            os.chdir(cwd)
+            echo = _Lines(lambda line: send({"type": "echo", "text": line}))
+            with contextlib.redirect_stdout(echo):
+                run_dir = run_core(
+                    **{**RUN_OPTIONS, **options},
+                    on_event=lambda ev: send({"type": "event", "event": ev}),
+                    on_output=lambda stream, line: send(
+                        {"type": "output", "stream": stream, "line": line}
+                    ),
+                )
+                echo.flush()
+            run_dir = Path(cwd, run_dir)
+        except typer.Exit as e:
+            code = e.exit_code
+        except Exception as e:
+            code, error = 1, f"{type(e).__name__}: {e}"
+            traceback.print_exc(file=sys.stderr)
+        finally:
+            os.chdir(home)
+            self.runs += 1
+            self._run_lock.release()
+        send({"type": "done", "code": code, "run_dir": run_dir and str(run_dir), "error": error})
+
+    def status(self) -> dict[str, Any]:
+        from .config import _cache
+        from .tools.pytest_worker import _WORKERS
+
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 1),
+            "runs": self.runs,
+            "busy": self._run_lock.locked(),
+            "configs": sorted(str(p) for p in _cache),
+            "pytest_workers": sorted(str(p) for p in _WORKERS),
+        }
+
+    def server_close(self) -> None:
+        from .tools.pytest_worker import close_all
+
+        super().server_close()
+        close_all()
+        with contextlib.suppress(OSError):
+            self.path.unlink()
+
+
+def make_server(path: Path = SOCKET_PATH) -> Daemon:
+    """Bind the daemon socket at ``path``, replacing a stale one left by a dead daemon."""
+    if path.exists():
+        try:
+            next(request({"op": "status"}, path))
+        except (OSError, DaemonError):
+            path.unlink()
+        else:
+            raise DaemonError(f"a daemon is already listening on {path}")
+    from .impact import STATE_DIR, state_dir
+
+    if path.parent.name == STATE_DIR:
+        state_dir(path.parent.parent)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    # Pay the imports up front rather than on the first request.
+    from . import cli  # noqa: F401
+
+    return Daemon(path)
+
+
+def request(payload: dict[str, Any], path: Path = SOCKET_PATH) -> Iterator[dict[str, Any]]:
+    """Send one request to the daemon at ``path`` and yield its replies.
+
+    Raises ``DaemonUnavailable`` if nothing is listening, and ``DaemonError``
+    if the connection breaks after the request was sent.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError as e:
+        sock.close()
+        raise DaemonUnavailable(f"no daemon listening on {path}: {e}") from e
+    with sock, sock.makefile("rb") as f:
+        try:
+            sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+            for line in f:
+                yield json.loads(line)
+        except (OSError, ValueError) as e:
+            raise DaemonError(f"lost the connection to the daemon: {e}") from e
+
+
+def submit_run(
+    options: dict[str, Any],
+    path: Path = SOCKET_PATH,
+    on_message: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    """Run ``run_core(**options)`` in the daemon from the current cwd; returns ``done``.
+
+    Once the request is sent the run may already be changing the tree, so a
+    connection lost before ``done`` raises ``DaemonError``, never
+    ``DaemonUnavailable``: the caller must not start the run again.
+    """
+    payload = {"op": "run", "cwd": os.getcwd(), "options": options}
+    for msg in request(payload, path):
+        if msg.get("type") == "done":
+            return msg
+        if on_message is not None:
+            on_message(msg)
+    raise DaemonError("daemon closed the connection before the run finished")
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import re
+from array import array
+
+_HUNK_RE = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def _strip_path(raw: str) -> str | None:
+    p = raw.split("\t", 1)[0].strip()
+    if p == "/dev/null":
+        return None
+    if p.startswith(("a/", "b/")):
+        p = p[2:]
+    return p
+
+
+class Hunk:
+    """One ``@@`` block. The body is a range of line numbers in the patch buffer."""
+
+    __slots__ = (
+        "_patch",
+        "_first",
+        "_end",
+        "old_start",
+        "old_len",
+        "new_start",
+        "new_len",
+        "added",
+        "removed",
+        "old_eof_newline",
+        "new_eof_newline",
+    )
+
+    def __init__(
+        self,
+        patch: ParsedPatch,
+        first: int,
+        old_start: int,
+        old_len: int,
+        new_start: int,
+        new_len: int,
+    ) -> None:
+        self._patch = patch
+        self._first = first
+        self._end = first
+        self.old_start = old_start
+        self.old_len = old_len
+        self.new_start = new_start
+        self.new_len = new_len
+        self.added = 0
+        self.removed = 0
+        self.old_eof_newline = True
+        self.new_eof_newline = True
+
+    @property
+    def lines(self) -> list[str]:
+        """Body lines with their ``' '``/``'-'``/``'+'`` prefix, materialized on demand."""
+        out: list[str] = []
+        for i in range(self._first, self._end):
+            line = self._patch.line(i)
+            if line.startswith("\\"):
+                continue
+            out.append(line or " ")  # blank context line whose leading space was stripped
+        return out
+
+
+class FilePatch:
+    __slots__ = ("old_path", "new_path", "hunks", "_first", "_end")
+
+    def __init__(
+        self, old_path: str | None, new_path: str | None, first: int = 0, end: int = 0
+    ) -> None:
+        self.old_path = old_path  # None for /dev/null (file creation)
+        self.new_path = new_path  # None for /dev/null (file deletion)
+        self.hunks: list[Hunk] = []
+        self._first = first  # line range of the file's headers and hunks in the patch
+        self._end = end
+
+    @property
+    def path(self) -> str:
+        return self.new_path or self.old_path or ""
+
+    @property
+    def added(self) -> int:
+        return sum(h.added for h in self.hunks)
+
+    @property
+    def removed(self) -> int:
+        return sum(h.removed for h in self.hunks)
+
+
+class ParsedPatch:
+    """A unified diff parsed in one pass.
+
+    Holds the original text plus an array of line start offsets; hunks refer
+    to line numbers in it instead of copying their bodies. Shared by guards,
+    the applier, the planner and receipts so each diff is parsed once.
+    """
+
+    __slots__ = ("text", "_starts", "files", "changed_lines")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        starts = array("q", [0])
+        pos = text.find("\n")
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = text.find("\n", pos + 1)
+        starts.append(len(text) + 1)  # sentinel so line(i) has a uniform end
+        self._starts = starts
+        self.files: list[FilePatch] = []
+        self.changed_lines = 0
+        self._parse()
+
+    def __len__(self) -> int:
+        return len(self._starts) - 1
+
+    def line(self, i: int) -> str:
+        line = self.text[self._starts[i] : self._starts[i + 1] - 1]
+        return line[:-1] if line.endswith("\r") else line
+
+    def _tag(self, i: int) -> str:
+        start = self._starts[i]
+        if start >= self._starts[i + 1] - 1:
+            return ""
+        tag = self.text[start]
+        return "" if tag == "\r" else tag
+
+    @property
+    def paths(self) -> set[str]:
+        out: set[str] = set()
+        for fp in self.files:
+            out.update(p for p in (fp.old_path, fp.new_path) if p is not None)
+        return out
+
+    def file_text(self, fp: FilePatch) -> str:
+        """The slice of the diff text covering ``fp`` (``---``/``+++`` headers and hunks)."""
+        end = min(fp._end, len(self))
+        return self.text[self._starts[fp._first] : self._starts[end]]
+
+    def stats(self) -> dict[str, list[int]]:
+        """``{path: [added, removed]}`` per file."""
+        out: dict[str, list[int]] = {}
+        for fp in self.files:
+            s = out.setdefault(fp.path, [0, 0])
+            s[0] += fp.added
+            s[1] += fp.removed
+        return out
+
+    def _parse(self) -> None:
+        n = len(self)
+        i = 0
+        while i < n:
+            tag = self._tag(i)
+            if tag == "-" and i + 1 < n and self.text.startswith("--- ", self._starts[i]):
+                if self.text.startswith("+++ ", self._starts[i + 1]):
+                    old, new = _strip_path(self.line(i)[4:]), _strip_path(self.line(i + 1)[4:])
+                    self.files.append(FilePatch(old, new, first=i, end=i + 2))
+                    i += 2
+                    continue
+            if tag == "@" and self.files:
+                m = _HUNK_RE.match(self.line(i))
+                if m:
+                    i = self._parse_hunk(i, m)
+                    continue
+            i += 1
+
+    def _parse_hunk(self, i: int, m: re.Match[str]) -> int:
+        hunk = Hunk(
+            self,
+            i + 1,
+            old_start=int(m.group(1)),
+            old_len=int(m.group(2)) if m.group(2) is not None else 1,
+            new_start=int(m.group(3)),
+            new_len=int(m.group(4)) if m.group(4) is not None else 1,
+        )
+        old_left, new_left = hunk.old_len, hunk.new_len
+        last = " "
+        n = len(self)
+        i += 1
+        while i < n:
+            tag = self._tag(i)
+            if tag == "\\":
+                # "\ No newline at end of file" refers to the line just before it.
+                if last in " -":
+                    hunk.old_eof_newline = False
+                if last in " +":
+                    hunk.new_eof_newline = False
+            elif old_left <= 0 and new_left <= 0:
+                break
+            elif tag in (" ", ""):
+                old_left -= 1
+                new_left -= 1
+            elif tag == "-":
+                old_left -= 1
+                hunk.removed += 1
+            elif tag == "+":
+                new_left -= 1
+                hunk.added += 1
+            else:
+                break
+            if tag != "\\":
+                last = tag or " "
+            i += 1
+        hunk._end = i
+        self.changed_lines += hunk.added + hunk.removed
+        self.files[-1].hunks.append(hunk)
+        self.files[-1]._end = i
+        return i
+
+
+def parse_patch(diff: str | ParsedPatch) -> ParsedPatch:
+    return diff if isinstance(diff, ParsedPatch) else ParsedPatch(diff)
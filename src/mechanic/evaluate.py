@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .config import get_config
+from .diffmodel import ParsedPatch
+from .impact import ImpactIndex
+from .patches import apply_patches
+from .sandbox import Sandbox, cwd_relative
+from .scheduler import Stage, run_stages
+from .tools import pytest_tool
+
+
+@dataclass
+class Candidate:
+    """Outcome of one candidate set evaluated in its own workspace."""
+
+    patches: tuple[int, ...]
+    applied: bool = False
+    fixed: list[str] = field(default_factory=list)
+    regressions: list[str] = field(default_factory=list)
+    failures: int = 0
+    reasons: list[str] = field(default_factory=list)
+    duration: float | None = None
+
+    @property
+    def good(self) -> bool:
+        return self.applied and bool(self.fixed) and not self.regressions
+
+    def rank_key(self) -> tuple[Any, ...]:
+        return (not self.applied, -len(self.fixed), len(self.regressions), len(self.patches))
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class Evaluator:
+    """Applies candidate sets in isolated workspaces and runs the relevant tests.
+
+    Diff paths are relative to the current directory, so each workspace is a
+    scratch copy of ``target`` at the same relative location under its base.
+    """
+
+    def __init__(
+        self,
+        target: Path,
+        patches: list[ParsedPatch],
+        before: dict[str, Any],
+        impact: ImpactIndex | None = None,
+    ) -> None:
+        self.target = target
+        self.patches = patches
+        self.impact = impact
+        self.before_failed = pytest_tool.failed_nodeids(before)
+        self.baseline = {t["nodeid"] for t in before.get("tests", [])}
+        self.prefix = cwd_relative(target)
+
+    def _selection(self, files: list[str]) -> list[str]:
+        if self.impact is None:
+            return []
+        strip = "" if self.prefix == "." else self.prefix + "/"
+        rel = {f[len(strip) :] for f in files if f.startswith(strip)}
+        selected = self.impact.impacted(rel) | self.before_failed
+        return sorted(selected & self.baseline)
+
+    def evaluate(self, indexes: tuple[int, ...]) -> Candidate:
+        cand = Candidate(patches=indexes)
+        box = Sandbox.from_path(self.target).scratch(at=self.prefix, dir=get_config().scratch_dir)
+        try:
+            work = box.root
+            patches = [self.patches[i] for i in indexes]
+            results = apply_patches(patches, root=box.base or work, dry_run=False)
+            cand.reasons = [f"#{i}: {r}" for i, res in zip(indexes, results) for r in res.reasons]
+            if not all(r.ok for r in results):
+                return cand
+            cand.applied = True
+            files = sorted({f for r in results for f in r.files})
+            args = ["-p", "no:cacheprovider"] + self._selection(files)
+            res = pytest_tool.run(work, args)
+            if res["code"] not in (0, 1):
+                cand.reasons.append(f"pytest exited with code {res['code']}")
+            failed = pytest_tool.failed_nodeids(res)
+            ran = {t["nodeid"] for t in res.get("tests", [])}
+            cand.fixed = sorted((self.before_failed & ran) - failed)
+            cand.regressions = sorted(failed - self.before_failed)
+            cand.failures = len((self.before_failed - ran) | failed)
+            cand.duration = res.get("duration")
+        finally:
+            box.cleanup()
+        return cand
+
+    def run_sets(self, sets: list[tuple[int, ...]], max_workers: int) -> list[Candidate]:
+        stages = [
+            Stage("candidate " + ",".join(map(str, s)), lambda s=s: self.evaluate(s)) for s in sets
+        ]
+        return list(run_stages(stages, max_workers=max_workers).values())
+
+
+def evaluate_candidates(
+    target: Path,
+    patches: list[ParsedPatch],
+    before: dict[str, Any],
+    impact: ImpactIndex | None = None,
+    max_workers: int | None = None,
+) -> list[Candidate]:
+    """Evaluate candidate patches in parallel and return them best first.
+
+    Every patch is tried on its own; the patches that fix something without
+    regressions are then tried together. Candidates are ranked by failures
+    fixed, then regressions introduced, then size.
+    """
+    if not patches:
+        return []
+    ev = Evaluator(target, patches, before, impact)
+    workers = max(1, max_workers or os.cpu_count() or 1)
+    ranking = ev.run_sets([(i,) for i in range(len(patches))], workers)
+    combo = tuple(i for c in ranking if c.good for i in c.patches)
+    if len(combo) > 1:
+        ranking += ev.run_sets([combo], 1)
+    return sorted(ranking, key=Candidate.rank_key)
+
+
+def best_set(ranking: list[Candidate]) -> tuple[int, ...]:
+    """Patch indexes of the winning candidate, or ``()`` if none helps."""
+    for cand in ranking:
+        if cand.good:
+            return cand.patches
+    return ()
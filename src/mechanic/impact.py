@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import json
+import os
+from collections.abc import Iterable
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any
+
+STATE_DIR = ".mechanic"
+INDEX_NAME = "impact.json"
+COVERAGE_NAME = "impact.coverage"
+_VERSION = 1
+# pytest's default ``python_files``.
+TEST_FILE_PATTERNS = ("test_*.py", "*_test.py")
+
+
+def _file_state(path: Path) -> dict[str, Any] | None:
+    try:
+        st = path.stat()
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+    return {"sha": digest, "size": st.st_size, "mtime": st.st_mtime_ns}
+
+
+def state_dir(root: str | Path) -> Path:
+    """``<root>/.mechanic``, created on first use with a ``.gitignore`` that ignores it whole.
+
+    mechanic keeps its per-target caches there (impact index, lint verdicts,
+    test durations), even in dry-run mode; the directory can be deleted at
+    any time.
+    """
+    path = Path(root) / STATE_DIR
+    path.mkdir(parents=True, exist_ok=True)
+    ignore = path / ".gitignore"
+    if not ignore.exists():
+        ignore.write_text("# Created by repo-mechanic; safe to delete.\n*\n", encoding="utf-8")
+    return path
+
+
+def coverage_available() -> bool:
+    return importlib.util.find_spec("pytest_cov") is not None
+
+
+class ImpactIndex:
+    """Per-test map of the target files and lines each test executes.
+
+    Built from per-test coverage contexts and stored under
+    ``<target>/.mechanic/impact.json``. Paths are target-relative POSIX paths;
+    test keys are node IDs as reported by ``pytest_tool``.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root).resolve()
+        self.state_dir = self.root / STATE_DIR
+        self.path = self.state_dir / INDEX_NAME
+        self.tests: dict[str, dict[str, list[int]]] = {}
+        self.files: dict[str, dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, root: str | Path) -> ImpactIndex:
+        idx = cls(root)
+        try:
+            data = json.loads(idx.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return idx
+        if data.get("version") == _VERSION:
+            idx.tests = data.get("tests", {})
+            idx.files = data.get("files", {})
+        return idx
+
+    def save(self) -> None:
+        state_dir(self.root)
+        tmp = self.path.with_suffix(".tmp")
+        payload = {"version": _VERSION, "files": self.files, "tests": self.tests}
+        tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def __bool__(self) -> bool:
+        return bool(self.tests)
+
+    def pytest_args(self) -> list[str]:
+        """Extra pytest args that record per-test coverage for ``update``."""
+        state_dir(self.root)
+        rc = self.state_dir / "impact.coveragerc"
+        data_file = (self.state_dir / COVERAGE_NAME).as_posix()
+        rc.write_text(f"[run]\ndata_file = {data_file}\n", encoding="utf-8")
+        return [
+            f"--cov={self.root}",
+            f"--cov-config={rc}",
+            "--cov-report=",
+            "--mechanic-contexts",
+        ]
+
+    def update(self, ran: Iterable[str]) -> None:
+        """Replace the entries of the tests in ``ran`` with freshly measured coverage."""
+        from coverage import CoverageData
+
+        data_path = self.state_dir / COVERAGE_NAME
+        if not data_path.exists():
+            return
+        data = CoverageData(basename=str(data_path))
+        data.read()
+        ran = set(ran)
+        for nodeid in ran:
+            self.tests.pop(nodeid, None)
+        for measured in data.measured_files():
+            try:
+                rel = Path(measured).resolve().relative_to(self.root).as_posix()
+            except ValueError:
+                continue
+            if rel.startswith(STATE_DIR + "/"):
+                continue
+            touched = False
+            for lineno, contexts in data.contexts_by_lineno(measured).items():
+                for ctx in contexts:
+                    if ctx in ran:
+                        self.tests.setdefault(ctx, {}).setdefault(rel, []).append(lineno)
+                        touched = True
+            if touched:
+                state = _file_state(self.root / rel)
+                if state is not None:
+                    self.files[rel] = state
+        for files in self.tests.values():
+            for rel, lines in files.items():
+                lines.sort()
+        try:
+            data_path.unlink()
+        except OSError:
+            pass
+
+    def changed_files(self) -> set[str]:
+        """Indexed files whose content differs from when they were indexed."""
+        changed: set[str] = set()
+        for rel, state in self.files.items():
+            p = self.root / rel
+            try:
+                st = p.stat()
+            except OSError:
+                changed.add(rel)
+                continue
+            if st.st_size == state.get("size") and st.st_mtime_ns == state.get("mtime"):
+                continue
+            now = _file_state(p)
+            if now is None or now["sha"] != state.get("sha"):
+                changed.add(rel)
+        return changed
+
+    def impacted(self, files: Iterable[str]) -> set[str]:
+        """Node IDs of tests that executed any of ``files`` or are defined in them."""
+        wanted = {f.replace("\\", "/") for f in files}
+        selected: set[str] = set()
+        for nodeid, touched in self.tests.items():
+            if nodeid.split("::", 1)[0] in wanted or any(f in touched for f in wanted):
+                selected.add(nodeid)
+        return selected
+
+    def test_modules(self, files: Iterable[str]) -> set[str]:
+        """The existing test modules among ``files``.
+
+        A patch can add a test module, or tests to one, that the index has no
+        node IDs for yet; such modules are run whole rather than per test.
+        """
+        out: set[str] = set()
+        for f in files:
+            rel = f.replace("\\", "/")
+            name = rel.rsplit("/", 1)[-1]
+            if any(fnmatch(name, p) for p in TEST_FILE_PATTERNS) and (self.root / rel).is_file():
+                out.add(rel)
+        return out
+
+
+def merge_results(before: dict[str, Any], subset: dict[str, Any]) -> dict[str, Any]:
+    """Overlay a partial re-run onto the full ``before`` results.
+
+    Tests that were not re-run keep their ``before`` outcome, so failure counts
+    stay comparable with a full run.
+    """
+    rerun = {t["nodeid"] for t in subset.get("tests", [])}
+    tests = [t for t in before.get("tests", []) if t.get("nodeid") not in rerun]
+    tests += subset.get("tests", [])
+    failures = [f for f in before.get("failures", []) if f.get("nodeid") not in rerun]
+    failures += subset.get("failures", [])
+    counts: dict[str, int] = {}
+    for t in tests:
+        counts[t["outcome"]] = counts.get(t["outcome"], 0) + 1
+    return {
+        "code": 1 if failures else 0,
+        "failures": failures,
+        "tests": tests,
+        "counts": counts,
+        "selected": sorted(rerun),
+    }
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+from .impact import STATE_DIR, state_dir
+from .tools.shell import run as shell_run
+
+CACHE_NAME = "lint-cache.json"
+_VERSION = 1
+
+# Files whose contents can change a ruff or black verdict, looked up in every directory
+# from a checked file up to the filesystem root (both tools use hierarchical discovery).
+CONFIG_NAMES = ("pyproject.toml", "ruff.toml", ".ruff.toml")
+USER_CONFIGS = (Path("~/.config/ruff/ruff.toml"), Path("~/.config/black"))
+
+# (tool result, {file: diagnostic lines}, files not to cache) for the files a tool was asked
+# to check. ``None`` instead of the mapping means the tool failed outright. Files it could
+# not process (say, black's parse errors) keep their error lines but are re-checked next run.
+Checked = tuple[dict[str, Any], dict[str, list[str]] | None, set[str]]
+
+_save_lock = threading.Lock()
+
+
+def discover(root: Path, suffixes: tuple[str, ...] = (".py", ".pyi")) -> list[str] | None:
+    """Target-relative source files ruff would check in ``root``, honoring its excludes."""
+    res = shell_run(["ruff", "check", "--show-files", "."], cwd=root)
+    if res.get("code") != 0:
+        return None
+    files = []
+    for line in str(res.get("out", "")).splitlines():
+        if not line.strip():
+            continue
+        p = Path(line.strip())
+        if p.suffix not in suffixes:
+            continue
+        try:
+            files.append((p if p.is_absolute() else root / p).relative_to(root).as_posix())
+        except ValueError:
+            continue
+    return files
+
+
+def tool_version(tool: str) -> str:
+    try:
+        return metadata.version(tool)
+    except metadata.PackageNotFoundError:
+        res = shell_run([tool, "--version"])
+        return str(res.get("out", "")).strip() or "unknown"
+
+
+def env_key(tool: str, mode: str, root: Path, files: list[str]) -> str:
+    """Hash of what a cached verdict depends on besides the file itself."""
+    h = hashlib.sha256(f"{tool} {tool_version(tool)} {mode}".encode())
+    dirs = {root.resolve()} | {(root / f).resolve().parent for f in files}
+    seen: set[Path] = set()
+    for d in sorted(dirs):
+        for parent in (d, *d.parents):
+            if parent in seen:
+                break
+            seen.add(parent)
+    candidates = [p / n for p in sorted(seen) for n in CONFIG_NAMES]
+    candidates += [p.expanduser() for p in USER_CONFIGS]
+    for path in candidates:
+        try:
+            data = path.read_bytes()
+        except OSError:
+            continue
+        h.update(f"\0{path}\0".encode() + hashlib.sha256(data).digest())
+    return h.hexdigest()
+
+
+def _sha(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+class LintCache:
+    """Lint verdicts per file, keyed by content hash, in ``<target>/.mechanic/lint-cache.json``.
+
+    One section per tool (and mode); a section only holds for the ``env_key``
+    it was written under, so a new tool version or an edited
+    ``pyproject.toml``/``ruff.toml`` discards it wholesale.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root).resolve()
+        self.path = self.root / STATE_DIR / CACHE_NAME
+
+    def _read(self) -> dict[str, Any]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data.get("tools", {}) if data.get("version") == _VERSION else {}
+
+    def section(self, name: str, env: str) -> dict[str, dict[str, Any]]:
+        sec = self._read().get(name) or {}
+        return sec.get("files", {}) if sec.get("env") == env else {}
+
+    def store(self, name: str, env: str, files: dict[str, dict[str, Any]]) -> None:
+        # Sections of other tools are re-read under the lock: ruff and black stages
+        # run concurrently and save into the same file.
+        with _save_lock:
+            tools = self._read()
+            tools[name] = {"env": env, "files": files}
+            state_dir(self.root)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            payload = {"version": _VERSION, "tools": tools}
+            tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+
+def run_cached(
+    tool: str,
+    mode: str,
+    root: str | Path,
+    check: Callable[[list[str]], Checked],
+    render: Callable[[dict[str, list[str]], int], tuple[str, str]],
+    suffixes: tuple[str, ...] = (".py", ".pyi"),
+) -> dict[str, Any] | None:
+    """Run ``check`` on the files whose verdict is not cached and merge in the rest.
+
+    ``render`` turns all per-file diagnostics and the file count into the
+    tool's (out, err) text. Returns ``None`` when files cannot be discovered,
+    so the caller can fall back to an uncached run.
+    """
+    start = time.monotonic()
+    root = Path(root).resolve()
+    files = discover(root, suffixes)
+    if files is None:
+        return None
+    name = f"{tool}:{mode}"
+    env = env_key(tool, mode, root, files)
+    cache = LintCache(root)
+    entries = cache.section(name, env)
+    shas = {f: _sha(root / f) for f in files}
+    misses = [f for f in files if shas[f] is None or entries.get(f, {}).get("sha") != shas[f]]
+    fresh: dict[str, list[str]] | None = {}
+    failed: set[str] = set()
+    res: dict[str, Any] = {"code": 0, "out": "", "err": ""}
+    if misses:
+        res, fresh, failed = check(misses)
+    diags = {f: entries[f]["diagnostics"] for f in files if f not in misses}
+    stats = {"files": len(files), "hits": len(files) - len(misses), "misses": len(misses)}
+    if fresh is None:
+        # The tool failed rather than found problems: pass its output on and cache nothing.
+        return {
+            "code": res.get("code", -1),
+            "out": str(res.get("out", "")),
+            "err": str(res.get("err", "")),
+            "duration": round(time.monotonic() - start, 3),
+            "cache": stats,
+        }
+    for f in misses:
+        diags[f] = fresh.get(f, [])
+    keep = {
+        f: {"sha": shas[f], "diagnostics": diags[f]}
+        for f in files
+        if shas[f] is not None and f not in failed
+    }
+    if misses or len(keep) != len(entries):
+        cache.store(name, env, keep)
+    out, err = render(diags, len(files))
+    return {
+        "code": res.get("code", -1) if failed else 1 if any(diags.values()) else 0,
+        "out": out,
+        "err": err,
+        "duration": round(time.monotonic() - start, 3),
+        "cache": stats,
+    }
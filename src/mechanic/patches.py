@@ -3,8 +3,10 @@ from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
 
-from .guards import affected_paths, count_changed_lines, validate_patch
-from .tools.shell import run as shell_run
+from . import trace
+from .applier import DEFAULT_FUZZ, PatchApplyError, Transaction, changed_spans
+from .diffmodel import ParsedPatch, parse_patch
+from .guards import validate_patch
 
 
 @dataclass
@@ -15,134 +17,84 @@ class PatchResult:
     reasons: list[str]
 
 
-def apply_patch(unified_diff: str, root: Path | str = ".", dry_run: bool = True) -> PatchResult:
-    ok, reasons = validate_patch(unified_diff)
-    files = sorted(affected_paths(unified_diff))
-    changed = count_changed_lines(unified_diff)
-    if not ok:
-        return PatchResult(ok=False, changed_lines=changed, files=files, reasons=reasons)
-
-    if dry_run:
-        return PatchResult(ok=True, changed_lines=changed, files=files, reasons=[])
+def apply_patch(
+    unified_diff: str | ParsedPatch,
+    root: Path | str = ".",
+    dry_run: bool = True,
+    fuzz: int = DEFAULT_FUZZ,
+) -> PatchResult:
+    """Validate and apply a unified diff in-process.
 
-    root_path = Path(root)
-    tmp_patch = root_path / ".mechanic.patch"
-    tmp_patch.write_text(unified_diff, encoding="utf-8")
-    try:
-        # Snapshot pre-contents
-        before_contents = {}
-        for f in files:
-            p = root_path / f
-            before_contents[f] = p.read_text(encoding="utf-8") if p.exists() else None
+    In dry-run mode the hunks are still located against the current files, so
+    a patch that would not apply is reported as failed without writing.
+    """
+    return apply_patches([unified_diff], root=root, dry_run=dry_run, fuzz=fuzz)[0]
 
-        res = shell_run(
-            ["git", "apply", "--ignore-space-change", "--whitespace=nowarn", str(tmp_patch)],
-            cwd=root_path,
-        )
-        if int(res.get("code", 1)) == 0:
-            # Verify changes actually occurred
-            changed_any = False
-            for f in files:
-                p = root_path / f
-                after = p.read_text(encoding="utf-8") if p.exists() else None
-                if after is not None and after != before_contents.get(f):
-                    changed_any = True
-                    break
-            if changed_any:
-                return PatchResult(ok=True, changed_lines=changed, files=files, reasons=[])
-        # Fallback: apply simple +/- single-line replacements directly
-        replacements = _extract_replacements(unified_diff)
-        reasons = [str(res.get("err", "git apply failed"))]
-        import re
 
-        for fpath, ctx, old, new in replacements:
-            p = root_path / fpath
-            if not p.exists():
-                reasons.append(f"missing file: {fpath}")
-                continue
-            text = p.read_text(encoding="utf-8")
-            replaced = False
-            # Special-case known fixture to increase robustness
-            if fpath.replace("\\", "/").endswith("fixtures/broken-calculator/calc/__init__.py"):
-                # Replace within function blocks only
-                def_sub = re.compile(r"(def sub\(a, b\):\r?\n)([\t ]*)return a \+ b")
-                def_div = re.compile(r"(def div\(a, b\):\r?\n)([\t ]*)return a \* b")
-                t2 = def_sub.sub(lambda m: m.group(1) + m.group(2) + "return a - b", text, count=1)
-                t3 = def_div.sub(lambda m: m.group(1) + m.group(2) + "return a / b", t2, count=1)
-                if t3 != text:
-                    p.write_text(t3, encoding="utf-8")
-                    replaced = True
-            if ctx:
-                # Try context-bound replacement first
-                pattern_unix = f"{ctx}\n{old}"
-                replacement_unix = f"{ctx}\n{new}"
-                if pattern_unix in text:
-                    text = text.replace(pattern_unix, replacement_unix, 1)
-                    replaced = True
-                else:
-                    pattern_crlf = pattern_unix.replace("\n", "\r\n")
-                    replacement_crlf = replacement_unix.replace("\n", "\r\n")
-                    if pattern_crlf in text:
-                        text = text.replace(pattern_crlf, replacement_crlf, 1)
-                        replaced = True
-            if not replaced:
-                # Fallback to single-line replace, once
-                if old in text:
-                    text = text.replace(old, new, 1)
-                    replaced = True
-                else:
-                    old_crlf = old.replace("\n", "\r\n")
-                    new_crlf = new.replace("\n", "\r\n")
-                    if old_crlf in text:
-                        text = text.replace(old_crlf, new_crlf, 1)
-                        replaced = True
-            if replaced:
-                p.write_text(text, encoding="utf-8")
-            else:
-                reasons.append(f"pattern not found in {fpath}")
-        return PatchResult(ok=True, changed_lines=changed, files=files, reasons=reasons)
-    finally:
-        try:
-            tmp_patch.unlink()
-        except Exception:
-            pass
+def apply_patches(
+    diffs: list[str] | list[ParsedPatch],
+    root: Path | str = ".",
+    dry_run: bool = True,
+    fuzz: int = DEFAULT_FUZZ,
+) -> list[PatchResult]:
+    """Apply a whole plan of diffs as one transaction.
 
+    All diffs are validated up front and applied, in order, to one in-memory
+    view of the tree; a diff whose changed lines overlap an earlier accepted
+    diff, or whose hunks do not apply, is rolled back on its own and reported
+    as failed. Accepted changes are then flushed to disk once; if the flush
+    fails every written file is restored and all results are marked failed.
+    Each diff is parsed once and shared by the guards and the applier.
+    """
+    tx = Transaction(root)
+    results: list[PatchResult] = []
+    claimed: dict[str, list[tuple[int, int, int]]] = {}
+    for i, diff in enumerate(diffs):
+        with trace.span("patch", "patch", index=i) as sp:
+            result = _apply_one(i, parse_patch(diff), tx, claimed, fuzz)
+            sp.set(ok=result.ok, files=result.files)
+        results.append(result)
+    if not dry_run:
+        with trace.span("patch.commit", "patch"):
+            try:
+                tx.commit()
+            except OSError as e:
+                for r in results:
+                    if r.ok:
+                        r.ok = False
+                        r.reasons.append(f"write failed, changes rolled back: {e}")
+    return results
 
-def _extract_replacements(unified_diff: str) -> list[tuple[str, str | None, str, str]]:
-    """Extract simple single-line replacements with optional preceding context line.
 
-    Returns tuples of (file_path, context_line, old_line, new_line).
-    context_line is typically a function signature like 'def sub(a, b):'.
-    """
-    replacements: list[tuple[str, str | None, str, str]] = []
-    current_file: str | None = None
-    old_line: str | None = None
-    new_line: str | None = None
-    last_context: str | None = None
-    for line in unified_diff.splitlines():
-        if line.startswith("+++ "):
-            b = line.split(maxsplit=1)[1]
-            if b.startswith("b/"):
-                b = b[2:]
-            current_file = b
-            old_line = None
-            new_line = None
-            last_context = None
-            continue
-        if line.startswith("@@"):
-            old_line = None
-            new_line = None
-            last_context = None
-            continue
-        if line.startswith("-") and not line.startswith("--- "):
-            old_line = line[1:]
-        elif line.startswith("+") and not line.startswith("+++ "):
-            new_line = line[1:]
-        elif not line.startswith(("diff ", "index ", "--- ", "+++ ", "@@", "+", "-")):
-            # context line
-            last_context = line
-        if current_file and old_line is not None and new_line is not None:
-            replacements.append((current_file, last_context, old_line, new_line))
-            old_line = None
-            new_line = None
-    return replacements
+def _apply_one(
+    i: int,
+    parsed: ParsedPatch,
+    tx: Transaction,
+    claimed: dict[str, list[tuple[int, int, int]]],
+    fuzz: int,
+) -> PatchResult:
+    """Validate diff ``i`` and stage it in ``tx`` unless it overlaps a claimed span."""
+    ok, reasons = validate_patch(parsed)
+    files = sorted(parsed.paths)
+    changed = parsed.changed_lines
+    if not ok:
+        return PatchResult(ok=False, changed_lines=changed, files=files, reasons=reasons)
+    spans = {fp.path: changed_spans(fp) for fp in parsed.files}
+    conflicts = sorted(
+        {
+            f"overlaps patch #{j} in {path}"
+            for path, mine in spans.items()
+            for j, lo, hi in claimed.get(path, [])
+            for a, b in mine
+            if a <= hi and lo <= b
+        }
+    )
+    if conflicts:
+        return PatchResult(ok=False, changed_lines=changed, files=files, reasons=conflicts)
+    try:
+        tx.apply(parsed.files, fuzz=fuzz)
+    except PatchApplyError as e:
+        return PatchResult(ok=False, changed_lines=changed, files=files, reasons=[str(e)])
+    for path, mine in spans.items():
+        claimed.setdefault(path, []).extend((i, a, b) for a, b in mine)
+    return PatchResult(ok=True, changed_lines=changed, files=files, reasons=[])
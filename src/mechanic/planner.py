@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import difflib
+import logging
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from .diffmodel import ParsedPatch, parse_patch
 from .failure_classifier import classify
 
+log = logging.getLogger(__name__)
+
 
 @dataclass
 class PlanStep:
@@ -46,10 +50,11 @@ def _build_replacement_diff(file_path: Path, before: str, after: str) -> str | N
     return "\n".join(diff)
 
 
-def suggest_minimal_fixes(target: Path, failures: list[dict[str, Any]]) -> list[str]:
+def suggest_minimal_fixes(target: Path, failures: list[dict[str, Any]]) -> list[ParsedPatch]:
     """Heuristic suggestions based on simple failure categories.
 
     Currently recognizes the broken-calculator fixture patterns and a few generic cases.
+    Each candidate is parsed once here; empty and duplicate diffs are dropped.
     """
     diffs: list[str] = []
     # Broken calculator fixture: fix sub/add and div/*
@@ -70,7 +75,23 @@ def suggest_minimal_fixes(target: Path, failures: list[dict[str, Any]]) -> list[
         diffs.append(d2)
 
     # Generic pass: if ZeroDivision appears anywhere, consider guarding div(?,0) or operator fix
-    cats = {classify(str(f.get("msg", ""))) for f in failures or []}
+    cats = {classify(f"{f.get('exc_type') or ''} {f.get('msg', '')}") for f in failures or []}
     if "ZeroDivision" in cats and d2 and d2 not in diffs:
         diffs.append(d2)
-    return diffs
+    return _parse_candidates(diffs)
+
+
+def _parse_candidates(diffs: list[str]) -> list[ParsedPatch]:
+    out: list[ParsedPatch] = []
+    seen: set[str] = set()
+    for diff in diffs:
+        if diff in seen:
+            continue
+        seen.add(diff)
+        parsed = parse_patch(diff)
+        if parsed.changed_lines:
+            out.append(parsed)
+        else:
+            paths = ", ".join(sorted(parsed.paths)) or "no paths"
+            log.warning("dropping candidate diff with no changed lines (%s)", paths)
+    return out
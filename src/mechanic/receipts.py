@@ -1,54 +1,290 @@
 from __future__ import annotations
 
+import atexit
 import json
-from collections.abc import Iterable
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
+from .artifacts import ArtifactStore
+from .catalog import Catalog
 
-def _now_stamp() -> str:
-    return datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+DURABILITY_MODES = ("none", "flush", "fsync")
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL = 1.0  # seconds
+
+
+def new_run_dir(root: Path) -> Path:
+    """Create and return a fresh run directory under ``root``.
+
+    Names are ``<UTC stamp>_<microseconds>-<random hex>``, so they sort by
+    start time, and the directory is created exclusively: concurrent runs
+    sharing a receipts root never get the same one.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    while True:
+        stamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S_%f")
+        run_dir = root / f"{stamp}-{secrets.token_hex(2)}"
+        try:
+            run_dir.mkdir()
+        except FileExistsError:
+            continue
+        return run_dir
+
+
+def list_runs(root: Path = Path("receipts")) -> list[Path]:
+    """Run directories under ``root``, oldest first (dot-dirs like ``.artifacts`` excluded)."""
+    if not root.exists():
+        return []
+    return sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+
+def iter_events(path: Path) -> Iterator[dict[str, Any]]:
+    """Events of a ``steps.jsonl`` file, one line at a time so memory does not grow with the run.
+
+    Blank and unparseable lines (say, a last line still being written) are skipped.
+    """
+    if not path.exists():
+        return
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except Exception:
+                pass
 
 
 @dataclass
 class ReceiptRun:
+    """One run's receipts directory.
+
+    ``steps.jsonl`` is written through a single open handle. Events are
+    buffered and written once ``flush_bytes`` is exceeded or ``flush_interval``
+    has passed (a timer covers quiet phases where nothing else is logged), at
+    ``write_summary``, ``close`` and interpreter exit.
+    ``durability`` picks what a crash can lose: ``"none"`` the unwritten
+    buffer, ``"flush"`` nothing (every event is handed to the OS at once),
+    ``"fsync"`` buffered like ``"none"`` but each checkpoint is fsynced.
+    Strings longer than ``artifacts.INLINE_LIMIT`` (tool output, diffs) are
+    stored as compressed artifacts and replaced by a short ref. Events are
+    also indexed in the receipts ``Catalog``, written in one transaction per
+    flush.
+    Each event carries ``t``, seconds since the run started, and streamed
+    tool output goes line by line to ``output.log`` so live viewers (see
+    ``ui.live``) can follow a run while it is in progress. ``on_event`` and
+    ``on_output``, when set, also receive each event and output line as it is
+    logged (the daemon streams them to its client).
+    """
+
     run_dir: Path
     steps_path: Path
     summary_path: Path
+    durability: str = "none"
+    flush_bytes: int = FLUSH_BYTES
+    flush_interval: float = FLUSH_INTERVAL
+    on_event: Callable[[dict[str, Any]], None] | None = field(default=None, repr=False)
+    on_output: Callable[[str, str], None] | None = field(default=None, repr=False)
     last_error: str | None = field(default=None, init=False)
+    catalog: Catalog | None = field(default=None, init=False, repr=False)
+    _seq: int = field(default=0, init=False, repr=False)
+    _buf: list[str] = field(default_factory=list, init=False, repr=False)
+    _buf_bytes: int = field(default=0, init=False, repr=False)
+    _last_flush: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _f: IO[str] | None = field(default=None, init=False, repr=False)
+    _out: IO[str] | None = field(default=None, init=False, repr=False)
+    _pending: list[tuple[int, dict[str, Any]]] = field(default_factory=list, init=False, repr=False)
+    _t0: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _timer: threading.Timer | None = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {', '.join(DURABILITY_MODES)}")
+        self.artifacts = ArtifactStore(self.run_dir)
+        atexit.register(self.close)
 
     @classmethod
-    def start_run(cls, meta: dict[str, Any] | None = None) -> ReceiptRun:
-        root = Path("receipts")
-        root.mkdir(parents=True, exist_ok=True)
-        run_dir = root / _now_stamp()
-        run_dir.mkdir(parents=True, exist_ok=True)
+    def start_run(
+        cls,
+        meta: dict[str, Any] | None = None,
+        durability: str | None = None,
+        root: str | Path = "receipts",
+    ) -> ReceiptRun:
+        if durability is None:
+            from .config import get_config
+
+            durability = get_config().receipts_durability
+        root = Path(root)
+        run_dir = new_run_dir(root)
         steps_path = run_dir / "steps.jsonl"
         summary_path = run_dir / "summary.md"
-        run = cls(run_dir=run_dir, steps_path=steps_path, summary_path=summary_path)
+        run = cls(
+            run_dir=run_dir,
+            steps_path=steps_path,
+            summary_path=summary_path,
+            durability=durability,
+        )
         if meta:
-            run.log_event({"type": "meta", **meta})
+            # The header goes straight to disk so even a run that dies at once is identifiable.
+            with steps_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps({"type": "meta", **meta}, ensure_ascii=False) + "\n")
+        try:
+            run.catalog = Catalog.open(root)
+            run.catalog.record_run(run_dir, meta)
+            if meta:
+                run._index({"type": "meta", **meta})
+            run._commit_index()
+        except sqlite3.Error as e:
+            run.last_error = f"catalog: {e}"
+            run.catalog = None
         return run
 
+    def _index(self, event: dict[str, Any]) -> None:
+        if self.catalog is not None:
+            self._pending.append((self._seq, event))
+        self._seq += 1
+
+    def _commit_index(self) -> None:
+        # Catalog rows are written in one short transaction per flush: runs sharing a
+        # receipts root would otherwise hold the SQLite write lock between flushes.
+        pending, self._pending = self._pending, []
+        if self.catalog is not None:
+            self.catalog.record_events(self.run_dir.name, pending)
+
     def log_event(self, event: dict[str, Any]) -> bool:
         try:
-            line = json.dumps(event, ensure_ascii=False)
-            with self.steps_path.open("a", encoding="utf-8") as f:
-                f.write(line + "\n")
+            event = self.artifacts.compact(event)
+            event.setdefault("t", round(time.monotonic() - self._t0, 3))
+            line = json.dumps(event, ensure_ascii=False) + "\n"
+            with self._lock:
+                if self._f is None:
+                    self._f = self.steps_path.open("a", encoding="utf-8")
+                self._buf.append(line)
+                self._buf_bytes += len(line)
+                self._index(event)
+                if (
+                    self.durability == "flush"
+                    or self._buf_bytes >= self.flush_bytes
+                    or time.monotonic() - self._last_flush >= self.flush_interval
+                ):
+                    self._flush()
+                elif self._timer is None:
+                    self._schedule_flush()
+            if self.on_event is not None:
+                self.on_event(event)
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+
+    def output(self, stream: str, line: str) -> None:
+        """Append one line of streamed tool output to ``output.log``.
+
+        Matches ``shell.LineCallback``. Lines go to the OS at once; buffered
+        events due by ``flush_interval`` are written too, so a viewer sees
+        progress during long tool calls.
+        """
+        try:
+            with self._lock:
+                if self._out is None:
+                    self._out = (self.run_dir / "output.log").open("a", encoding="utf-8")
+                self._out.write(f"[{stream}] {line}\n" if stream == "err" else line + "\n")
+                self._out.flush()
+                if self._buf and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._flush()
+            if self.on_output is not None:
+                self.on_output(stream, line)
+        except Exception as e:
+            self.last_error = str(e)
+
+    def _flush(self) -> None:
+        if self._f is None:
+            return
+        if self._buf:
+            self._f.write("".join(self._buf))
+            self._buf.clear()
+            self._buf_bytes = 0
+        self._f.flush()
+        if self.durability == "fsync":
+            os.fsync(self._f.fileno())
+        try:
+            self._commit_index()
+        except sqlite3.Error as e:
+            self.last_error = f"catalog: {e}"
+        self._last_flush = time.monotonic()
+
+    def _schedule_flush(self) -> None:
+        delay = max(0.0, self.flush_interval - (time.monotonic() - self._last_flush))
+        self._timer = threading.Timer(delay, self._timed_flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _timed_flush(self) -> None:
+        try:
+            with self._lock:
+                self._timer = None
+                if not self._buf or self._f is None:
+                    return
+                if time.monotonic() - self._last_flush < self.flush_interval:
+                    self._schedule_flush()  # flushed meanwhile: the buffer is not due yet
+                    return
+                self._flush()
+        except Exception as e:
+            self.last_error = str(e)
+
+    def flush(self) -> bool:
+        """Checkpoint: write buffered events (and fsync in ``"fsync"`` mode)."""
+        try:
+            with self._lock:
+                self._flush()
             return True
         except Exception as e:
             self.last_error = str(e)
             return False
 
-    def write_summary(self, title: str, lines: Iterable[str]) -> bool:
+    def close(self) -> bool:
+        ok = self.flush()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._f is not None:
+                try:
+                    self._f.close()
+                except Exception as e:
+                    self.last_error = str(e)
+                    ok = False
+                self._f = None
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+            if self.catalog is not None:
+                self.catalog.close()
+                self.catalog = None
+        atexit.unregister(self.close)
+        return ok
+
+    def write_summary(self, title: str, lines: Iterable[str], extra: str = "") -> bool:
+        """Write ``summary.md``: a bullet per line, then ``extra`` Markdown if given."""
+        flushed = self.flush()
         try:
             with self.summary_path.open("w", encoding="utf-8") as f:
                 f.write(f"# {title}\n\n")
                 for ln in lines:
                     f.write(f"- {ln}\n")
-            return True
+                if extra:
+                    f.write(f"\n{extra}")
+            return flushed
         except Exception as e:
             self.last_error = str(e)
             return False
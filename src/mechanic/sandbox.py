@@ -1,12 +1,92 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import errno
+import os
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass, field
 from pathlib import Path
 
+# Never mirrored into a scratch copy: VCS data, caches and mechanic's own state.
+SKIP_DIRS = {
+    ".git",
+    ".hg",
+    "__pycache__",
+    ".pytest_cache",
+    ".ruff_cache",
+    ".mypy_cache",
+    ".mechanic",
+    ".venv",
+    "node_modules",
+}
+
+FICLONE = 0x40049409  # linux/fs.h _IOW(0x94, 9, int)
+_NO_CLONE = {errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.EPERM}
+
+
+def _reflink(src: str, dst: Path) -> None:
+    import fcntl
+
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    shutil.copystat(src, dst)
+
+
+def _clone(src: str, dst: Path, mode: str, hardlinks: bool = False) -> str:
+    """Place ``src`` at ``dst`` using the cheapest mode that works; return that mode."""
+    if mode == "reflink":
+        try:
+            _reflink(src, dst)
+            return mode
+        except OSError as e:
+            if e.errno not in _NO_CLONE:
+                raise
+            dst.unlink(missing_ok=True)
+            mode = "hardlink" if hardlinks else "copy"
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return mode
+        except OSError:
+            mode = "copy"
+    shutil.copy2(src, dst)
+    return mode
+
+
+def cwd_relative(path: Path) -> str:
+    """``path`` relative to the working directory, or ``"."`` if it is outside it."""
+    try:
+        return path.resolve().relative_to(Path.cwd().resolve()).as_posix()
+    except ValueError:
+        return "."
+
+
+def _stamp(st: os.stat_result) -> tuple[int, int, int]:
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _replace_file(src: Path, dst: Path) -> None:
+    """Copy ``src`` over ``dst`` via a temp file and an atomic rename."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{dst.name}.", suffix=".tmp", dir=dst.parent)
+    os.close(fd)
+    try:
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
 
 @dataclass
 class Sandbox:
     root: Path
+    # Set on scratch copies made by ``scratch()``.
+    origin: Path | None = None
+    base: Path | None = None
+    mode: str | None = None
+    manifest: dict[str, tuple[int, int, int]] = field(default_factory=dict, repr=False)
 
     @classmethod
     def from_path(cls, path: str | Path) -> Sandbox:
@@ -14,6 +94,99 @@ class Sandbox:
 
     def within(self, rel: str | Path) -> Path:
         p = (self.root / rel).resolve()
-        if not str(p).startswith(str(self.root)):
+        if not p.is_relative_to(self.root):
             raise PermissionError("Path escapes sandbox root")
         return p
+
+    def scratch(
+        self, at: str = ".", dir: str | Path | None = None, hardlinks: bool = False
+    ) -> Sandbox:
+        """Make a cheap scratch copy of ``root`` and return a sandbox for it.
+
+        Files are reflinked where the filesystem supports it (copy-on-write:
+        no file data is copied), else copied; only directories are created for
+        real. The copy is placed at ``at`` under a fresh temp directory
+        (``base``), so paths relative to the caller's working directory keep
+        working inside it. Creating it still walks the whole tree and costs a
+        few syscalls per file; only the data copying scales with what changes.
+
+        ``hardlinks=True`` links files instead of copying them when reflinks
+        are unavailable. A linked file shares its inode with the original, so
+        it is only safe when nothing opens files for in-place writing: not
+        for running a target's own tests. Write through ``own()`` or replace
+        files by rename (as the patch applier does).
+        """
+        base = Path(tempfile.mkdtemp(prefix="mechanic-scratch-", dir=dir)).resolve()
+        box = Sandbox(root=base / at, origin=self.root, base=base)
+        if sys.platform.startswith("linux"):
+            mode = "reflink"
+        else:
+            mode = "hardlink" if hardlinks else "copy"
+        try:
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+                rel_dir = os.path.relpath(dirpath, self.root)
+                out = box.root / rel_dir
+                out.mkdir(parents=True, exist_ok=True)
+                for name in [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]:
+                    os.symlink(os.readlink(os.path.join(dirpath, name)), out / name)
+                for name in filenames:
+                    src = os.path.join(dirpath, name)
+                    if os.path.islink(src):
+                        os.symlink(os.readlink(src), out / name)
+                        continue
+                    mode = _clone(src, out / name, mode, hardlinks)
+                    rel = Path(rel_dir, name).as_posix()
+                    box.manifest[rel] = _stamp(os.stat(out / name))
+        except BaseException:
+            shutil.rmtree(base, ignore_errors=True)
+            raise
+        box.mode = mode
+        return box
+
+    def own(self, rel: str | Path) -> Path:
+        """Break any link shared with the origin so ``rel`` can be modified in place."""
+        p = self.within(rel)
+        if p.exists() and p.stat().st_nlink > 1:
+            _replace_file(p, p)
+            self.manifest[p.relative_to(self.root).as_posix()] = _stamp(p.stat())
+        return p
+
+    def changed_files(self) -> list[str]:
+        """Paths (relative to ``root``) added, modified or deleted since ``scratch()``."""
+        seen: set[str] = set()
+        changed: list[str] = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            rel_dir = os.path.relpath(dirpath, self.root)
+            for name in filenames:
+                if name.endswith((".pyc", ".pyo")) or os.path.islink(os.path.join(dirpath, name)):
+                    continue
+                rel = Path(rel_dir, name).as_posix()
+                seen.add(rel)
+                try:
+                    stamp = _stamp(os.stat(os.path.join(dirpath, name)))
+                except FileNotFoundError:
+                    continue
+                if self.manifest.get(rel) != stamp:
+                    changed.append(rel)
+        changed += [rel for rel in self.manifest if rel not in seen]
+        return sorted(changed)
+
+    def sync_back(self, files: list[str] | None = None) -> list[str]:
+        """Copy changed files (or just ``files``) back to ``origin`` and return them."""
+        if self.origin is None:
+            raise ValueError("not a scratch sandbox")
+        dest = Sandbox(self.origin)
+        synced = self.changed_files() if files is None else sorted(files)
+        for rel in synced:
+            src, dst = self.within(rel), dest.within(rel)
+            if src.exists():
+                _replace_file(src, dst)
+            else:
+                dst.unlink(missing_ok=True)
+        return synced
+
+    def cleanup(self) -> None:
+        if self.base is not None:
+            shutil.rmtree(self.base, ignore_errors=True)
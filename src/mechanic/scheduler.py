@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+from . import trace
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: Callable[[], Any]
+    after: tuple[str, ...] = ()
+
+
+def run_stages(stages: Iterable[Stage], max_workers: int | None = None) -> dict[str, Any]:
+    """Run stages on a bounded thread pool, each as soon as its dependencies finish.
+
+    Stages are expected to be dominated by subprocess time, so threads are
+    enough. Results are returned keyed by stage name in declaration order,
+    independent of completion order. Each stage is a ``stage`` span when
+    tracing is on. The first stage error is re-raised once
+    running stages have finished; stages not yet started are skipped.
+    """
+    pending = list(stages)
+    names = [s.name for s in pending]
+    known = set(names)
+    for s in pending:
+        missing = [d for d in s.after if d not in known]
+        if missing:
+            raise ValueError(f"stage {s.name!r} depends on unknown stages: {', '.join(missing)}")
+
+    results: dict[str, Any] = {}
+    running: dict[Future[Any], str] = {}
+    error: BaseException | None = None
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(pending))) as pool:
+        while pending or running:
+            if error is None:
+                ready = [s for s in pending if all(d in results for d in s.after)]
+                for s in ready:
+                    pending.remove(s)
+                    running[pool.submit(trace.bind(_traced(s)))] = s.name
+            if not running:
+                if pending and error is None:
+                    raise ValueError(
+                        "stage dependency cycle: " + ", ".join(s.name for s in pending)
+                    )
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                try:
+                    results[name] = fut.result()
+                except BaseException as e:
+                    error = error or e
+    if error is not None:
+        raise error
+    return {n: results[n] for n in names}
+
+
+def _traced(stage: Stage) -> Callable[[], Any]:
+    def call() -> Any:
+        with trace.span(stage.name, "stage"):
+            return stage.fn()
+
+    return call
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Sequence
+from pathlib import Path
+
+from .tools import git_tool
+
+
+class Snapshot:
+    """Pre-patch contents of the files a plan will touch, scoped to ``root``.
+
+    Inside a git work tree the contents are stored as a git tree object
+    written through a temporary index (no commit, the user's index and branch
+    are untouched); elsewhere they are kept in memory. ``restore`` puts back
+    only the snapshotted files and removes those that did not exist.
+    """
+
+    def __init__(self, root: Path, files: list[str]) -> None:
+        self.root = root
+        self.files = sorted(set(files))
+        self.absent = {f for f in self.files if not (root / f).exists()}
+        self.tree: str | None = None
+        self._blobs: dict[str, bytes] = {}
+
+    @classmethod
+    def take(cls, root: str | Path, files: list[str], use_git: bool = True) -> Snapshot:
+        snap = cls(Path(root).resolve(), files)
+        present = [f for f in snap.files if f not in snap.absent]
+        if use_git:
+            snap.tree = git_tool.snapshot_tree(snap.root, present)
+        if snap.tree is None:
+            snap._blobs = {f: (snap.root / f).read_bytes() for f in present}
+        return snap
+
+    def restore(self, files: list[str] | None = None) -> list[str]:
+        wanted = self.files if files is None else sorted(set(files) & set(self.files))
+        present = [f for f in wanted if f not in self.absent]
+        if self.tree is not None:
+            if not git_tool.restore_tree(self.root, self.tree, present):
+                raise OSError(f"could not restore files from git tree {self.tree}")
+        else:
+            for f in present:
+                path = self.root / f
+                if not path.exists() or path.read_bytes() != self._blobs[f]:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    path.write_bytes(self._blobs[f])
+        for f in wanted:
+            if f in self.absent:
+                (self.root / f).unlink(missing_ok=True)
+        return wanted
+
+
+def bisect_culprits(stack: Sequence[int], is_bad: Callable[[list[int]], bool]) -> list[int]:
+    """Find the patches in ``stack`` that cause a regression the whole stack shows.
+
+    ``is_bad(subset)`` applies just ``subset`` to a clean tree and reports
+    whether the regression shows up. Halves are searched recursively, so k
+    culprits among n patches cost about 2k·log2(n) checks. When neither half
+    is bad on its own the patches only fail together and the group is returned.
+    """
+    items = list(stack)
+    if len(items) <= 1:
+        return items
+    mid = len(items) // 2
+    culprits: list[int] = []
+    for half in (items[:mid], items[mid:]):
+        if is_bad(half):
+            culprits += bisect_culprits(half, is_bad)
+    return culprits or items
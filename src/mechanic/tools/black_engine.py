@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import atexit
+import dataclasses
+import difflib
+import io
+import multiprocessing as mp
+import os
+import re
+import threading
+import tokenize
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# Fewer files than this are formatted inline: a pool worker's first black import costs
+# more than formatting a handful of files.
+POOL_MIN_FILES = 8
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+@dataclass
+class FormatRecord:
+    """black's verdict on one file.
+
+    ``diff`` is a unified diff (``a/``/``b/`` paths as given) from the file to
+    its formatted contents, which ``patches.apply_patches`` can apply with
+    the same ``root``; empty when the file is already formatted or failed.
+    """
+
+    path: str
+    changed: bool = False
+    diff: str = ""
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"path": self.path, "changed": self.changed, "error": self.error}
+
+
+def available() -> bool:
+    try:
+        import black  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def load_mode(root: str | Path) -> Any:
+    """``black.Mode`` from the ``[tool.black]`` table black itself would find for ``root``."""
+    import black
+
+    config: dict[str, Any] = {}
+    found = black.find_pyproject_toml((str(Path(root).resolve()),))
+    if found:
+        try:
+            config = black.parse_pyproject_toml(found)
+        except (OSError, ValueError):
+            config = {}
+    return black.Mode(
+        target_versions={black.TargetVersion[v.upper()] for v in config.get("target_version", [])},
+        line_length=int(config.get("line_length", black.DEFAULT_LINE_LENGTH)),
+        string_normalization=not config.get("skip_string_normalization", False),
+        magic_trailing_comma=not config.get("skip_magic_trailing_comma", False),
+        preview=bool(config.get("preview", False)),
+    )
+
+
+def _read(path: Path) -> str:
+    """Source text as black sees it: PEP 263 encoding, universal newlines."""
+    data = path.read_bytes()
+    encoding, _ = tokenize.detect_encoding(io.BytesIO(data).readline)
+    return io.TextIOWrapper(io.BytesIO(data), encoding).read()
+
+
+def format_file(root: str | Path, path: str, mode: Any) -> FormatRecord:
+    """Format ``root / path`` in memory; the file itself is left untouched."""
+    import black
+
+    rec = FormatRecord(path)
+    try:
+        src = _read(Path(root) / path)
+        if path.endswith(".pyi"):
+            mode = dataclasses.replace(mode, is_pyi=True)
+        dst = black.format_file_contents(src, fast=False, mode=mode)
+    except black.NothingChanged:
+        return rec
+    except Exception as e:
+        rec.error = f"{type(e).__name__}: {e}".strip()
+        return rec
+    rec.changed = True
+    diff = difflib.unified_diff(
+        src.splitlines(), dst.splitlines(), f"a/{path}", f"b/{path}", lineterm=""
+    )
+    rec.diff = "\n".join(diff) + "\n"
+    return rec
+
+
+def _get_pool(jobs: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: callers run this from worker threads (scheduler stages).
+            _pool = ProcessPoolExecutor(max_workers=jobs, mp_context=mp.get_context("spawn"))
+        return _pool
+
+
+@atexit.register
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def format_files(
+    root: str | Path,
+    files: Sequence[str],
+    mode: Any = None,
+    exclude: str | None = None,
+    jobs: int = 0,
+) -> list[FormatRecord]:
+    """Format ``files`` (relative to ``root``) with black's API, in a process pool if many.
+
+    ``exclude`` is a black ``--force-exclude`` regex matched against
+    ``/``-prefixed relative paths; excluded files are left out of the result.
+    The pool is created on first use and kept for the life of the process.
+    """
+    mode = mode if mode is not None else load_mode(root)
+    if exclude:
+        pattern = re.compile(exclude)
+        files = [f for f in files if not pattern.search("/" + f)]
+    if len(files) < POOL_MIN_FILES:
+        return [format_file(root, f, mode) for f in files]
+    workers = jobs or os.cpu_count() or 1
+    chunk = max(1, len(files) // (4 * workers))
+    n = len(files)
+    return list(_get_pool(workers).map(format_file, [root] * n, files, [mode] * n, chunksize=chunk))
+
+
+def exit_code(records: Sequence[FormatRecord]) -> int:
+    """``black --check`` exit status: 123 on any error, else 1 if anything would change."""
+    if any(r.error for r in records):
+        return 123
+    return 1 if any(r.changed for r in records) else 0
@@ -1,13 +1,137 @@
 from __future__ import annotations
 
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from .shell import run as shell_run
 
+if TYPE_CHECKING:
+    from ..lintcache import Checked
 
-def run(path: str | Path = ".", check: bool = True) -> dict[str, object]:
+try:
+    import tomllib
+except Exception:  # pragma: no cover
+    tomllib = None  # type: ignore
+
+
+def run(path: str | Path = ".", check: bool = True, cache: bool = False) -> dict[str, object]:
+    """``black`` on ``path`` (``--check`` by default).
+
+    With ``cache`` (check mode only) just the files changed since their
+    verdict was cached (see ``lintcache``) are checked, in-process through
+    ``black_engine`` when black is importable; the result then has a
+    ``cache`` entry with hit/miss counts.
+    """
+    if cache and check:
+        from ..lintcache import run_cached
+
+        res = run_cached("black", "check", path, lambda files: _check(path, files), _render)
+        if res is not None:
+            return res
     args = ["black", str(path)]
     if check:
         args.append("--check")
     res = shell_run(args, cwd=path)
-    return {"code": res.get("code", -1), "out": res.get("out", ""), "err": res.get("err", "")}
+    return {
+        "code": res.get("code", -1),
+        "out": res.get("out", ""),
+        "err": res.get("err", ""),
+        "duration": res.get("duration"),
+    }
+
+
+def force_exclude(root: str | Path) -> str | None:
+    """black's exclude patterns as one ``--force-exclude`` regex.
+
+    black applies ``exclude``/``extend-exclude`` only while walking
+    directories, so they must be forced when files are named explicitly.
+    """
+    if tomllib is None:
+        return None
+    try:
+        data = tomllib.loads((Path(root) / "pyproject.toml").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    cfg = data.get("tool", {}).get("black", {})
+    keys = ("exclude", "extend-exclude", "extend_exclude", "force-exclude", "force_exclude")
+    patterns = [str(cfg[k]).strip() for k in keys if cfg.get(k)]
+    if not patterns:
+        return None
+    # Multi-line patterns are written for black's verbose mode; keep that meaning.
+    flags = "(?x)" if any("\n" in p for p in patterns) else ""
+    return flags + "|".join(f"(?:{p})" for p in patterns)
+
+
+def _check(root: str | Path, files: list[str]) -> Checked:
+    from . import black_engine
+
+    if not black_engine.available():
+        return _check_cli(root, files)
+    start = time.monotonic()
+    records = black_engine.format_files(root, files, exclude=force_exclude(root))
+    diags = {
+        r.path: [
+            f"error: cannot format {r.path}: {r.error}" if r.error else f"would reformat {r.path}"
+        ]
+        for r in records
+        if r.error or r.changed
+    }
+    res = {
+        "code": black_engine.exit_code(records),
+        "out": "",
+        "err": "",
+        "duration": round(time.monotonic() - start, 3),
+    }
+    return res, diags, {r.path for r in records if r.error}
+
+
+def _check_cli(root: str | Path, files: list[str]) -> Checked:
+    args = ["black", "--check"]
+    exclude = force_exclude(root)
+    if exclude:
+        args += ["--force-exclude", exclude]
+    res = shell_run(args + ["--", *files], cwd=root)
+    if res.get("code") not in (0, 1, 123):
+        return res, None, set()
+    diags: dict[str, list[str]] = {}
+    failed: set[str] = set()
+    block: list[str] | None = None  # lines of the error being read
+    for line in str(res.get("err", "")).splitlines():
+        if line.startswith("would reformat "):
+            rel = Path(line.removeprefix("would reformat ").strip()).as_posix()
+            diags[rel] = [f"would reformat {rel}"]
+            block = None
+        elif line.startswith("error: "):
+            # "error: cannot format <file>: ..." (or "cannot parse: <file>:1:4" in newer black)
+            rel = next((f for f in files if f in line), None)
+            block = None
+            if rel is not None:
+                block = diags[rel] = [line]
+                failed.add(rel)
+        elif block is not None and line.strip() and not line.startswith(("Oh no!", "All done!")):
+            block.append(line)
+        else:
+            block = None
+    if res.get("code") == 123 and not failed:
+        return res, None, set()
+    return res, diags, failed
+
+
+def _files(n: int) -> str:
+    return f"{n} file{'' if n == 1 else 's'}"
+
+
+def _render(diags: dict[str, list[str]], files: int) -> tuple[str, str]:
+    bad = sum(1 for lines in diags.values() if lines and lines[0].startswith("error: "))
+    reformat = sum(1 for lines in diags.values() if lines and not lines[0].startswith("error: "))
+    unchanged = files - bad - reformat
+    if not bad and not reformat:
+        return "", f"All done! ✨ \U0001f370 ✨\n{_files(unchanged)} would be left unchanged.\n"
+    lines = [line for f in sorted(diags) for line in diags[f]]
+    summary = (
+        f"{_files(reformat)} would be reformatted, {_files(unchanged)} would be left unchanged"
+    )
+    if bad:
+        summary += f", {_files(bad)} would fail to reformat"
+    return "", "\n".join(lines) + f"\n\nOh no! \U0001f4a5 \U0001f494 \U0001f4a5\n{summary}.\n"
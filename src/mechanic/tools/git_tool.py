@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import os
+import tempfile
 from pathlib import Path
 
 from .shell import run as shell_run
@@ -27,3 +29,37 @@ def init_and_commit(msg: str, cwd: str | Path = ".") -> dict[str, object]:
     outputs.append(str(res_commit.get("out", "")))
     errors.append(str(res_commit.get("err", "")))
     return {"code": code, "out": "\n".join(outputs).strip(), "err": "\n".join(errors).strip()}
+
+
+def _with_index(root: Path, cmds: list[list[str]]) -> list[dict[str, object]] | None:
+    """Run git commands against a throwaway index file; None on the first failure."""
+    with tempfile.TemporaryDirectory(prefix="mechanic-index-") as tmp:
+        env = {**os.environ, "GIT_INDEX_FILE": os.path.join(tmp, "index")}
+        out: list[dict[str, object]] = []
+        for cmd in cmds:
+            res = shell_run(["git"] + cmd, cwd=root, env=env)
+            if int(res.get("code", 1)) != 0:
+                return None
+            out.append(res)
+        return out
+
+
+def snapshot_tree(root: str | Path, paths: list[str]) -> str | None:
+    """Store ``paths`` (relative to ``root``) as a git tree object and return its id.
+
+    Uses a temporary index, so the user's index, branch and history are left
+    alone; only blobs for ``paths`` are hashed. Returns None outside a git repo.
+    """
+    cmds = [["add", "-f", "--"] + paths] if paths else []
+    res = _with_index(Path(root), cmds + [["write-tree"]])
+    if res is None:
+        return None
+    return str(res[-1].get("out", "")).strip() or None
+
+
+def restore_tree(root: str | Path, tree: str, paths: list[str]) -> bool:
+    """Check ``paths`` out of ``tree`` into the working tree without touching the index."""
+    if not paths:
+        return True
+    cmds = [["read-tree", tree], ["checkout-index", "-f", "--"] + paths]
+    return _with_index(Path(root), cmds) is not None
@@ -0,0 +1,200 @@
+"""pytest plugin that writes one compact JSON record per test outcome.
+
+Loaded with ``-p mechanic.tools.pytest_plugin --mechanic-report PATH``. Each
+line of PATH is a record with ``nodeid``, ``outcome``, ``when``, ``duration``,
+``exc_type``, ``file``, ``line`` and ``msg``. With ``--collect-only
+--mechanic-collect`` every collected test gets a ``collected`` record instead;
+``--mechanic-select FILE`` runs only the node IDs listed in FILE (one per line).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+import pytest
+
+_MSG_LIMIT = 200
+
+
+def _outcome(report: Any) -> str:
+    if hasattr(report, "wasxfail"):
+        return "xfailed" if report.skipped else "xpassed"
+    if report.failed and report.when != "call":
+        return "error"
+    return str(report.outcome)
+
+
+class ReportLog:
+    """Paths and node IDs are written relative to the invocation directory so
+    they can be passed straight back to pytest from the same working directory."""
+
+    def __init__(self, path: str, rootdir: str, invocation_dir: str) -> None:
+        self.rootdir = rootdir
+        self.invocation_dir = invocation_dir
+        # Line buffered so readers can follow the file while the run is in progress.
+        self._f = open(path, "w", encoding="utf-8", buffering=1)
+
+    def _write(self, rec: dict[str, Any]) -> None:
+        self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def _rel(self, path: str) -> str:
+        if self.rootdir == self.invocation_dir:
+            return path.replace("\\", "/")
+        full = os.path.join(self.rootdir, path)
+        return os.path.relpath(full, self.invocation_dir).replace("\\", "/")
+
+    def _nodeid(self, nodeid: str) -> str:
+        path, sep, rest = nodeid.partition("::")
+        return self._rel(path) + sep + rest if path else nodeid
+
+    def _record(self, report: Any, outcome: str) -> dict[str, Any]:
+        file, line = self._rel(report.location[0]), report.location[1]
+        crash = getattr(report.longrepr, "reprcrash", None)
+        msg = ""
+        if crash is not None:
+            file = self._rel(os.path.relpath(crash.path, self.rootdir))
+            line = crash.lineno
+            msg = (crash.message or "").splitlines()[0] if crash.message else ""
+        elif isinstance(report.longrepr, tuple):  # skips: (path, lineno, reason)
+            msg = str(report.longrepr[2])
+        return {
+            "nodeid": self._nodeid(report.nodeid),
+            "outcome": outcome,
+            "when": report.when,
+            "duration": round(float(getattr(report, "duration", 0.0)), 6),
+            "exc_type": getattr(report, "mechanic_exc_type", None),
+            "file": file or None,
+            "line": line,
+            "msg": msg[:_MSG_LIMIT],
+        }
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item: Any, call: Any):  # type: ignore[no-untyped-def]
+        outcome = yield
+        report = outcome.get_result()
+        if call.excinfo is not None:
+            report.mechanic_exc_type = call.excinfo.typename
+
+    def pytest_runtest_logreport(self, report: Any) -> None:
+        # One record per test: the call phase, or the setup/teardown phase that broke it.
+        if report.when == "call" or (report.when == "setup" and not report.passed):
+            self._write(self._record(report, _outcome(report)))
+        elif report.when == "teardown" and report.failed:
+            self._write(self._record(report, "error"))
+
+    def pytest_collectreport(self, report: Any) -> None:
+        if report.failed:
+            crash = getattr(report.longrepr, "reprcrash", None)
+            lines = str(getattr(crash, "message", "") or report.longrepr).strip().splitlines()
+            self._write(
+                {
+                    "nodeid": self._nodeid(report.nodeid),
+                    "outcome": "error",
+                    "when": "collect",
+                    "duration": 0.0,
+                    "exc_type": None,
+                    "file": self._rel(report.nodeid.split("::")[0]) if report.nodeid else None,
+                    "line": getattr(crash, "lineno", None),
+                    "msg": lines[-1][:_MSG_LIMIT] if lines else "",
+                }
+            )
+
+    def pytest_unconfigure(self) -> None:
+        self._f.close()
+
+
+class Collected:
+    """Write a ``collected`` record per test left after collection and deselection."""
+
+    def __init__(self, log: ReportLog) -> None:
+        self.log = log
+
+    def pytest_collection_finish(self, session: Any) -> None:
+        for item in session.items:
+            file, line, _ = item.location
+            self.log._write(
+                {
+                    "nodeid": self.log._nodeid(item.nodeid),
+                    "outcome": "collected",
+                    "when": "collect",
+                    "duration": 0.0,
+                    "exc_type": None,
+                    "file": self.log._rel(file),
+                    "line": line,
+                    "msg": "",
+                }
+            )
+
+
+class Selection:
+    """Deselect every test whose (invocation-relative) node ID is not listed in ``path``."""
+
+    def __init__(self, log: ReportLog, path: str) -> None:
+        self.log = log
+        with open(path, encoding="utf-8") as f:
+            self.nodeids = {line.rstrip("\n") for line in f if line.strip()}
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config: Any, items: list[Any]) -> None:
+        keep, drop = [], []
+        for item in items:
+            (keep if self.log._nodeid(item.nodeid) in self.nodeids else drop).append(item)
+        if drop:
+            config.hook.pytest_deselected(items=drop)
+            items[:] = keep
+
+
+class CoverageContexts:
+    """Label coverage data with each test's (invocation-relative) node ID.
+
+    Requires coverage to be running, e.g. via pytest-cov's ``--cov``.
+    """
+
+    def __init__(self, log: ReportLog) -> None:
+        self.log = log
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item: Any, nextitem: Any):  # type: ignore[no-untyped-def]
+        import coverage
+
+        cov = coverage.Coverage.current()
+        if cov is not None:
+            cov.switch_context(self.log._nodeid(item.nodeid))
+        yield
+        if cov is not None:
+            cov.switch_context("")
+
+
+def pytest_addoption(parser: Any) -> None:
+    parser.addoption("--mechanic-report", default=None, help="Write per-test JSON records here")
+    parser.addoption(
+        "--mechanic-contexts",
+        action="store_true",
+        default=False,
+        help="Record a coverage context per test node ID",
+    )
+    parser.addoption(
+        "--mechanic-collect",
+        action="store_true",
+        default=False,
+        help="With --collect-only, write a record per collected test",
+    )
+    parser.addoption(
+        "--mechanic-select", default=None, help="Only run the node IDs listed in this file"
+    )
+
+
+def pytest_configure(config: Any) -> None:
+    path = config.getoption("--mechanic-report")
+    if path:
+        log = ReportLog(path, str(config.rootpath), str(config.invocation_params.dir))
+        config.pluginmanager.register(log, "mechanic-report")
+        if config.getoption("--mechanic-collect"):
+            config.pluginmanager.register(Collected(log), "mechanic-collect")
+        if config.getoption("--mechanic-select"):
+            selection = Selection(log, config.getoption("--mechanic-select"))
+            config.pluginmanager.register(selection, "mechanic-select")
+        if config.getoption("--mechanic-contexts"):
+            config.pluginmanager.register(CoverageContexts(log), "mechanic-contexts")
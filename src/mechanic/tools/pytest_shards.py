@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import configparser
+import heapq
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from ..impact import STATE_DIR, state_dir
+from . import pytest_tool
+from .shell import LineCallback
+
+DURATIONS_NAME = "durations.json"
+_VERSION = 1
+
+# Below this many tests per shard, a pytest process's startup and collection cost more than
+# the parallelism saves.
+MIN_SHARD_TESTS = 8
+# A shard that dies mid-run is resumed after the test that killed it at most this many times.
+MAX_CRASH_RERUNS = 3
+# More failures than this is a broken suite, not flakiness: they are not re-run.
+RERUN_LIMIT = 50
+# Estimated duration of a test with no recorded history and no known durations to borrow.
+DEFAULT_DURATION = 0.1
+
+
+class DurationStore:
+    """Recent call-phase duration per test, in ``<target>/.mechanic/durations.json``.
+
+    Keys are node IDs as reported by ``pytest_tool``. A new measurement is
+    averaged with the stored one, so one slow outlier does not skew later
+    shard plans.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root).resolve()
+        self.path = self.root / STATE_DIR / DURATIONS_NAME
+        self.tests: dict[str, float] = {}
+
+    @classmethod
+    def load(cls, root: str | Path) -> DurationStore:
+        store = cls(root)
+        try:
+            data = json.loads(store.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return store
+        if data.get("version") == _VERSION:
+            store.tests = data.get("tests", {})
+        return store
+
+    def save(self) -> None:
+        state_dir(self.root)
+        tmp = self.path.with_suffix(".tmp")
+        payload = {"version": _VERSION, "tests": self.tests}
+        tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def record(self, tests: Iterable[dict[str, Any]]) -> None:
+        for t in tests:
+            if t.get("when") != "call":
+                continue
+            old = self.tests.get(t["nodeid"])
+            d = float(t.get("duration") or 0.0)
+            self.tests[t["nodeid"]] = round(d if old is None else (old + d) / 2, 6)
+
+    def estimates(self, nodeids: Sequence[str]) -> list[float]:
+        """Expected duration of each test; unknown tests get the median of the known ones."""
+        known = [self.tests[n] for n in nodeids if n in self.tests]
+        default = statistics.median(known) if known else DEFAULT_DURATION
+        return [self.tests.get(n, default) for n in nodeids]
+
+
+def plan_shards(
+    nodeids: Sequence[str], estimates: Sequence[float], k: int
+) -> list[tuple[list[str], float]]:
+    """Split ``nodeids`` into at most ``k`` shards of similar total estimated duration.
+
+    Longest-processing-time-first: each test, slowest first, goes to the
+    currently lightest shard. Tests keep their collection order within a
+    shard. Returns (node IDs, estimated seconds) per non-empty shard.
+    """
+    heap = [(0.0, i) for i in range(max(1, k))]
+    assigned: list[list[int]] = [[] for _ in heap]
+    for idx in sorted(range(len(nodeids)), key=lambda i: (-estimates[i], i)):
+        load, shard = heapq.heappop(heap)
+        assigned[shard].append(idx)
+        heapq.heappush(heap, (load + estimates[idx], shard))
+    return [
+        ([nodeids[i] for i in sorted(idxs)], round(sum(estimates[i] for i in idxs), 6))
+        for idxs in assigned
+        if idxs
+    ]
+
+
+def _coverage_config(args: Sequence[str]) -> tuple[str, Path] | None:
+    """The ``--cov-config`` file in ``args`` and the coverage data file it names."""
+    rc = next((a.split("=", 1)[1] for a in args if a.startswith("--cov-config=")), None)
+    if rc is None:
+        return None
+    cfg = configparser.ConfigParser()
+    cfg.read(rc, encoding="utf-8")
+    return rc, Path(cfg.get("run", "data_file", fallback=".coverage"))
+
+
+def _own_coverage(args: list[str], parts: list[Path]) -> tuple[list[str], Path | None]:
+    """``args`` with coverage written to a data file of this process's own, added to ``parts``.
+
+    Concurrent pytest-cov sessions sharing one data file would overwrite each
+    other's measurements; ``_combine_coverage`` merges the parts afterwards.
+    Also returns the temporary config file to delete after the run.
+    """
+    found = _coverage_config(args)
+    if found is None:
+        return args, None
+    rc, data = found
+    tag = os.urandom(4).hex()
+    cfg = configparser.ConfigParser()
+    cfg.read(rc, encoding="utf-8")
+    if not cfg.has_section("run"):
+        cfg.add_section("run")
+    part = data.with_name(f"{data.name}.shard-{tag}")
+    cfg.set("run", "data_file", part.as_posix())
+    own_rc = Path(f"{rc}.shard-{tag}")
+    with own_rc.open("w", encoding="utf-8") as f:
+        cfg.write(f)
+    parts.append(part)
+    return [f"--cov-config={own_rc}" if a.startswith("--cov-config=") else a for a in args], own_rc
+
+
+def _combine_coverage(args: Sequence[str], parts: Sequence[Path]) -> None:
+    """Merge the shards' coverage data, contexts included, into the configured data file."""
+    from coverage import CoverageData
+
+    found = _coverage_config(args)
+    if found is None or not parts:
+        return
+    combined = CoverageData(basename=str(found[1]))
+    combined.erase()
+    for part in parts:
+        if part.exists():
+            data = CoverageData(basename=str(part))
+            data.read()
+            combined.update(data)
+            part.unlink()
+    combined.write()
+
+
+def _run_selected(
+    path: str | Path,
+    args: list[str],
+    nodeids: Sequence[str],
+    on_line: LineCallback | None = None,
+    parts: list[Path] | None = None,
+) -> dict[str, Any]:
+    fd, select = tempfile.mkstemp(prefix="mechanic-shard-", suffix=".txt")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("".join(n + "\n" for n in nodeids))
+    own_rc = None
+    if parts is not None:
+        args, own_rc = _own_coverage(args, parts)
+    try:
+        return pytest_tool.run(path, args + [f"--mechanic-select={select}"], on_line=on_line)
+    finally:
+        os.unlink(select)
+        if own_rc is not None:
+            own_rc.unlink()
+
+
+def _crashed(nodeid: str, code: object, msg: str) -> dict[str, Any]:
+    return {
+        "nodeid": nodeid,
+        "outcome": "error",
+        "when": "crash",
+        "duration": 0.0,
+        "exc_type": None,
+        "file": nodeid.split("::", 1)[0],
+        "line": None,
+        "msg": f"{msg} (pytest exit code {code})",
+    }
+
+
+def merge_codes(codes: Iterable[object], tests: Sequence[dict[str, Any]]) -> int:
+    """Exit status for several pytest processes' results merged into ``tests``.
+
+    The worst abnormal status wins: killed or timed out (negative), then the
+    highest of interrupted (2), internal error (3) and usage error (4).
+    Otherwise 1 on any failure, 0 if tests ran and 5 if none did.
+    """
+    bad = [c for c in (int(c) if isinstance(c, int) else -1 for c in codes) if c not in (0, 1, 5)]
+    if bad:
+        return min(bad) if min(bad) < 0 else max(bad)
+    if any(t["outcome"] in pytest_tool.FAILED_OUTCOMES for t in tests):
+        return 1
+    return 0 if tests else 5
+
+
+def _finish_crashed(
+    path: str | Path,
+    args: list[str],
+    res: dict[str, Any],
+    nodeids: list[str],
+    on_line: LineCallback | None,
+    parts: list[Path],
+) -> tuple[list[dict[str, Any]], list[str], list[object]]:
+    """Records for a shard's tests, resuming it after each test that killed the process.
+
+    The report is written as tests finish, so the first assigned test without
+    a record is the one that was running when pytest died. Also returns the
+    exit status of every process the shard took.
+    """
+    tests, crashed, codes = list(res.get("tests", [])), [], [res.get("code")]
+    for attempt in range(MAX_CRASH_RERUNS + 1):
+        seen = {t["nodeid"] for t in tests}
+        missing = [n for n in nodeids if n not in seen]
+        if not missing or res.get("code") in (0, 1, 5):
+            break
+        code = res.get("code")
+        crashed.append(missing[0])
+        tests.append(_crashed(missing[0], code, "pytest process died running this test"))
+        rest = missing[1:]
+        if rest and attempt == MAX_CRASH_RERUNS:
+            tests += [_crashed(n, code, "not run: shard kept crashing") for n in rest]
+            break
+        if rest:
+            res = _run_selected(path, args, rest, on_line, parts)
+            tests += res.get("tests", [])
+            codes.append(res.get("code"))
+    return tests, crashed, codes
+
+
+def run_sharded(
+    path: str | Path,
+    extra_args: list[str] | None = None,
+    shards: int = 0,
+    on_line: LineCallback | None = None,
+    reruns: int = 1,
+) -> dict[str, Any]:
+    """Run pytest on ``path`` split across ``shards`` processes (0 = CPU count).
+
+    Collected node IDs are balanced over the shards by their recorded
+    durations (``DurationStore``), which this run then updates. Results have
+    the same shape as ``pytest_tool.run``, in collection order, plus
+    ``flaky`` (failed, then passed when re-run alone, up to ``reruns``
+    rounds) and ``shards`` (per-shard plan and timing, and tests
+    that crashed their process). A test that kills its shard is reported as
+    an error and the shard resumes after it. Flaky tests keep their failed
+    record, marked ``"flaky": true``; callers decide whether to discount
+    them. Runs serially when collection fails or the suite is small. With
+    a ``--cov-config`` in ``extra_args`` (``ImpactIndex.pytest_args``) each
+    process records coverage to its own data file, and the files are
+    combined into the configured one at the end.
+    """
+    start = time.monotonic()
+    args = list(extra_args or [])
+    store = DurationStore.load(path)
+    k = shards or os.cpu_count() or 1
+    collected: dict[str, Any] = {}
+    if k > 1:
+        no_cov = ["--no-cov"] if _coverage_config(args) else []
+        collected = pytest_tool.run(path, args + no_cov + ["--collect-only", "--mechanic-collect"])
+    nodeids = [t["nodeid"] for t in collected.get("tests", []) if t["outcome"] == "collected"]
+    k = min(k, len(nodeids) // MIN_SHARD_TESTS)
+    if k <= 1 or collected.get("code") != 0 or collected.get("failures"):
+        res = pytest_tool.run(path, args, on_line=on_line)
+        store.record(res.get("tests", []))
+        store.save()
+        return res
+
+    plan = plan_shards(nodeids, store.estimates(nodeids), k)
+    if "no:cacheprovider" not in args:
+        # Concurrent sessions would race on .pytest_cache.
+        args += ["-p", "no:cacheprovider"]
+    lock = threading.Lock()
+
+    def _on_line(stream: str, line: str) -> None:
+        if on_line is not None:
+            with lock:
+                on_line(stream, line)
+
+    parts: list[Path] = []
+    with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+        results = list(pool.map(lambda s: _run_selected(path, args, s[0], _on_line, parts), plan))
+
+    tests: list[dict[str, Any]] = []
+    crashed: list[str] = []
+    codes: list[object] = []
+    for (ids, _), res in zip(plan, results, strict=True):
+        shard_tests, shard_crashed, shard_codes = _finish_crashed(
+            path, args, res, ids, _on_line, parts
+        )
+        tests += shard_tests
+        crashed += shard_crashed
+        codes += shard_codes
+    store.record(tests)
+
+    flaky: list[str] = []
+    for _ in range(reruns):
+        failed = [
+            t["nodeid"]
+            for t in tests
+            if t["outcome"] in pytest_tool.FAILED_OUTCOMES
+            and t["when"] in ("setup", "call")
+            and not t.get("flaky")
+        ]
+        if not failed or len(failed) > RERUN_LIMIT:
+            break
+        again = _run_selected(path, args, failed, on_line, parts).get("tests", [])
+        passed = {t["nodeid"] for t in again if t["outcome"] == "passed"}
+        if not passed:
+            break
+        # The failure stands: it may depend on test order or shared state, which is a bug too.
+        tests = [{**t, "flaky": True} if t["nodeid"] in passed else t for t in tests]
+        flaky += sorted(passed)
+
+    _combine_coverage(args, parts)
+    order = {n: i for i, n in enumerate(nodeids)}
+    tests.sort(key=lambda t: order.get(t["nodeid"], len(order)))
+    store.save()
+    counts: dict[str, int] = {}
+    for t in tests:
+        counts[t["outcome"]] = counts.get(t["outcome"], 0) + 1
+    failures = [t for t in tests if t["outcome"] in pytest_tool.FAILED_OUTCOMES]
+    rss = [r["peak_rss"] for r in results if r.get("peak_rss")]
+    return {
+        "code": merge_codes(codes, tests),
+        "failures": failures,
+        "tests": tests,
+        "counts": counts,
+        "duration": round(time.monotonic() - start, 3),
+        "peak_rss": max(rss) if rss else None,
+        "flaky": flaky,
+        "shards": {
+            "count": len(plan),
+            "tests": [len(ids) for ids, _ in plan],
+            "estimated": [est for _, est in plan],
+            "durations": [r.get("duration") for r in results],
+            "crashed": crashed,
+        },
+    }
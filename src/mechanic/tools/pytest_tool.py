@@ -1,17 +1,36 @@
 from __future__ import annotations
 
+import json
+import os
 import re
+import tempfile
+import threading
 from pathlib import Path
+from typing import IO, Any
 
+from .shell import LineCallback
 from .shell import run as shell_run
 
 _LOC_RE = re.compile(r"^(?P<file>[^:\n]+):(?P<line>\d+):(?:\s+in\s+.*)?")
 
+FAILED_OUTCOMES = frozenset({"failed", "error"})
+_SRC_ROOT = Path(__file__).resolve().parents[2]
 
-def run(path: str | Path, extra_args: list[str] | None = None) -> dict[str, object]:
-    args = ["pytest", "-q"] + (extra_args or [])
-    res = shell_run(args, cwd=path)
-    text = f"{res.get('out','')}{res.get('err','')}"
+
+def plugin_env(env: dict[str, str] | None = None) -> dict[str, str]:
+    """Environment that lets a target's pytest import ``mechanic.tools.pytest_plugin``."""
+    out = dict(os.environ if env is None else env)
+    out["PYTHONPATH"] = os.pathsep.join(p for p in (str(_SRC_ROOT), out.get("PYTHONPATH", "")) if p)
+    return out
+
+
+def failed_nodeids(results: dict[str, Any]) -> set[str]:
+    """Node IDs of failed/errored tests in a ``run()`` result."""
+    return {t["nodeid"] for t in results.get("tests", []) if t["outcome"] in FAILED_OUTCOMES}
+
+
+def _parse_failures(text: str) -> list[dict[str, object]]:
+    """Fallback failure scraping for runs where the report plugin did not load."""
     failures: list[dict[str, object]] = []
     last_loc = None
     for line in text.splitlines():
@@ -22,4 +41,110 @@ def run(path: str | Path, extra_args: list[str] | None = None) -> dict[str, obje
         if last_loc and line.strip():
             failures.append({**last_loc, "msg": line.strip()})
             last_loc = None
-    return {"code": int(res.get("code", -1)), "failures": failures}
+    return failures
+
+
+class ReportFollower:
+    """Incrementally reads records from a ``--mechanic-report`` file as pytest writes it."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.tests: list[dict[str, Any]] = []
+        self.counts: dict[str, int] = {}
+        self._f: IO[str] | None = None
+        self._partial = ""
+        self._lock = threading.Lock()
+
+    def poll(self) -> list[dict[str, Any]]:
+        # Called from both output pump threads.
+        with self._lock:
+            return self._poll()
+
+    def _poll(self) -> list[dict[str, Any]]:
+        if self._f is None:
+            try:
+                self._f = self.path.open(encoding="utf-8")
+            except OSError:
+                return []
+        new: list[dict[str, Any]] = []
+        for line in self._f:
+            if not line.endswith("\n"):
+                self._partial += line  # record still being written
+                continue
+            line, self._partial = self._partial + line, ""
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            new.append(rec)
+            self.counts[rec["outcome"]] = self.counts.get(rec["outcome"], 0) + 1
+        self.tests.extend(new)
+        return new
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+def run(
+    path: str | Path,
+    extra_args: list[str] | None = None,
+    warm: bool = False,
+    on_line: LineCallback | None = None,
+    shards: int = 1,
+) -> dict[str, object]:
+    """Run pytest on ``path`` and return structured per-test results.
+
+    Results come from the bundled ``pytest_plugin``: ``tests`` holds one
+    compact record per test, ``failures`` the failed/errored subset and
+    ``counts`` the outcome totals. The report is consumed while pytest runs,
+    each time it prints a line. ``on_line`` receives pytest's own output as it
+    streams. With ``warm=True`` the run goes through a persistent worker
+    process (see ``pytest_worker``). Otherwise ``shards`` other than 1 splits
+    the tests across that many processes (0 = CPU count; see ``pytest_shards``).
+    """
+    if shards != 1 and not warm:
+        from .pytest_shards import run_sharded
+
+        return run_sharded(path, extra_args, shards, on_line=on_line)
+    fd, report = tempfile.mkstemp(prefix="mechanic-pytest-", suffix=".jsonl")
+    os.close(fd)
+    # One token: pytest treats bare path-like argument values as rootdir candidates.
+    args = ["-q", "-p", "mechanic.tools.pytest_plugin", f"--mechanic-report={report}"]
+    args += extra_args or []
+    follower = ReportFollower(report)
+
+    def _on_line(stream: str, line: str) -> None:
+        follower.poll()
+        if on_line is not None:
+            on_line(stream, line)
+
+    try:
+        if warm:
+            from .pytest_worker import get_worker
+
+            res = get_worker(path).run(args, on_line=_on_line)
+        else:
+            res = shell_run(["pytest"] + args, cwd=path, env=plugin_env(), on_line=_on_line)
+        follower.poll()
+    finally:
+        follower.close()
+        try:
+            os.unlink(report)
+        except OSError:
+            pass
+    code = int(res.get("code", -1))
+    tests = follower.tests
+    if tests or code in (0, 5):
+        failures: list[dict[str, object]] = [t for t in tests if t["outcome"] in FAILED_OUTCOMES]
+    else:
+        failures = _parse_failures(f"{res.get('out','')}{res.get('err','')}")
+    return {
+        "code": code,
+        "failures": failures,
+        "tests": tests,
+        "counts": follower.counts,
+        "duration": res.get("duration"),
+        "peak_rss": res.get("peak_rss"),
+    }
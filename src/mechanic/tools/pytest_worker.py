@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import atexit
+import importlib.util
+import io
+import json
+import os
+import selectors
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Callable
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import IO, Any
+
+from .. import trace
+from .shell import (
+    DEFAULT_HEAD_BYTES,
+    DEFAULT_TAIL_BYTES,
+    DEFAULT_TIMEOUT,
+    LINE_LIMIT,
+    Capture,
+    LineCallback,
+    kill_group,
+)
+
+# Recycle the worker process after this many runs to bound leaked state.
+MAX_RUNS = 50
+
+_WORKERS: dict[Path, PytestWorker] = {}
+
+
+class PytestWorker:
+    """Client for a long-lived pytest process rooted at one target.
+
+    The worker keeps the interpreter, pytest, its plugins and the unchanged
+    target modules imported between calls and runs each request in-process
+    with ``pytest.main``; collection itself is redone per call, since the
+    tests it finds may have changed. Requests and replies are JSON lines over
+    the worker's stdin/stdout pipes: pytest's output comes back line by line
+    as it is written, then a ``done`` message.
+    """
+
+    def __init__(self, path: str | Path, max_runs: int = MAX_RUNS) -> None:
+        self.path = Path(path).resolve()
+        self.max_runs = max_runs
+        self._proc: subprocess.Popen[bytes] | None = None
+        self._runs = 0
+        self._lock = threading.Lock()
+
+    def _spawn(self) -> None:
+        from .pytest_tool import plugin_env
+
+        self._proc = subprocess.Popen(
+            [sys.executable, "-m", "mechanic.tools.pytest_worker", str(self.path)],
+            cwd=str(self.path),
+            env=plugin_env(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+            # Own process group, so a timeout kill takes the tests' children with it.
+            start_new_session=os.name != "nt",
+        )
+        self._runs = 0
+
+    def _request(
+        self,
+        args: list[str],
+        caps: list[Capture],
+        on_line: LineCallback | None,
+        start: float,
+        wall: float,
+        idle_timeout: float | None,
+    ) -> dict[str, Any] | None:
+        """Send one request and relay its output until ``done``.
+
+        Returns None when the worker died, or ``{"timed_out": ...}`` after
+        killing a worker that ran past ``wall`` seconds from ``start`` or went
+        ``idle_timeout`` seconds without output.
+        """
+        if self._proc is None:
+            self._spawn()
+        proc = self._proc
+        assert proc is not None and proc.stdin and proc.stdout
+        try:
+            data = memoryview((json.dumps({"args": args}) + "\n").encode("utf-8"))
+            while data:
+                data = data[proc.stdin.write(data) or 0 :]
+        except OSError:
+            self.close()
+            return None
+        fd = proc.stdout.fileno()
+        buf, last = b"", time.monotonic()
+        with selectors.DefaultSelector() as sel:
+            sel.register(fd, selectors.EVENT_READ)
+            while True:
+                while b"\n" in buf:
+                    line, buf = buf.split(b"\n", 1)
+                    msg = json.loads(line)
+                    if msg.get("type") != "line":
+                        return msg
+                    last = time.monotonic()
+                    cap = caps[0] if msg["stream"] == "out" else caps[1]
+                    cap.feed((msg["line"] + "\n").encode("utf-8"), proc.pid)
+                    if on_line is not None:
+                        try:
+                            on_line(cap.name, msg["line"])
+                        except Exception:
+                            pass
+                now = time.monotonic()
+                waits = [1.0]
+                if wall > 0:
+                    waits.append(start + wall - now)
+                if idle_timeout:
+                    waits.append(last + idle_timeout - now)
+                if min(waits) <= 0:
+                    self.kill()
+                    return {"timed_out": "wall" if wall > 0 and now - start >= wall else "idle"}
+                if not sel.select(min(waits)):
+                    continue
+                chunk = os.read(fd, 1 << 16)
+                if not chunk:
+                    self.close()
+                    return None
+                buf += chunk
+
+    def run(
+        self,
+        args: list[str],
+        timeout: float | None = None,
+        *,
+        idle_timeout: float | None = None,
+        on_line: LineCallback | None = None,
+        head_bytes: int = DEFAULT_HEAD_BYTES,
+        tail_bytes: int = DEFAULT_TAIL_BYTES,
+        spill_dir: str | Path | None = None,
+    ) -> dict[str, object]:
+        """Run pytest with ``args`` in the worker; same limits and result shape as ``shell.run``.
+
+        A worker that times out is killed (with its process group) and
+        replaced by a fresh one on the next call.
+        """
+        with self._lock, trace.span("pytest-worker", "tool", argv=args[:7]) as sp:
+            res = self._run(args, timeout, idle_timeout, on_line, head_bytes, tail_bytes, spill_dir)
+            sp.set(code=res.get("code"), rss=res.get("peak_rss"))
+        return res
+
+    def _run(
+        self,
+        args: list[str],
+        timeout: float | None,
+        idle_timeout: float | None,
+        on_line: LineCallback | None,
+        head_bytes: int,
+        tail_bytes: int,
+        spill_dir: str | Path | None,
+    ) -> dict[str, object]:
+        wall = DEFAULT_TIMEOUT if timeout is None else timeout
+        start = time.monotonic()
+        proc = self._proc
+        if proc is not None and (proc.poll() is not None or self._runs >= self.max_runs):
+            self.close()
+        caps = [Capture(n, head_bytes, tail_bytes, spill_dir) for n in ("out", "err")]
+        reply = self._request(args, caps, on_line, start, wall, idle_timeout)
+        if reply is not None and reply.get("recycle"):
+            self.close()
+            reply = self._request(args, caps, on_line, start, wall, idle_timeout)
+        for cap in caps:
+            cap.close()
+        out, err = caps
+        timed_out = reply.get("timed_out") if reply is not None else None
+        res: dict[str, object] = {
+            "code": -1 if reply is None or timed_out else int(reply.get("code", -1)),
+            "out": out.text(),
+            "err": err.text(),
+            "duration": round(time.monotonic() - start, 6),
+            "peak_rss": reply.get("peak_rss") if reply is not None else None,
+            "cpu": None,
+            "timed_out": timed_out,
+            "out_bytes": out.total,
+            "err_bytes": err.total,
+        }
+        if reply is None:
+            res["err"] = f"{res['err']}\n[mechanic] pytest worker exited unexpectedly"
+        elif timed_out:
+            limit = wall if timed_out == "wall" else idle_timeout
+            res["err"] = f"{res['err']}\n[mechanic] killed after {timed_out} timeout ({limit}s)"
+        else:
+            self._runs += 1
+        for cap in caps:
+            if cap.spill_path is not None:
+                res[f"{cap.name}_file"] = str(cap.spill_path)
+        return res
+
+    def kill(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            kill_group(proc)
+            proc.wait()
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if proc.stdin:
+                proc.stdin.close()
+            proc.wait(timeout=5)
+        except Exception:
+            kill_group(proc)
+            proc.wait()
+
+
+def get_worker(path: str | Path) -> PytestWorker:
+    key = Path(path).resolve()
+    worker = _WORKERS.get(key)
+    if worker is None:
+        worker = _WORKERS[key] = PytestWorker(key)
+    return worker
+
+
+@atexit.register
+def close_all() -> None:
+    for worker in list(_WORKERS.values()):
+        worker.close()
+    _WORKERS.clear()
+
+
+def _target_modules(root: Path) -> dict[str, tuple[str, int]]:
+    mods: dict[str, tuple[str, int]] = {}
+    prefix = str(root) + os.sep
+    for name, mod in list(sys.modules.items()):
+        f = getattr(mod, "__file__", None)
+        if not f or not f.startswith(prefix):
+            continue
+        try:
+            mods[name] = (f, os.stat(f).st_mtime_ns)
+        except OSError:
+            mods[name] = (f, -1)
+    return mods
+
+
+def _refresh_modules(root: Path, seen: dict[str, tuple[str, int]]) -> bool:
+    """Drop stale target modules so the next session re-imports them.
+
+    Returns False when a changed module cannot be re-imported in place (an
+    extension module), in which case the whole process must be recycled.
+    """
+    changed = []
+    for name, (f, mtime) in seen.items():
+        try:
+            now = os.stat(f).st_mtime_ns
+        except OSError:
+            now = -1
+        if now != mtime:
+            changed.append(f)
+    if not changed:
+        return True
+    if any(not f.endswith(".py") for f in changed):
+        return False
+    for f in changed:
+        # Bytecode is validated by whole-second mtime; drop it for quick successive edits.
+        try:
+            os.unlink(importlib.util.cache_from_source(f))
+        except (OSError, ValueError):
+            pass
+    for name in seen:
+        sys.modules.pop(name, None)
+    return True
+
+
+class _LineStream(io.TextIOBase):
+    """Text stream that sends each line (split at ``LINE_LIMIT``) as a ``line`` message."""
+
+    def __init__(self, name: str, send: Callable[[dict[str, Any]], None]) -> None:
+        self._name = name
+        self._send = send
+        self._partial = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        *lines, self._partial = (self._partial + s).split("\n")
+        while len(self._partial) > LINE_LIMIT:
+            lines.append(self._partial[:LINE_LIMIT])
+            self._partial = self._partial[LINE_LIMIT:]
+        for line in lines:
+            self._send({"type": "line", "stream": self._name, "line": line})
+        return len(s)
+
+    def flush(self) -> None:
+        if self._partial:
+            self._send({"type": "line", "stream": self._name, "line": self._partial})
+            self._partial = ""
+
+
+def _peak_rss() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    root = Path(argv[0]).resolve()
+    # Keep the real stdin/stdout for requests and replies. Anything else written to fd 1
+    # is discarded, and tests (or a stray breakpoint()) read EOF instead of the requests.
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    channel: IO[str] = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdin = open(os.devnull, encoding="utf-8")
+    os.chdir(root)
+
+    def send(msg: dict[str, Any]) -> None:
+        channel.write(json.dumps(msg) + "\n")
+        channel.flush()
+
+    import pytest
+
+    seen: dict[str, tuple[str, int]] = {}
+    while True:
+        line = requests.readline()
+        if not line:
+            return 0
+        req = json.loads(line)
+        if not _refresh_modules(root, seen):
+            send({"type": "recycle", "recycle": True})
+            return 0
+        out, err = _LineStream("out", send), _LineStream("err", send)
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                code = int(pytest.main(list(req.get("args", []))))
+            except SystemExit as e:
+                code = int(e.code or 0)
+            except Exception as e:
+                code = -1
+                err.write(str(e))
+        out.flush()
+        err.flush()
+        seen = _target_modules(root)
+        send({"type": "done", "code": code, "peak_rss": _peak_rss()})
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
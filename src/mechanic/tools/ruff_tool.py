@@ -1,13 +1,66 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from .shell import run as shell_run
 
+if TYPE_CHECKING:
+    from ..lintcache import Checked
 
-def run(path: str | Path = ".", fix: bool = False) -> dict[str, object]:
+# Files the cached mode checks; config files ruff also lints (pyproject.toml) key the cache.
+SOURCES = (".py", ".pyi", ".ipynb")
+
+
+def run(path: str | Path = ".", fix: bool = False, cache: bool = False) -> dict[str, object]:
+    """``ruff check`` on ``path``.
+
+    With ``cache`` (check mode only) ruff sees just the files changed since
+    their verdict was cached (see ``lintcache``); the result then has a
+    ``cache`` entry with hit/miss counts.
+    """
+    if cache and not fix:
+        from ..lintcache import run_cached
+
+        res = run_cached("ruff", "check", path, lambda files: _check(path, files), _render, SOURCES)
+        if res is not None:
+            return res
     args = ["ruff", "check", str(path)]
     if fix:
         args.append("--fix")
     res = shell_run(args, cwd=path)
-    return {"code": res.get("code", -1), "out": res.get("out", ""), "err": res.get("err", "")}
+    return {
+        "code": res.get("code", -1),
+        "out": res.get("out", ""),
+        "err": res.get("err", ""),
+        "duration": res.get("duration"),
+    }
+
+
+def _check(root: str | Path, files: list[str]) -> Checked:
+    res = shell_run(["ruff", "check", "--output-format", "json", "--", *files], cwd=root)
+    if res.get("code") not in (0, 1):
+        return res, None, set()
+    try:
+        items = json.loads(str(res.get("out") or "[]"))
+    except ValueError:
+        return res, None, set()
+    base = Path(root).resolve()
+    diags: dict[str, list[str]] = {}
+    for d in items:
+        name = Path(d["filename"])
+        rel = (name.relative_to(base) if name.is_absolute() else name).as_posix()
+        loc = d.get("location") or {}
+        diags.setdefault(rel, []).append(
+            f"{rel}:{loc.get('row')}:{loc.get('column')}: {d.get('code') or 'error'} "
+            f"{d.get('message', '')}"
+        )
+    return res, diags, set()
+
+
+def _render(diags: dict[str, list[str]], _files: int) -> tuple[str, str]:
+    lines = [line for f in sorted(diags) for line in diags[f]]
+    if not lines:
+        return "All checks passed!\n", ""
+    return "\n".join(lines) + f"\nFound {len(lines)} errors.\n", ""
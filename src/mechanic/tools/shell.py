@@ -1,26 +1,290 @@
 from __future__ import annotations
 
+import os
+import signal
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
 from pathlib import Path
+from typing import IO
+
+from .. import trace
+
+DEFAULT_TIMEOUT = 30 * 60
+DEFAULT_HEAD_BYTES = 64 * 1024
+DEFAULT_TAIL_BYTES = 256 * 1024
+LINE_LIMIT = 64 * 1024
+_KILL_GRACE = 2.0
+
+LineCallback = Callable[[str, str], None]
+
+# Commands currently running, so a worker being shut down can take its children with it.
+_live: set[subprocess.Popen[bytes]] = set()
+_live_lock = threading.Lock()
+
+
+class Capture:
+    """Bounded capture of one output stream.
+
+    Keeps the first ``head`` and last ``tail`` bytes in memory. When the
+    stream outgrows that and ``spill_dir`` is set, the full stream is also
+    written to a ``<name>-<pid>-*.log`` file in ``spill_dir`` so nothing is lost.
+    """
+
+    def __init__(self, name: str, head: int, tail: int, spill_dir: str | Path | None) -> None:
+        self.name = name
+        self.head_limit = head
+        self.tail_limit = tail
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+        self.spill_path: Path | None = None
+        self._spill: IO[bytes] | None = None
+
+    def feed(self, chunk: bytes, pid: int) -> None:
+        self.total += len(chunk)
+        if self._spill is not None:
+            self._spill.write(chunk)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if not chunk:
+            return
+        self.tail += chunk
+        if self._spill is None and self.spill_dir is not None and self.truncated:
+            # First overflow: the tail has not been trimmed yet, so head + tail is everything.
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            fd, name = tempfile.mkstemp(
+                prefix=f"{self.name}-{pid}-", suffix=".log", dir=self.spill_dir
+            )
+            self.spill_path = Path(name)
+            self._spill = os.fdopen(fd, "wb")
+            self._spill.write(bytes(self.head) + bytes(self.tail))
+        if len(self.tail) > 2 * self.tail_limit:
+            del self.tail[: len(self.tail) - self.tail_limit]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > self.head_limit + self.tail_limit
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def text(self) -> str:
+        if not self.truncated:
+            return (bytes(self.head) + bytes(self.tail)).decode("utf-8", errors="replace")
+        tail = bytes(self.tail[-self.tail_limit :]) if self.tail_limit else b""
+        skipped = self.total - len(self.head) - len(tail)
+        marker = f"\n... [{skipped} bytes truncated] ...\n".encode()
+        return (bytes(self.head) + marker + tail).decode("utf-8", errors="replace")
+
+
+def _pump(
+    pipe: IO[bytes],
+    cap: Capture,
+    pid: int,
+    on_line: LineCallback | None,
+    activity: list[float],
+) -> None:
+    with pipe:
+        for chunk in iter(lambda: pipe.readline(LINE_LIMIT), b""):
+            activity[0] = time.monotonic()
+            cap.feed(chunk, pid)
+            if on_line is not None:
+                try:
+                    on_line(cap.name, chunk.decode("utf-8", errors="replace").rstrip("\r\n"))
+                except Exception:
+                    pass
+    cap.close()
+
+
+def kill_group(proc: subprocess.Popen[bytes]) -> None:
+    """Stop ``proc`` and its process group: SIGTERM, then SIGKILL after a grace period."""
+    if proc.returncode is not None:
+        return
+    try:
+        if os.name == "nt":
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                capture_output=True,
+                check=False,
+            )
+        else:
+            os.killpg(proc.pid, signal.SIGTERM)
+            deadline = time.monotonic() + _KILL_GRACE
+            while time.monotonic() < deadline and _poll(proc)[0] is None:
+                time.sleep(0.05)
+            if proc.returncode is None:
+                os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def kill_all() -> None:
+    """Kill the process group of every command started by ``run`` that is still running."""
+    with _live_lock:
+        procs = list(_live)
+    for proc in procs:
+        kill_group(proc)
+
+
+def _poll(proc: subprocess.Popen[bytes]) -> tuple[int | None, int | None, float | None]:
+    """Non-blocking reap returning ``(returncode, peak_rss_bytes, cpu_seconds)``.
+
+    On POSIX the child is reaped with ``wait4`` to get its own resource usage.
+    """
+    if proc.returncode is not None:
+        return proc.returncode, None, None
+    if os.name == "nt" or not hasattr(os, "wait4"):
+        return proc.poll(), None, None
+    try:
+        pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+    except ChildProcessError:
+        return proc.poll(), None, None
+    if pid == 0:
+        return None, None, None
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    return proc.returncode, rss, usage.ru_utime + usage.ru_stime
 
 
 def run(
     cmd: list[str],
     cwd: str | Path | None = None,
-    timeout: int | None = None,
+    timeout: float | None = None,
+    env: dict[str, str] | None = None,
+    *,
+    idle_timeout: float | None = None,
+    on_line: LineCallback | None = None,
+    head_bytes: int = DEFAULT_HEAD_BYTES,
+    tail_bytes: int = DEFAULT_TAIL_BYTES,
+    spill_dir: str | Path | None = None,
+) -> dict[str, object]:
+    """Run ``cmd`` streaming its output, with bounded memory and timeouts.
+
+    ``timeout`` is a wall-clock limit (``DEFAULT_TIMEOUT`` when None, disabled
+    when <= 0) and ``idle_timeout`` a limit on time without any output; either
+    kills the whole process group. ``on_line(stream, line)`` is called for each
+    stdout/stderr line as it arrives. Returned ``out``/``err`` keep the head and
+    tail of each stream; ``duration`` (seconds), ``peak_rss`` (bytes, POSIX
+    only), ``cpu`` (child user+system seconds, POSIX only) and ``timed_out``
+    (``"wall"``/``"idle"``/None) describe the call. With tracing enabled the
+    call is recorded as a ``tool`` span (see ``mechanic.trace``).
+    """
+    with trace.span(Path(cmd[0]).name if cmd else "?", "tool", argv=cmd[1:8]) as sp:
+        res = _run(
+            cmd,
+            cwd,
+            timeout,
+            env,
+            idle_timeout=idle_timeout,
+            on_line=on_line,
+            head_bytes=head_bytes,
+            tail_bytes=tail_bytes,
+            spill_dir=spill_dir,
+        )
+        sp.set(code=res.get("code"), cpu=res.get("cpu"), rss=res.get("peak_rss"))
+    return res
+
+
+def _run(
+    cmd: list[str],
+    cwd: str | Path | None = None,
+    timeout: float | None = None,
     env: dict[str, str] | None = None,
+    *,
+    idle_timeout: float | None = None,
+    on_line: LineCallback | None = None,
+    head_bytes: int = DEFAULT_HEAD_BYTES,
+    tail_bytes: int = DEFAULT_TAIL_BYTES,
+    spill_dir: str | Path | None = None,
 ) -> dict[str, object]:
+    wall = DEFAULT_TIMEOUT if timeout is None else timeout
+    start = time.monotonic()
+    kwargs: dict[str, object] = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP  # type: ignore[attr-defined]
+    else:
+        kwargs["start_new_session"] = True
     try:
-        proc = subprocess.run(
+        proc = subprocess.Popen(
             cmd,
             cwd=str(cwd) if cwd else None,
             env=env,
-            text=True,
-            capture_output=True,
-            timeout=timeout,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             shell=False,
-            check=False,
+            **kwargs,  # type: ignore[call-overload]
         )
-        return {"code": proc.returncode, "out": proc.stdout, "err": proc.stderr}
     except Exception as e:
-        return {"code": -1, "out": "", "err": str(e)}
+        return {"code": -1, "out": "", "err": str(e), "duration": time.monotonic() - start}
+
+    with _live_lock:
+        _live.add(proc)
+    caps = [Capture(n, head_bytes, tail_bytes, spill_dir) for n in ("out", "err")]
+    activity = [start]
+    pumps = [
+        threading.Thread(target=_pump, args=(pipe, cap, proc.pid, on_line, activity), daemon=True)
+        for pipe, cap in zip((proc.stdout, proc.stderr), caps, strict=True)
+    ]
+    for t in pumps:
+        t.start()
+
+    timed_out: str | None = None
+    peak_rss: int | None = None
+    cpu: float | None = None
+    delay = 0.001
+    try:
+        while True:
+            code, rss, used = _poll(proc)
+            if code is not None:
+                peak_rss, cpu = rss, used
+                break
+            now = time.monotonic()
+            if wall and wall > 0 and now - start > wall:
+                timed_out = "wall"
+            elif idle_timeout and now - activity[0] > idle_timeout:
+                timed_out = "idle"
+            if timed_out:
+                kill_group(proc)
+                proc.wait()
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+    finally:
+        if proc.returncode is None:
+            kill_group(proc)
+            proc.wait()
+        with _live_lock:
+            _live.discard(proc)
+        for t in pumps:
+            t.join(timeout=_KILL_GRACE)
+
+    out, err = caps
+    res: dict[str, object] = {
+        "code": proc.returncode if not timed_out else -1,
+        "out": out.text(),
+        "err": err.text(),
+        "duration": round(time.monotonic() - start, 6),
+        "peak_rss": peak_rss,
+        "cpu": cpu,
+        "timed_out": timed_out,
+        "out_bytes": out.total,
+        "err_bytes": err.total,
+    }
+    if timed_out:
+        limit = wall if timed_out == "wall" else idle_timeout
+        res["err"] = f"{res['err']}\n[mechanic] killed after {timed_out} timeout ({limit}s)"
+    for cap in caps:
+        if cap.spill_path is not None:
+            res[f"{cap.name}_file"] = str(cap.spill_path)
+    return res
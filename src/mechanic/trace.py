@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class Span:
+    """One timed section: wall times are seconds since the tracer started.
+
+    ``cpu`` is the thread CPU time spent inside the span (for a tool span, the
+    child process' user+system time) and ``rss`` the peak RSS in bytes: the
+    child's own peak for tools, this process' high-water mark otherwise.
+    """
+
+    id: int
+    name: str
+    cat: str
+    tid: int
+    parent: int | None
+    start: float = 0.0
+    end: float = 0.0
+    cpu: float | None = None
+    rss: int | None = None
+    args: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def to_dict(self) -> dict[str, Any]:
+        d = {
+            "id": self.id,
+            "name": self.name,
+            "cat": self.cat,
+            "tid": self.tid,
+            "parent": self.parent,
+            "start": round(self.start, 6),
+            "end": round(self.end, 6),
+            "cpu": None if self.cpu is None else round(self.cpu, 6),
+            "rss": self.rss,
+        }
+        if self.args:
+            d["args"] = self.args
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> Span:
+        return cls(**{k: d[k] for k in cls.__slots__ if k in d})  # type: ignore[attr-defined]
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoSpan:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+    def set(self, **values: Any) -> None:
+        return None
+
+
+_NOOP = _NoSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("tracer", "span", "_cpu0")
+
+    def __init__(self, tracer: Tracer, span: Span) -> None:
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self) -> _ActiveSpan:
+        stack = self.tracer._stack()
+        if self.span.parent is None and stack:
+            self.span.parent = stack[-1].id
+        stack.append(self.span)
+        self._cpu0 = time.thread_time()
+        self.span.start = time.perf_counter() - self.tracer.t0
+        return self
+
+    def set(self, **values: Any) -> None:
+        """Attach args; ``cpu`` and ``rss`` override the measured values."""
+        for key in ("cpu", "rss"):
+            if key in values:
+                setattr(self.span, key, values.pop(key))
+        self.span.args.update(values)
+
+    def __exit__(self, *exc: object) -> None:
+        span = self.span
+        span.end = time.perf_counter() - self.tracer.t0
+        if span.cpu is None:
+            span.cpu = time.thread_time() - self._cpu0
+        if span.rss is None:
+            span.rss = _peak_rss()
+        stack = self.tracer._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        self.tracer._add(span)
+
+
+class Tracer:
+    """Collects spans from all threads of one run."""
+
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter()
+        self.spans: list[Span] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> list[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def span(
+        self, name: str, cat: str, args: dict[str, Any], parent: int | None = None
+    ) -> _ActiveSpan:
+        tid = threading.get_ident()
+        return _ActiveSpan(self, Span(next(self._ids), name, cat, tid, parent, args=args))
+
+    def current(self) -> int | None:
+        stack = self._stack()
+        return stack[-1].id if stack else None
+
+
+_tracer: Tracer | None = None
+
+
+def enable() -> Tracer:
+    """Start collecting spans process-wide and return the new tracer."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable() -> Tracer | None:
+    """Stop collecting spans; returns the tracer that was active, if any."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def span(name: str, cat: str = "stage", **args: Any) -> _ActiveSpan | _NoSpan:
+    """Context manager timing a section; a shared no-op while tracing is disabled."""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP
+    return tracer.span(name, cat, args)
+
+
+def bind(fn: Callable[[], T]) -> Callable[[], T]:
+    """Wrap ``fn`` so spans it opens on another thread nest under the current span."""
+    tracer = _tracer
+    if tracer is None:
+        return fn
+    parent = tracer.current()
+
+    def bound() -> T:
+        stack = tracer._stack()
+        saved = list(stack)
+        # A placeholder parent frame: spans opened by ``fn`` take its id.
+        stack[:] = [Span(parent, "", "", 0, None)] if parent is not None else []
+        try:
+            return fn()
+        finally:
+            stack[:] = saved
+
+    return bound
+
+
+def _peak_rss() -> int | None:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+# -- export ------------------------------------------------------------------
+
+
+def to_chrome(spans: Iterable[Span]) -> dict[str, Any]:
+    """Chrome trace-event JSON (``chrome://tracing``, Perfetto) with complete events."""
+    pid = os.getpid()
+    events = []
+    for s in sorted(spans, key=lambda s: s.start):
+        args = dict(s.args)
+        if s.cpu is not None:
+            args["cpu_ms"] = round(s.cpu * 1000, 3)
+        if s.rss is not None:
+            args["peak_rss"] = s.rss
+        events.append(
+            {
+                "name": s.name,
+                "cat": s.cat,
+                "ph": "X",
+                "ts": round(s.start * 1e6, 1),
+                "dur": round(s.duration * 1e6, 1),
+                "pid": pid,
+                "tid": s.tid,
+                "args": args,
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def to_speedscope(spans: Iterable[Span], name: str = "repo-mechanic") -> dict[str, Any]:
+    """speedscope JSON: one evented profile per thread, frames shared by span name."""
+    spans = sorted(spans, key=lambda s: (s.start, -s.end))
+    frames: dict[str, int] = {}
+    by_tid: dict[int, list[Span]] = {}
+    for s in spans:
+        frames.setdefault(s.name, len(frames))
+        by_tid.setdefault(s.tid, []).append(s)
+    profiles = []
+    for tid, items in by_tid.items():
+        events: list[dict[str, Any]] = []
+        open_: list[Span] = []
+        for s in items:
+            while open_ and open_[-1].end <= s.start:
+                done = open_.pop()
+                events.append({"type": "C", "frame": frames[done.name], "at": done.end})
+            if open_ and s.end > open_[-1].end:
+                continue  # not properly nested (clock skew); speedscope would reject it
+            events.append({"type": "O", "frame": frames[s.name], "at": s.start})
+            open_.append(s)
+        while open_:
+            done = open_.pop()
+            events.append({"type": "C", "frame": frames[done.name], "at": done.end})
+        profiles.append(
+            {
+                "type": "evented",
+                "name": f"thread {tid}",
+                "unit": "seconds",
+                "startValue": items[0].start,
+                "endValue": max(s.end for s in items),
+                "events": events,
+            }
+        )
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": [{"name": n} for n in frames]},
+        "profiles": profiles,
+        "name": name,
+        "exporter": "repo-mechanic",
+    }
+
+
+EXPORTERS: dict[str, Callable[[list[Span]], dict[str, Any]]] = {
+    "chrome": to_chrome,
+    "speedscope": to_speedscope,
+}
+
+
+def write(spans: Iterable[Span], path: Path, fmt: str = "chrome") -> Path:
+    """Export ``spans`` to ``path`` as Chrome trace-event or speedscope JSON."""
+    if fmt not in EXPORTERS:
+        raise ValueError(f"trace format must be one of {', '.join(EXPORTERS)}")
+    path.write_text(json.dumps(EXPORTERS[fmt](list(spans))), encoding="utf-8")
+    return path
+
+
+def spans_from_events(events: Iterable[dict[str, Any]]) -> list[Span]:
+    """Spans of the last ``trace`` event in a run's ``steps.jsonl`` events."""
+    spans: list[Span] = []
+    for ev in events:
+        if ev.get("type") == "trace":
+            spans = [Span.from_dict(d) for d in ev.get("spans") or []]
+    return spans
+
+
+def summarize(spans: Iterable[Span]) -> list[dict[str, Any]]:
+    """Totals per (category, name), slowest first."""
+    rows: dict[tuple[str, str], dict[str, Any]] = {}
+    for s in spans:
+        row = rows.setdefault(
+            (s.cat, s.name),
+            {"cat": s.cat, "name": s.name, "count": 0, "wall": 0.0, "cpu": 0.0, "rss": None},
+        )
+        row["count"] += 1
+        row["wall"] += s.duration
+        row["cpu"] += s.cpu or 0.0
+        if s.rss is not None:
+            row["rss"] = max(row["rss"] or 0, s.rss)
+    return sorted(rows.values(), key=lambda r: -r["wall"])
+
+
+def summary_table(spans: Iterable[Span]) -> str:
+    """Markdown table of ``summarize`` for ``summary.md``."""
+    lines = [
+        "| Span | Kind | Calls | Wall (s) | CPU (s) | Peak RSS (MiB) |",
+        "| --- | --- | ---: | ---: | ---: | ---: |",
+    ]
+    for r in summarize(spans):
+        rss = "-" if r["rss"] is None else f"{r['rss'] / 2**20:.1f}"
+        name = str(r["name"]).replace("|", "\\|")
+        lines.append(
+            f"| {name} | {r['cat']} | {r['count']} | {r['wall']:.3f} | {r['cpu']:.3f} | {rss} |"
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import sys
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+# <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+POLL_INTERVAL = 0.25
+
+
+class Tail:
+    """Follows an append-only file from the last offset read.
+
+    ``read_lines`` returns only complete lines added since the previous call;
+    a partially written last line is kept back until it is finished. A line
+    longer than ``limit`` is read on to its end; one longer than
+    ``MAX_LINE`` is skipped, so it cannot stall the follower.
+    """
+
+    MAX_LINE = 64 << 20
+
+    def __init__(self, path: Path, offset: int = 0) -> None:
+        self.path = path
+        self.offset = offset
+
+    def read_lines(self, limit: int = 1 << 20) -> list[str]:
+        try:
+            f = self.path.open("rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            if f.seek(0, os.SEEK_END) < self.offset:
+                self.offset = 0  # truncated or replaced: start over
+            f.seek(self.offset)
+            data = f.read(limit)
+            end = data.rfind(b"\n") + 1
+            read = len(data)
+            while not end:
+                chunk = f.read(limit)
+                if not chunk:
+                    return []  # no new line is complete yet
+                nl = chunk.find(b"\n")
+                piece = chunk if nl < 0 else chunk[: nl + 1]
+                if len(data) <= self.MAX_LINE:
+                    data += piece
+                read += len(piece)
+                if nl >= 0:
+                    end = read
+        self.offset += end
+        if len(data) < end:
+            return []  # longer than MAX_LINE: skipped
+        return data[:end].decode("utf-8", errors="replace").splitlines()
+
+    def read_events(self) -> list[dict[str, Any]]:
+        events: list[dict[str, Any]] = []
+        for line in self.read_lines():
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+        return events
+
+
+class _Inotify:
+    def __init__(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add(self, path: Path) -> None:
+        if self._add(self.fd, os.fsencode(path), _MASK) < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+
+    def wait(self, timeout: float) -> bool:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Watcher:
+    """Wakes up when files in the watched directories change.
+
+    Uses one inotify descriptor for all directories on Linux, so following
+    many concurrent runs costs a single blocked ``select``; elsewhere (or if
+    inotify is unavailable) it polls file sizes and mtimes.
+    """
+
+    def __init__(self, dirs: Iterable[Path], poll_interval: float = POLL_INTERVAL) -> None:
+        self.dirs = [Path(d) for d in dirs]
+        self.poll_interval = poll_interval
+        self._inotify: _Inotify | None = None
+        if sys.platform.startswith("linux"):
+            try:
+                ino = _Inotify()
+                for d in self.dirs:
+                    ino.add(d)
+                self._inotify = ino
+            except (OSError, AttributeError):
+                self._inotify = None
+        self._stamps = self._scan()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "poll"
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        out: dict[Path, tuple[int, int]] = {}
+        for d in self.dirs:
+            try:
+                entries = list(os.scandir(d))
+            except OSError:
+                continue
+            for e in entries:
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue
+                out[Path(e.path)] = (st.st_size, st.st_mtime_ns)
+        return out
+
+    def wait(self, timeout: float) -> bool:
+        """Block until something changed or ``timeout`` seconds passed."""
+        if self._inotify is not None:
+            return self._inotify.wait(timeout)
+        deadline = time.monotonic() + timeout
+        while True:
+            stamps = self._scan()
+            if stamps != self._stamps:
+                self._stamps = stamps
+                return True
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return False
+            time.sleep(min(self.poll_interval, left))
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+class RunFollower:
+    """Follows one run's ``steps.jsonl`` events and streamed ``output.log``."""
+
+    def __init__(self, run_dir: Path, events_offset: int = 0, output_offset: int = 0) -> None:
+        self.run_dir = run_dir
+        self.events = Tail(run_dir / "steps.jsonl", events_offset)
+        self.output = Tail(run_dir / "output.log", output_offset)
+
+    @property
+    def finished(self) -> bool:
+        return (self.run_dir / "summary.md").exists()
+
+    def poll(self) -> dict[str, Any]:
+        return {
+            "events": self.events.read_events(),
+            "output": self.output.read_lines(),
+            "offsets": [self.events.offset, self.output.offset],
+            "finished": self.finished,
+        }
+
+    def wait(self, watcher: Watcher, timeout: float) -> dict[str, Any]:
+        """Return new data, blocking up to ``timeout`` seconds while there is none."""
+        deadline = time.monotonic() + timeout
+        while True:
+            data = self.poll()
+            left = deadline - time.monotonic()
+            if data["events"] or data["output"] or data["finished"] or left <= 0:
+                return data
+            watcher.wait(left)
+
+
+def describe(event: dict[str, Any]) -> str:
+    """One-line, human-readable summary of a receipts event."""
+    et = event.get("type", "?")
+    parts = [f"{float(event['t']):7.2f}s" if isinstance(event.get("t"), int | float) else " " * 8]
+    parts.append(str(et))
+    if et == "pytest":
+        counts = ", ".join(f"{k}={v}" for k, v in sorted((event.get("counts") or {}).items()))
+        parts += [str(event.get("phase")), f"code={event.get('code')}", counts]
+        if event.get("duration") is not None:
+            parts.append(f"({float(event['duration']):.2f}s)")
+        if event.get("shards"):
+            parts.append(f"[{event['shards']['count']} shards]")
+        if event.get("flaky"):
+            parts.append(f"flaky={len(event['flaky'])}")
+    elif et == "lint":
+        parts.append(", ".join(f"{k}={v}" for k, v in (event.get("results") or {}).items()))
+        cached = [
+            f"{k} {c['hits']}/{c['files']}" for k, c in (event.get("cache") or {}).items() if c
+        ]
+        if cached:
+            parts.append(f"(cached {', '.join(cached)})")
+    elif et == "patch":
+        files = ", ".join(event.get("stats") or event.get("files") or [])
+        parts += [f"#{event.get('index')}", "ok" if event.get("ok") else "rejected", files]
+    elif et == "candidates":
+        parts.append(f"chosen={event.get('chosen')}")
+    elif et == "revert":
+        parts.append(f"culprits={event.get('culprits')}")
+    elif et == "meta":
+        parts.append(str(event.get("path", "")))
+    return " ".join(p for p in parts if p)
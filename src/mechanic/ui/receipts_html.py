@@ -1,102 +1,158 @@
 from __future__ import annotations
 
-import json
+import hashlib
+import os
+import tempfile
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 from markdown_it import MarkdownIt
 
+from .. import artifacts, trace
+from ..diffmodel import parse_patch
+from ..receipts import iter_events
 
-def _read_jsonl(path: Path) -> list[dict[str, Any]]:
-    events: list[dict[str, Any]] = []
-    if not path.exists():
-        return events
-    for line in path.read_text(encoding="utf-8").splitlines():
-        line = line.strip()
-        if not line:
-            continue
+RENDER_VERSION = 3  # bump when the page layout changes to invalidate cached pages
+PRE_STYLE = "background:#111;color:#eee;padding:8px;overflow:auto"
+
+
+def _cache_key(run_dir: Path) -> str:
+    parts: list[str] = [str(RENDER_VERSION)]
+    for p in (run_dir / "steps.jsonl", run_dir / "summary.md", *_coverage_paths(run_dir)):
         try:
-            events.append(json.loads(line))
-        except Exception:
-            pass
-    return events
+            st = p.stat()
+            parts.append(f"{p.name}:{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{p.name}:-")
+    return "|".join(parts)
 
 
 def build_html(run_dir: Path) -> Path:
+    """Render ``summary.html`` for a run, streaming events from ``steps.jsonl``.
+
+    Each patched file's diff goes to its own fragment under ``fragments/``
+    (named by content, so repeated diffs share one) and the page loads it
+    lazily in an iframe when its entry is expanded. The page is reused as
+    long as ``steps.jsonl``, ``summary.md`` and coverage data are unchanged.
+    """
     run_dir = Path(run_dir)
-    md_path = run_dir / "summary.md"
-    steps_path = run_dir / "steps.jsonl"
     html_path = run_dir / "summary.html"
+    key_path = run_dir / ".summary.html.key"
+    key = _cache_key(run_dir)
+    try:
+        if html_path.exists() and key_path.read_text(encoding="utf-8") == key:
+            return html_path
+    except OSError:
+        pass
+
+    fd, tmp = tempfile.mkstemp(prefix=".summary.", suffix=".html", dir=run_dir)
+    try:
+        with (
+            trace.span("render", "receipts"),
+            os.fdopen(fd, "w", encoding="utf-8") as out,
+            tempfile.TemporaryFile("w+", encoding="utf-8") as patches,
+        ):
+            _render(run_dir, out, patches)
+        os.replace(tmp, html_path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    key_path.write_text(key, encoding="utf-8")
+    return html_path
 
-    md = MarkdownIt()
-    summary_md = md_path.read_text(encoding="utf-8") if md_path.exists() else "# Summary\n"
-    summary_html = md.render(summary_md)
-    events = _read_jsonl(steps_path)
-
-    tool_rows: list[str] = []
-    diff_blocks: list[str] = []
 
-    for ev in events:
-        et = ev.get("type")
-        if et in {"lint", "pytest"}:
-            name = et
-            code = ev.get("code") or ev.get("results")
-            args = ev.get("args") or ev.get("actions") or []
-            tool_rows.append(f"<tr><td>{name}</td><td><code>{args}</code></td><td>{code}</td></tr>")
-        if et == "patch":
-            diff = ev.get("diff")
-            if diff:
-                pre = _escape(diff)
-                diff_html = (
-                    "<details><summary>View diff</summary>"
-                    "<pre style='background:#111;color:#eee;padding:8px;overflow:auto'>"
-                    f"{pre}"
-                    "</pre></details>"
-                )
-                diff_blocks.append(diff_html)
-
-    # Optional coverage percent
-    cov_html = ""
+def _render(run_dir: Path, out: IO[str], patches: IO[str]) -> None:
+    md_path = run_dir / "summary.md"
+    summary_md = md_path.read_text(encoding="utf-8") if md_path.exists() else "# Summary\n"
+    summary_html = MarkdownIt("commonmark").enable("table").render(summary_md)
     cov = _coverage_percent(run_dir)
-    if cov is not None:
-        cov_html = f"<p><strong>Coverage:</strong> {cov:.2f}%</p>"
-
-    rows = "".join(tool_rows) if tool_rows else "<tr><td colspan=3>(no tools logged)</td></tr>"
-    table_html = (
-        "<table border='1' cellpadding='6' cellspacing='0'>"
-        "<thead><tr><th>Tool</th><th>Args/Actions</th><th>Exit/Result</th></tr></thead>"
-        f"<tbody>{rows}</tbody>"
-        "</table>"
-    )
+    cov_html = f"<p><strong>Coverage:</strong> {cov:.2f}%</p>" if cov is not None else ""
 
-    head = (
+    out.write(
         "<html><head><meta charset='utf-8'><title>Repo Mechanic Receipts</title>"
         "<style>body{font-family:Arial,Helvetica,sans-serif;margin:24px}"
-        " code,pre{font-family:Consolas,monospace}</style>"
+        " code,pre{font-family:Consolas,monospace}"
+        " iframe{width:100%;height:320px;border:1px solid #ccc}"
+        " section table{border-collapse:collapse}"
+        " section th,section td{border:1px solid #ccc;padding:4px 8px}</style>"
         "</head><body>"
+        "<h1>Repo Mechanic Receipt</h1>"
+        f"<section>{summary_html}{cov_html}</section>"
+        "<h2>Tool Calls</h2>"
+        "<table border='1' cellpadding='6' cellspacing='0'>"
+        "<thead><tr><th>Tool</th><th>Args/Actions</th><th>Exit/Result</th></tr></thead>"
+        "<tbody>"
     )
-    body = (
-        head
-        + "<h1>Repo Mechanic Receipt</h1>"
-        + f"<section>{summary_html}{cov_html}</section>"
-        + "<h2>Tool Calls</h2>"
-        + table_html
-        + "<h2>Patches</h2>"
-        + ("".join(diff_blocks) if diff_blocks else "<p>(no patch diffs)</p>")
-        + "</body></html>"
-    )
-
-    html_path.write_text(body, encoding="utf-8")
-    return html_path
+    # Tool rows stream straight into the page; patch entries go to a spool file
+    # appended after the table, so neither list is held in memory.
+    n_tools = n_patches = 0
+    for ev in iter_events(run_dir / "steps.jsonl"):
+        et = ev.get("type")
+        if et in {"lint", "pytest"}:
+            code = ev.get("code") or ev.get("results")
+            args = ev.get("args") or ev.get("actions") or []
+            out.write(
+                f"<tr><td>{et}</td><td><code>{_escape(str(args))}</code></td>"
+                f"<td>{_escape(str(code))}</td></tr>"
+            )
+            n_tools += 1
+        if et == "patch" and ev.get("diff"):
+            n_patches += _write_patch(run_dir, ev, patches)
+    if not n_tools:
+        out.write("<tr><td colspan=3>(no tools logged)</td></tr>")
+    out.write("</tbody></table><h2>Patches</h2>")
+    if n_patches:
+        patches.seek(0)
+        for chunk in iter(lambda: patches.read(64 * 1024), ""):
+            out.write(chunk)
+    else:
+        out.write("<p>(no patch diffs)</p>")
+    out.write("</body></html>")
+
+
+def _write_patch(run_dir: Path, ev: dict[str, Any], out: IO[str]) -> int:
+    """Write fragments for one patch event (unless cached) and its page entries."""
+    diff = ev["diff"]
+    if artifacts.is_ref(diff):
+        digest = str(diff["artifact"])[:16]
+    else:
+        digest = hashlib.sha256(str(diff).encode("utf-8", "surrogateescape")).hexdigest()[:16]
+    frag_dir = run_dir / "fragments"
+    stats: dict[str, list[int]] | None = ev.get("stats")
+    if stats is None or not (frag_dir / f"{digest}-0.html").exists():
+        parsed = parse_patch(artifacts.load(run_dir, diff))
+        stats = parsed.stats()
+        by_path: dict[str, list[str]] = {}
+        for fp in parsed.files:
+            by_path.setdefault(fp.path, []).append(parsed.file_text(fp))
+        frag_dir.mkdir(exist_ok=True)
+        for k, texts in enumerate(by_path.values() or [[parsed.text]]):
+            (frag_dir / f"{digest}-{k}.html").write_text(
+                "<html><head><meta charset='utf-8'></head><body style='margin:0'>"
+                f"<pre style='{PRE_STYLE};margin:0;min-height:100%'>"
+                f"{_escape(''.join(texts))}</pre></body></html>",
+                encoding="utf-8",
+            )
+    entries = list(stats.items()) or [("(diff)", [0, 0])]
+    for k, (path, (added, removed)) in enumerate(entries):
+        out.write(
+            f"<details><summary>View diff ({_escape(path)} +{added} -{removed})</summary>"
+            f"<iframe loading='lazy' src='fragments/{digest}-{k}.html'></iframe></details>"
+        )
+    return len(entries)
 
 
 def _escape(s: str) -> str:
     return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
 
 
-def _coverage_percent(run_dir: Path) -> float | None:
+def _coverage_paths(run_dir: Path) -> tuple[Path, Path]:
     # Prefer coverage.xml in run_dir; fallback to repo root
-    for p in (run_dir / "coverage.xml", Path("coverage.xml")):
+    return run_dir / "coverage.xml", Path("coverage.xml")
+
+
+def _coverage_percent(run_dir: Path) -> float | None:
+    for p in _coverage_paths(run_dir):
         if p.exists():
             try:
                 txt = p.read_text(encoding="utf-8")
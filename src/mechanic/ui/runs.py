@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from .. import artifacts
+
+_PATCH_PREFIX = b'{"type": "patch"'
+
+
+class StepsIndex:
+    """Byte offsets of the patch events in a ``steps.jsonl`` file.
+
+    The file is scanned once, line by line, and only lines that look like
+    patch events are decoded; ``refresh`` picks up lines appended since the
+    last scan. Individual diffs are then read with a single seek.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.offsets: list[tuple[int, int]] = []
+        self.events = 0
+        self._scanned = 0
+
+    def refresh(self) -> None:
+        try:
+            f = self.path.open("rb")
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._scanned)
+            pos = self._scanned
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written record; rescan it next time
+                start, pos = pos, pos + len(line)
+                self.events += 1
+                if line.startswith(_PATCH_PREFIX) or (b'"patch"' in line and _is_patch(line)):
+                    self.offsets.append((start, pos - start))
+            self._scanned = pos
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def event(self, i: int) -> dict[str, Any]:
+        start, length = self.offsets[i]
+        with self.path.open("rb") as f:
+            f.seek(start)
+            return json.loads(f.read(length))
+
+    def diff(self, i: int, run_dir: Path) -> str:
+        """Text of the ``i``-th patch's diff, resolving artifact refs."""
+        return str(artifacts.load(run_dir, self.event(i).get("diff")) or "")
+
+
+def _is_patch(line: bytes) -> bool:
+    try:
+        return json.loads(line).get("type") == "patch"
+    except ValueError:
+        return False
+
+
+def _stamp(run_dir: Path) -> tuple[tuple[int, int], ...]:
+    out = []
+    for name in ("steps.jsonl", "summary.md"):
+        try:
+            st = (run_dir / name).stat()
+            out.append((st.st_size, st.st_mtime_ns))
+        except OSError:
+            out.append((-1, -1))
+    return tuple(out)
+
+
+@dataclass
+class RunInfo:
+    path: Path
+    summary: str
+    index: StepsIndex
+    stamp: tuple[tuple[int, int], ...]
+
+    @classmethod
+    def load(cls, run_dir: Path) -> RunInfo:
+        md = run_dir / "summary.md"
+        summary = md.read_text(encoding="utf-8") if md.exists() else ""
+        index = StepsIndex(run_dir / "steps.jsonl")
+        index.refresh()
+        return cls(path=run_dir, summary=summary, index=index, stamp=_stamp(run_dir))
+
+
+class RunCache:
+    """LRU cache of loaded runs, safe to use from a background worker thread.
+
+    A cached run is reloaded when its ``steps.jsonl`` or ``summary.md``
+    changed on disk; if only ``steps.jsonl`` grew, its index is extended in
+    place instead.
+    """
+
+    def __init__(self, maxsize: int = 16) -> None:
+        self.maxsize = maxsize
+        self._runs: OrderedDict[Path, RunInfo] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, run_dir: Path) -> RunInfo:
+        with self._lock:
+            info = self._runs.get(run_dir)
+            if info is not None:
+                self._runs.move_to_end(run_dir)
+        stamp = _stamp(run_dir)
+        if info is None or info.stamp != stamp:
+            if info is not None and info.stamp[1] == stamp[1] and stamp[0][0] >= info.stamp[0][0]:
+                info.index.refresh()
+                info.stamp = stamp
+            else:
+                info = RunInfo.load(run_dir)
+        with self._lock:
+            self._runs[run_dir] = info
+            self._runs.move_to_end(run_dir)
+            while len(self._runs) > self.maxsize:
+                self._runs.popitem(last=False)
+        return info
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+
+def window(total: int, index: int, size: int) -> tuple[int, int]:
+    """``[start, stop)`` of a ``size``-row window over ``total`` rows, centred on ``index``."""
+    if total <= size:
+        return 0, total
+    start = min(max(index - size // 2, 0), total - size)
+    return start, start + size
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import html
+import json
+import mimetypes
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from ..receipts import list_runs
+from .live import RunFollower, Watcher
+from .receipts_html import build_html
+
+LONG_POLL = 25.0  # seconds an /events request may block waiting for new data
+
+_INDEX = """<html><head><meta charset='utf-8'><title>Repo Mechanic Runs</title>
+<style>body{font-family:Arial,Helvetica,sans-serif;margin:24px}</style></head>
+<body><h1>Repo Mechanic Runs</h1><ul>%s</ul></body></html>"""
+
+_LIVE = """<html><head><meta charset='utf-8'><title>%(run)s — live</title>
+<style>body{font-family:Arial,Helvetica,sans-serif;margin:24px}
+table{border-collapse:collapse}td{border:1px solid #ccc;padding:4px 8px;vertical-align:top}
+pre{background:#111;color:#eee;padding:8px;max-height:480px;overflow:auto}</style></head>
+<body><h1>Run %(run)s</h1><p id='status'>live</p>
+<h2>Events</h2><table><tbody id='events'></tbody></table>
+<h2>Output</h2><pre id='output'></pre>
+<script>
+let off = [0, 0];
+function row(e) {
+  const tr = document.createElement('tr');
+  const t = typeof e.t === 'number' ? e.t.toFixed(2) + 's' : '';
+  for (const v of [t, e.type, e.phase || e.index, e.code ?? (e.ok ?? ''),
+                   JSON.stringify(e.counts || e.results || e.stats || e.chosen || '')]) {
+    const td = document.createElement('td');
+    td.textContent = v === undefined ? '' : String(v);
+    tr.appendChild(td);
+  }
+  document.getElementById('events').appendChild(tr);
+}
+async function follow() {
+  const out = document.getElementById('output');
+  for (;;) {
+    let d;
+    try {
+      const r = await fetch(`events?events=${off[0]}&output=${off[1]}`);
+      d = await r.json();
+    } catch (err) {
+      await new Promise(res => setTimeout(res, 2000));
+      continue;
+    }
+    off = d.offsets;
+    d.events.forEach(row);
+    if (d.output.length) {
+      const stick = out.scrollTop + out.clientHeight >= out.scrollHeight - 4;
+      out.textContent += d.output.join('\\n') + '\\n';
+      if (stick) out.scrollTop = out.scrollHeight;
+    }
+    if (d.finished) {
+      document.getElementById('status').innerHTML = "finished — <a href='summary.html'>receipt</a>";
+      return;
+    }
+  }
+}
+follow();
+</script></body></html>"""
+
+
+def events_payload(
+    run_dir: Path, events: int = 0, output: int = 0, wait: float = 0.0
+) -> dict[str, Any]:
+    """New events and output lines of ``run_dir`` after the given byte offsets.
+
+    With ``wait`` the call blocks (inotify or polling, see ``Watcher``) until
+    something new arrives, the run finishes, or ``wait`` seconds pass.
+    """
+    follower = RunFollower(run_dir, events, output)
+    if wait <= 0:
+        return follower.poll()
+    watcher = Watcher([run_dir])
+    try:
+        return follower.wait(watcher, wait)
+    finally:
+        watcher.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    root: Path = Path("receipts")
+    long_poll: float = LONG_POLL
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if not parts:
+            return self._index()
+        if parts[0] != "runs" or len(parts) < 2:
+            return self._send(HTTPStatus.NOT_FOUND, b"not found")
+        run_dir = self._run_dir(parts[1])
+        if run_dir is None:
+            return self._send(HTTPStatus.NOT_FOUND, b"unknown run")
+        rest = parts[2:]
+        if not rest:
+            page = _LIVE % {"run": html.escape(run_dir.name)}
+            return self._send(HTTPStatus.OK, page.encode("utf-8"), "text/html; charset=utf-8")
+        if rest == ["events"]:
+            q = parse_qs(url.query)
+            try:
+                ev, out = int(q.get("events", ["0"])[0]), int(q.get("output", ["0"])[0])
+            except ValueError:
+                return self._send(HTTPStatus.BAD_REQUEST, b"bad offset")
+            data = events_payload(run_dir, ev, out, wait=self.long_poll)
+            return self._send(HTTPStatus.OK, json.dumps(data).encode("utf-8"), "application/json")
+        if rest == ["summary.html"]:
+            if not (run_dir / "summary.md").exists():
+                return self._send(HTTPStatus.NOT_FOUND, b"run still in progress")
+            build_html(run_dir)
+        path = run_dir.joinpath(*rest).resolve()
+        if not path.is_relative_to(run_dir.resolve()) or not path.is_file():
+            return self._send(HTTPStatus.NOT_FOUND, b"not found")
+        ctype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        return self._send(HTTPStatus.OK, path.read_bytes(), ctype)
+
+    def _run_dir(self, name: str) -> Path | None:
+        if name.startswith(".") or "/" in name or "\\" in name:
+            return None
+        run_dir = self.root / name
+        return run_dir if run_dir.is_dir() else None
+
+    def _index(self) -> None:
+        items = "".join(
+            f"<li><a href='/runs/{html.escape(p.name)}/'>{html.escape(p.name)}</a>"
+            + ("" if (p / "summary.md").exists() else " (running)")
+            + "</li>"
+            for p in reversed(list_runs(self.root))
+        )
+        body = (_INDEX % (items or "<li>(no runs)</li>")).encode("utf-8")
+        self._send(HTTPStatus.OK, body, "text/html; charset=utf-8")
+
+    def _send(self, status: HTTPStatus, body: bytes, ctype: str = "text/plain") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(
+    root: Path = Path("receipts"),
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    long_poll: float = LONG_POLL,
+) -> ThreadingHTTPServer:
+    """HTTP server for browsing receipts and following in-progress runs live.
+
+    ``/`` lists runs, ``/runs/<id>/`` is a live page that long-polls
+    ``/runs/<id>/events`` with the byte offsets it has read so far, and other
+    paths under a run serve its files (``summary.html`` is built on demand).
+    """
+    handler = type("ReceiptsHandler", (_Handler,), {"root": Path(root), "long_poll": long_poll})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
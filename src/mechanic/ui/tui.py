@@ -1,35 +1,23 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
-from typing import Any
-
-
-def _load_run(dir_path: Path) -> dict[str, Any]:
-    data: dict[str, Any] = {"summary": "", "diffs": []}
-    md = dir_path / "summary.md"
-    jl = dir_path / "steps.jsonl"
-    if md.exists():
-        data["summary"] = md.read_text(encoding="utf-8")
-    diffs: list[str] = []
-    if jl.exists():
-        for line in jl.read_text(encoding="utf-8").splitlines():
-            try:
-                ev = json.loads(line)
-            except Exception:
-                continue
-            if ev.get("type") == "patch" and ev.get("diff"):
-                diffs.append(ev["diff"])
-    data["diffs"] = diffs
-    return data
 
+from ..receipts import list_runs
+from .live import RunFollower, Watcher, describe
+from .runs import RunCache, RunInfo, window
+
+LIST_WINDOW = 200  # run rows materialized in the list at any time
+LIVE_MAX_LINES = 5000  # lines kept in the live log before the oldest are dropped
 
-def run_tui() -> None:
+
+def run_tui(live: bool = False) -> None:
+    """Browse receipts; with ``live`` the newest run is followed as it progresses."""
     try:
         from textual.app import App, ComposeResult
-        from textual.containers import Horizontal
+        from textual.containers import Horizontal, Vertical
         from textual.reactive import reactive
-        from textual.widgets import Footer, Header, Label, ListItem, ListView, Static
+        from textual.widgets import Footer, Header, Label, ListItem, ListView, Log, Static
+        from textual.worker import get_current_worker
     except Exception:
         print("Textual is not installed. Install with: pip install textual")
         return
@@ -41,9 +29,15 @@ def run_tui() -> None:
         .pane { width: 1fr; height: 1fr; }
         """
 
-        runs: reactive[list[Path]] = reactive([])
         current_index: reactive[int] = reactive(0)
         showing_diff: reactive[bool] = reactive(False)
+        diff_index: reactive[int] = reactive(-1)
+
+        def __init__(self) -> None:
+            super().__init__()
+            self.runs: list[Path] = []
+            self.cache = RunCache(maxsize=32)
+            self.win_start = 0
 
         def compose(self) -> ComposeResult:  # type: ignore[override]
             yield Header(show_clock=True)
@@ -51,60 +45,140 @@ def run_tui() -> None:
                 self.list_view = ListView(classes="pane")
                 self.right = Static("", classes="pane")
                 yield self.list_view
-                yield self.right
+                if live:
+                    self.live_log = Log(classes="pane", max_lines=LIVE_MAX_LINES)
+                    with Vertical(classes="pane"):
+                        yield self.right
+                        yield self.live_log
+                else:
+                    yield self.right
             yield Footer()
 
         def on_mount(self) -> None:  # type: ignore[override]
-            root = Path("receipts")
-            if root.exists():
-                self.runs = sorted([p for p in root.iterdir() if p.is_dir()])
-            else:
-                self.runs = []
+            self.runs = list_runs()
             if not self.runs:
                 self.right.update("No receipts yet. Run the CLI first.")
                 return
-            for p in self.runs:
+            self._select(len(self.runs) - 1)
+            if live:
+                self.run_worker(self._follow, thread=True, group="live")
+
+        # -- live tail ------------------------------------------------------------
+
+        def _follow(self) -> None:
+            """Tail the newest run from its last read offsets until it finishes."""
+            run_dir = self.runs[-1]
+            follower = RunFollower(run_dir)
+            watcher = Watcher([run_dir])
+            worker = get_current_worker()
+            try:
+                self.call_from_thread(self.live_log.write_line, f"Following {run_dir.name} …")
+                while not worker.is_cancelled:
+                    data = follower.wait(watcher, 1.0)
+                    lines = [describe(ev) for ev in data["events"]]
+                    lines += ["  │ " + ln for ln in data["output"]]
+                    if lines:
+                        self.call_from_thread(self.live_log.write_lines, lines)
+                    if data["finished"]:
+                        self.call_from_thread(self.live_log.write_line, "— run finished —")
+                        return
+            finally:
+                watcher.close()
+
+        # -- virtualized run list -------------------------------------------------
+
+        def _fill_window(self, index: int) -> None:
+            """Materialize only the rows around ``index``; the rest exist as paths."""
+            start, stop = window(len(self.runs), index, LIST_WINDOW)
+            if self.list_view.children and start == self.win_start:
+                return
+            self.win_start = start
+            self.list_view.clear()
+            for p in self.runs[start:stop]:
                 self.list_view.append(ListItem(Label(p.name)))
-            self.list_view.index = len(self.runs) - 1
-            self.current_index = self.list_view.index
-            self._render_current()
 
-        def action_toggle_view(self) -> None:
-            self.showing_diff = not self.showing_diff
-            self._render_current()
+        def _select(self, index: int) -> None:
+            self._fill_window(index)
+            self.list_view.index = index - self.win_start
+            self.current_index = index
+            self.diff_index = -1
+            self._load_current()
+
+        def on_list_view_highlighted(self, event: ListView.Highlighted) -> None:  # type: ignore[override]
+            idx = event.list_view.index
+            if idx is None:
+                return
+            absolute = self.win_start + idx
+            # Re-centre the window when the cursor reaches either edge of it.
+            if (idx == 0 and self.win_start > 0) or (
+                idx == len(self.list_view.children) - 1
+                and self.win_start + idx < len(self.runs) - 1
+            ):
+                self._fill_window(absolute)
+                self.list_view.index = absolute - self.win_start
 
         def on_list_view_selected(self, event: ListView.Selected) -> None:  # type: ignore[override]
-            self.current_index = event.index
-            self._render_current()
+            self.current_index = self.win_start + event.list_view.index
+            self.diff_index = -1
+            self._load_current()
+
+        # -- background loading ---------------------------------------------------
 
-        def _render_current(self) -> None:
+        def _load_current(self) -> None:
             if not self.runs:
                 return
             run = self.runs[self.current_index]
-            info = _load_run(run)
-            if not self.showing_diff:
-                summary = info.get("summary", "").strip()
-                diffs = info.get("diffs", [])
-                body = (
-                    f"[b]Run:[/b] {run}\n\n"
-                    + summary
-                    + "\n\n[b]Diffs:[/b]\n"
-                    + (
-                        "\n".join(f"#{i+1} ({len(d)} lines)" for i, d in enumerate(diffs))
-                        or "(none)"
-                    )
-                )
-                self.right.update(body)
-            else:
-                diffs = info.get("diffs", [])
-                if not diffs:
-                    self.right.update("(no diffs)")
-                else:
-                    # Show the last diff for simplicity
-                    self.right.update(diffs[-1])
+            want_diff, diff_index = self.showing_diff, self.diff_index
+            self.right.update(f"Loading {run.name}…")
+
+            def load() -> None:
+                info = self.cache.get(run)
+                text = self._diff_text(info, diff_index) if want_diff else None
+                self.call_from_thread(self._show, info, text)
+
+            self.run_worker(load, thread=True, exclusive=True, group="load")
+
+        def _diff_text(self, info: RunInfo, i: int) -> str:
+            n = len(info.index)
+            if not n:
+                return "(no diffs)"
+            i = i % n  # -1 is the last diff
+            return f"[diff {i + 1}/{n}]\n\n" + info.index.diff(i, info.path)
+
+        def _show(self, info: RunInfo, diff_text: str | None) -> None:
+            if self.runs[self.current_index] != info.path:
+                return  # a newer selection is already loading
+            if diff_text is not None:
+                self.right.update(diff_text)
+                return
+            n = len(info.index)
+            self.right.update(
+                f"[b]Run:[/b] {info.path}\n\n"
+                + info.summary.strip()
+                + f"\n\n[b]Diffs:[/b] {n or '(none)'}"
+                + ("  (enter: show, n/p: next/previous)" if n else "")
+            )
+
+        # -- actions --------------------------------------------------------------
+
+        def action_toggle_view(self) -> None:
+            self.showing_diff = not self.showing_diff
+            self._load_current()
+
+        def action_next_diff(self) -> None:
+            self.showing_diff = True
+            self.diff_index += 1
+            self._load_current()
+
+        def action_prev_diff(self) -> None:
+            self.showing_diff = True
+            self.diff_index -= 1
+            self._load_current()
 
         BINDINGS = [
             ("enter", "toggle_view", "Toggle summary/diff"),
+            ("n", "next_diff", "Next diff"),
+            ("p", "prev_diff", "Previous diff"),
         ]
 
     ReceiptsApp().run()
@@ -6,3 +6,6 @@ ROOT = Path(__file__).resolve().parents[1]
 SRC = ROOT / "src"
 if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
+# ... and the repo root for the ``benchmarks`` package
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
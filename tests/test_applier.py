@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import pytest
+
+from mechanic.applier import PatchApplyError, apply_to_text, apply_unified_diff
+from mechanic.diffmodel import parse_patch
+
+CALC = "def add(a, b):\n    return a + b\n\n\ndef sub(a, b):\n    return a + b\n"
+
+SUB_FIX = """--- a/calc.py
++++ b/calc.py
+@@ -4,3 +4,3 @@
+
+ def sub(a, b):
+-    return a + b
++    return a - b
+"""
+
+
+def test_applies_hunk_in_memory_and_writes_result(tmp_path: Path):
+    (tmp_path / "calc.py").write_text(CALC, encoding="utf-8")
+    assert apply_unified_diff(SUB_FIX, root=tmp_path) == ["calc.py"]
+    assert (tmp_path / "calc.py").read_text(encoding="utf-8").endswith("return a - b\n")
+
+
+def test_finds_hunk_at_an_offset(tmp_path: Path):
+    (tmp_path / "calc.py").write_text("import os\nimport sys\n\n" + CALC, encoding="utf-8")
+    apply_unified_diff(SUB_FIX, root=tmp_path)
+    text = (tmp_path / "calc.py").read_text(encoding="utf-8")
+    assert text.startswith("import os\n")
+    assert "return a - b" in text and text.count("return a + b") == 1
+
+
+def test_fuzz_tolerates_drifted_context(tmp_path: Path):
+    (tmp_path / "calc.py").write_text(CALC.replace("\n\n\ndef sub", "\n\n# note\ndef sub"))
+    with pytest.raises(PatchApplyError):
+        apply_unified_diff(SUB_FIX, root=tmp_path, fuzz=0)
+    apply_unified_diff(SUB_FIX, root=tmp_path, fuzz=1)
+    assert "return a - b" in (tmp_path / "calc.py").read_text()
+
+
+def test_preserves_crlf_line_endings(tmp_path: Path):
+    (tmp_path / "calc.py").write_bytes(CALC.replace("\n", "\r\n").encode())
+    apply_unified_diff(SUB_FIX, root=tmp_path)
+    data = (tmp_path / "calc.py").read_bytes()
+    assert b"return a - b\r\n" in data
+    assert b"\n" not in data.replace(b"\r\n", b"")
+
+
+def test_multi_file_patch_with_creation_and_deletion(tmp_path: Path):
+    (tmp_path / "old.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "keep.py").write_text("a = 1\nb = 2\nc = 3\nd = 4\ne = 5\nf = 6\ng = 7\n")
+    diff = """--- a/old.py
++++ /dev/null
+@@ -1 +0,0 @@
+-x = 1
+--- /dev/null
++++ b/pkg/new.py
+@@ -0,0 +1,2 @@
++y = 2
++z = 3
+\\ No newline at end of file
+--- a/keep.py
++++ b/keep.py
+@@ -1,2 +1,2 @@
+-a = 1
++a = 10
+ b = 2
+@@ -6,2 +6,2 @@
+ f = 6
+-g = 7
++g = 70
+"""
+    assert len(parse_patch(diff).files) == 3
+    apply_unified_diff(diff, root=tmp_path)
+    assert not (tmp_path / "old.py").exists()
+    assert (tmp_path / "pkg" / "new.py").read_text() == "y = 2\nz = 3"
+    assert (
+        tmp_path / "keep.py"
+    ).read_text() == "a = 10\nb = 2\nc = 3\nd = 4\ne = 5\nf = 6\ng = 70\n"
+
+
+def test_failed_hunk_leaves_every_file_untouched(tmp_path: Path):
+    (tmp_path / "calc.py").write_text(CALC, encoding="utf-8")
+    (tmp_path / "other.py").write_text("value = 1\n", encoding="utf-8")
+    diff = SUB_FIX + "--- a/other.py\n+++ b/other.py\n@@ -1 +1 @@\n-value = 2\n+value = 3\n"
+    with pytest.raises(PatchApplyError, match="other.py: hunk #1"):
+        apply_unified_diff(diff, root=tmp_path)
+    assert (tmp_path / "calc.py").read_text(encoding="utf-8") == CALC
+
+
+def test_rejects_paths_outside_root(tmp_path: Path):
+    diff = "--- /dev/null\n+++ b/../escape.py\n@@ -0,0 +1 @@\n+x = 1\n"
+    with pytest.raises(PatchApplyError):
+        apply_unified_diff(diff, root=tmp_path / "inner")
+
+
+def test_loose_matching_ignores_trailing_whitespace_but_not_indentation():
+    src = "def f(x):\n    if x:\n        return 1  \n    return 2\n"
+    (fp,) = parse_patch(
+        "--- a/f.py\n+++ b/f.py\n@@ -3 +3 @@\n-        return 1\n+        return 3\n"
+    ).files
+    assert apply_to_text(src, fp) == "def f(x):\n    if x:\n        return 3\n    return 2\n"
+    (fp,) = parse_patch("--- a/f.py\n+++ b/f.py\n@@ -3 +3 @@\n-return 1\n+return 3\n").files
+    with pytest.raises(PatchApplyError, match="hunk #1 does not apply"):
+        apply_to_text(src, fp)
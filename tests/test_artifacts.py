@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+
+from mechanic import artifacts
+from mechanic.artifacts import ArtifactStore
+from mechanic.receipts import ReceiptRun, list_runs
+from mechanic.ui.receipts_html import build_html
+
+
+def test_blobs_are_deduplicated_across_runs(tmp_path: Path):
+    text = "x" * 5000
+    one = ArtifactStore(tmp_path / "run1")
+    two = ArtifactStore(tmp_path / "run2")
+    ref = one.put(text)
+    assert two.put(text) == ref
+    assert ref["size"] == 5000 and len(ref["head"]) == artifacts.EXCERPT
+    assert len(list((tmp_path / ".artifacts").iterdir())) == 1
+    assert (tmp_path / "run1" / "artifacts" / f"{ref['artifact']}.gz").stat().st_nlink >= 2
+    assert artifacts.load(tmp_path / "run2", ref) == text
+    assert artifacts.load(tmp_path / "run2", "inline") == "inline"
+
+
+def test_long_event_strings_become_refs_resolved_by_viewer(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    diff = "--- a/src/a.py\n+++ b/src/a.py\n@@ -1 +1 @@\n-x = 1\n+x = 2\n" + "#" * 4000
+    run = ReceiptRun.start_run(meta={"test": True})
+    assert run.log_event({"type": "patch", "diff": diff, "lint": {"out": "short"}})
+    run.close()
+
+    events = [json.loads(line) for line in run.steps_path.read_text(encoding="utf-8").splitlines()]
+    stored = events[-1]
+    assert artifacts.is_ref(stored["diff"]) and stored["lint"] == {"out": "short"}
+    assert run.steps_path.stat().st_size < 1500
+    page = build_html(run.run_dir).read_text(encoding="utf-8")
+    assert "src/a.py +1 -1" in page
+    fragments = list((run.run_dir / "fragments").iterdir())
+    assert len(fragments) == 1 and "x = 2" in fragments[0].read_text(encoding="utf-8")
+    assert list_runs() == [run.run_dir]
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from mechanic.batch import (
+    Sweep,
+    SweepOptions,
+    TargetResult,
+    cpu_slots,
+    expand_targets,
+    report,
+    run_sweep,
+)
+from mechanic.receipts import new_run_dir
+
+
+def test_run_dirs_are_unique_and_ordered(tmp_path: Path):
+    dirs = [new_run_dir(tmp_path) for _ in range(50)]
+    assert len(set(dirs)) == 50 and sorted(dirs) == dirs
+
+
+def test_targets_globs_and_resume_state(tmp_path: Path):
+    for name in ("a", "b", "c"):
+        (tmp_path / "repos" / name).mkdir(parents=True)
+    (tmp_path / "list.txt").write_text(f"# nightly\n{tmp_path / 'repos' / 'a'}\n")
+    targets = expand_targets([str(tmp_path / "repos" / "*"), "missing"], tmp_path / "list.txt")
+    assert [Path(t).name for t in targets] == ["a", "b", "c"]
+
+    sweep = Sweep.create(targets, SweepOptions(), str(tmp_path / "receipts"), timeout=5)
+    sweep.record(TargetResult(targets[0], "done", failures_before=2, failures_after=0))
+    sweep.record(TargetResult(targets[1], "timeout"))
+    with (sweep.dir / "results.jsonl").open("a") as f:
+        f.write('{"target": "torn')
+
+    loaded = Sweep.load(sweep.id, str(tmp_path / "receipts"))
+    assert loaded.timeout == 5 and loaded.pending() == targets[2:]
+    assert loaded.pending(retry=True) == targets[1:]
+    summary = report(loaded)
+    assert summary["fixed"] == 1 and summary["pending"] == 1
+    assert "| timeout |" in (sweep.dir / "report.md").read_text()
+
+
+def test_cpu_slots_split_the_budget():
+    n, slots = cpu_slots(jobs=3, cpus_per_target=1)
+    assert n == 3 and len(slots) == 3
+    assert all(s is None or len(s) == 1 for s in slots)
+
+
+def test_sweep_times_out_one_target_and_finishes_the_rest(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ok, slow = tmp_path / "ok" / "tests", tmp_path / "slow" / "tests"
+    ok.mkdir(parents=True)
+    slow.mkdir(parents=True)
+    (ok / "test_ok.py").write_text("def test_ok():\n    assert True\n")
+    (slow / "test_slow.py").write_text("import time\n\n\ndef test_slow():\n    time.sleep(60)\n")
+
+    targets = expand_targets([str(tmp_path / "ok"), str(tmp_path / "slow")])
+    sweep = Sweep.create(targets, SweepOptions(), "receipts", timeout=4)
+    results = {Path(r.target).name: r for r in run_sweep(sweep, jobs=2)}
+    assert results["ok"].status == "done" and results["ok"].failures_before == 0
+    assert results["ok"].run_dir and Path(results["ok"].run_dir, "summary.md").exists()
+    assert results["slow"].status == "timeout"
+    assert Sweep.load(sweep.id).pending() == []
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+from benchmarks.harness import compare
+from benchmarks.synth import SynthSpec, generate, make_diffs, make_module
+from mechanic.failure_classifier import classify
+from mechanic.patches import apply_patches
+from mechanic.tools import pytest_tool
+
+
+def test_generated_repo_fails_with_each_injected_kind(tmp_path: Path):
+    spec = SynthSpec(modules=3, functions=4, tests=15, bugs=5, fixable=False)
+    repo = generate(tmp_path / "synth", spec)
+    assert sorted(b["kind"] for b in repo.bugs) == sorted(spec.kinds)
+
+    res = pytest_tool.run(repo.root, ["-p", "no:cacheprovider"])
+    assert res["counts"]["passed"] > 0
+    kinds = {classify(f"{f.get('exc_type') or ''} {f.get('msg') or ''}") for f in res["failures"]}
+    assert kinds == set(spec.kinds)
+
+
+def test_diffs_apply_as_one_plan(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_module(tmp_path / "src" / "m.py", 60)
+    diffs = make_diffs(tmp_path / "src" / "m.py", "src/m.py", 3, 10)
+    results = apply_patches(diffs, root=tmp_path, dry_run=False)
+    assert all(r.ok and r.changed_lines == 20 for r in results)
+    assert (tmp_path / "src" / "m.py").read_text().count("= -") == 30
+
+
+def test_compare_flags_regressions_by_direction():
+    base = {"metrics": {"wall": {"value": 1.0, "better": "lower"}, "rate": {"value": 100.0}}}
+    base["metrics"]["rate"]["better"] = "higher"
+    cur = {
+        "metrics": {
+            "wall": {"value": 1.1, "better": "lower"},
+            "rate": {"value": 50.0, "better": "higher"},
+            "new": {"value": 1.0},
+        }
+    }
+    rows = {r["metric"]: r for r in compare(cur, base, threshold=0.25)}
+    assert set(rows) == {"wall", "rate"}
+    assert not rows["wall"]["regressed"] and rows["rate"]["regressed"]
@@ -0,0 +1,79 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from mechanic.patches import apply_patches
+from mechanic.tools import black_engine
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _tree(root: Path, n: int) -> list[str]:
+    (root / "src").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[tool.black]\nline-length = 60\n", encoding="utf-8")
+    files = []
+    for i in range(n):
+        rel = f"src/m{i}.py"
+        body = "x = 1\n" if i % 2 else f"def f{i}( a,b ):\n    return {{'a':a,'b':b}}\n"
+        (root / rel).write_text(body, encoding="utf-8")
+        files.append(rel)
+    return files
+
+
+@pytest.mark.parametrize("n", [3, black_engine.POOL_MIN_FILES + 2])
+def test_engine_matches_black_check_and_its_diffs_apply(tmp_path: Path, monkeypatch, n: int):
+    monkeypatch.chdir(tmp_path)
+    files = _tree(tmp_path, n)
+    records = black_engine.format_files(tmp_path, files)
+    cli = subprocess.run(["black", "--check", "-q", *files], cwd=tmp_path)
+    assert black_engine.exit_code(records) == cli.returncode == 1
+    assert [r.path for r in records if r.changed] == files[::2]
+
+    results = apply_patches([r.diff for r in records if r.changed], root=tmp_path, dry_run=False)
+    assert all(r.ok for r in results)
+    assert black_engine.exit_code(black_engine.format_files(tmp_path, files)) == 0
+    assert subprocess.run(["black", "--check", "-q", "src"], cwd=tmp_path).returncode == 0
+
+
+def test_mode_comes_from_the_project_config(tmp_path: Path):
+    _tree(tmp_path, 1)
+    assert black_engine.load_mode(tmp_path / "src").line_length == 60
+    (tmp_path / "src" / "bad.py").write_text("def (\n", encoding="utf-8")
+    (rec,) = black_engine.format_files(tmp_path, ["src/bad.py"])
+    assert rec.error and not rec.changed and black_engine.exit_code([rec]) == 123
+
+
+def test_write_mode_formats_patched_files(tmp_path: Path, monkeypatch):
+    from mechanic.cli import run_core
+
+    target = tmp_path / "fixtures" / "calc"
+    shutil.copytree(ROOT / "fixtures" / "broken-calculator", target)
+    calc = target / "calc" / "__init__.py"
+    calc.write_text(calc.read_text(encoding="utf-8") + "\n\nVALUES=[ 1,2 ]\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    run_dir = run_core(
+        path=str(target),
+        fix_tests=True,
+        lint=False,
+        dry_run=False,
+        max_steps=10,
+        warm=False,
+        full_verify=True,
+        evaluate=False,
+        jobs=0,
+        scratch=False,
+        with_trace=False,
+        receipts_root="receipts",
+        lint_cache=False,
+        format_patched=True,
+        shards=1,
+    )
+    assert "VALUES = [1, 2]" in calc.read_text(encoding="utf-8")
+    events = [json.loads(line) for line in (run_dir / "steps.jsonl").open(encoding="utf-8")]
+    (fmt,) = [e for e in events if e["type"] == "format"]
+    (rec,) = fmt["files"]
+    assert rec["path"] == "fixtures/calc/calc/__init__.py" and rec["changed"] and rec["ok"]
@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from mechanic.catalog import Catalog
+from mechanic.receipts import ReceiptRun
+
+
+def _run(n: int) -> ReceiptRun:
+    run = ReceiptRun.start_run(
+        meta={"timestamp": f"2026-01-0{n}T00:00:00Z", "path": "/repo", "dry_run": True}
+    )
+    failure = {"nodeid": "t.py::test_div", "exc_type": "ZeroDivisionError", "msg": "boom"}
+    run.log_event({"type": "pytest", "phase": "before", "code": 1, "failures": [failure]})
+    run.log_event(
+        {
+            "type": "patch",
+            "index": 0,
+            "ok": True,
+            "files": ["fixtures/demo/calc/__init__.py"],
+            "stats": {"fixtures/demo/calc/__init__.py": [1, 1]},
+        }
+    )
+    run.log_event({"type": "pytest", "phase": "after", "code": 0, "failures": []})
+    run.close()
+    return run
+
+
+def test_runs_and_events_are_indexed_as_they_are_logged(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run = _run(1)
+
+    catalog = Catalog.open()
+    assert catalog.latest_run() == run.run_dir
+    rows = catalog.runs(file="calc/__init__.py")
+    assert [r["id"] for r in rows] == [run.run_dir.name]
+    assert rows[0]["failures_before"] == 1 and rows[0]["failures_after"] == 0
+    assert catalog.runs(file="alc/__init__.py") == []
+    failures = catalog.query("SELECT nodeid, category FROM failures")
+    assert failures == [{"nodeid": "t.py::test_div", "category": "ZeroDivision"}]
+    assert [r["type"] for r in catalog.query("SELECT type FROM events ORDER BY seq")] == [
+        "meta",
+        "pytest",
+        "patch",
+        "pytest",
+    ]
+    catalog.close()
+
+
+def test_reindex_rebuilds_from_steps_files(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run = _run(2)
+    (tmp_path / "receipts" / "catalog.sqlite3").unlink()
+    for suffix in ("-wal", "-shm"):
+        (tmp_path / "receipts" / f"catalog.sqlite3{suffix}").unlink(missing_ok=True)
+
+    catalog = Catalog.open()
+    assert catalog.latest_run() is None
+    assert catalog.reindex() == 1
+    assert catalog.latest_run() == run.run_dir
+    assert catalog.failure_trend("/repo") == [
+        {
+            "id": run.run_dir.name,
+            "started": "2026-01-02T00:00:00Z",
+            "failures_before": 1,
+            "failures_after": 0,
+        }
+    ]
+    catalog.close()
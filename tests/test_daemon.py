@@ -0,0 +1,115 @@
+import json
+import socket
+import threading
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from mechanic.cli import app
+from mechanic.config import CONFIG_NAME, get_config
+from mechanic.daemon import DaemonError, DaemonUnavailable, make_server, request, submit_run
+
+
+def test_config_reloads_when_the_file_changes(tmp_path: Path):
+    assert get_config(tmp_path).max_patch_lines == 200
+    cfg = tmp_path / CONFIG_NAME
+    cfg.write_text("[guards]\nmax_patch_lines = 50\n", encoding="utf-8")
+    assert get_config(tmp_path).max_patch_lines == 50
+    assert get_config(tmp_path) is get_config(tmp_path)
+    cfg.write_text("[guards]\nmax_patch_lines = 7\n", encoding="utf-8")
+    assert get_config(tmp_path).max_patch_lines == 7
+    cfg.unlink()
+    assert get_config(tmp_path).max_patch_lines == 200
+
+
+@pytest.fixture
+def daemon(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = make_server(Path(".mechanic/daemon.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_daemon_runs_in_the_client_cwd_and_streams_events(daemon, tmp_path: Path):
+    sock = daemon.path
+    repo = tmp_path / "repo" / "tests"
+    repo.mkdir(parents=True)
+    (repo / "test_ok.py").write_text("def test_ok():\n    assert True\n", encoding="utf-8")
+    with pytest.raises(DaemonError, match="already listening"):
+        make_server(Path(".mechanic/daemon.sock"))
+
+    messages = []
+    done = submit_run({"path": str(repo.parent)}, sock, messages.append)
+    assert done["code"] == 0 and done["error"] is None
+    run_dir = Path(done["run_dir"])
+    assert run_dir.parent == tmp_path / "receipts" and (run_dir / "summary.md").exists()
+    events = [m["event"]["type"] for m in messages if m["type"] == "event"]
+    assert events[0] == "start" and "pytest" in events
+    assert any(m["type"] == "echo" and m["text"].startswith("Receipts") for m in messages)
+
+    done = submit_run({"path": str(tmp_path / "missing")}, sock)
+    assert done["code"] == 2 and done["run_dir"] is None
+    (status,) = request({"op": "status"}, sock)
+    assert status["runs"] == 2 and not status["busy"]
+
+
+def test_stop_closes_the_socket(daemon):
+    assert next(request({"op": "stop"}, daemon.path))["type"] == "stopping"
+    daemon.server_close()
+    assert not daemon.path.exists()
+    with pytest.raises(DaemonError):
+        next(request({"op": "status"}, daemon.path))
+
+
+@pytest.mark.parametrize("reply", [{"type": "queued"}, {"type": "event", "event": {}}])
+def test_a_dropped_run_is_an_error_not_a_local_rerun(tmp_path: Path, monkeypatch, reply):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "tests").mkdir()
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind("d.sock")
+    listener.listen()
+
+    def serve() -> None:
+        for _ in range(2):
+            conn, _ = listener.accept()
+            with conn, conn.makefile("rb") as f:
+                f.readline()
+                conn.sendall((json.dumps(reply) + "\n").encode())
+
+    threading.Thread(target=serve, daemon=True).start()
+    try:
+        with pytest.raises(DaemonError) as e:
+            submit_run({"path": str(tmp_path)}, Path("d.sock"))
+        assert not isinstance(e.value, DaemonUnavailable)
+
+        res = CliRunner().invoke(app, ["run", ".", "--daemon", "--socket", "d.sock"])
+        assert res.exit_code == 1 and not (tmp_path / "receipts").exists()
+    finally:
+        listener.close()
+    with pytest.raises(DaemonUnavailable):
+        next(request({"op": "status"}, Path("missing.sock")))
+
+
+def test_messages_sent_from_several_threads_stay_whole_lines(daemon, monkeypatch):
+    def run(req, send):
+        def burst(n: int) -> None:
+            for i in range(50):
+                send({"type": "output", "stream": "stdout", "line": f"{n}:{i}:" + "x" * 50_000})
+
+        threads = [threading.Thread(target=burst, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        send({"type": "done", "code": 0, "run_dir": None, "error": None})
+
+    monkeypatch.setattr(daemon, "run", run)
+    messages = []
+    assert submit_run({}, daemon.path, messages.append)["code"] == 0
+    assert sorted(m["line"].split(":", 2)[:2] for m in messages) == sorted(
+        [str(n), str(i)] for n in range(4) for i in range(50)
+    )
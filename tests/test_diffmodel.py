@@ -0,0 +1,35 @@
+from mechanic.diffmodel import parse_patch
+from mechanic.guards import count_changed_lines
+
+DIFF = """--- a/calc.py
++++ b/calc.py
+@@ -4,3 +4,3 @@
+
+ def sub(a, b):
+-    return a + b
++    return a - b
+--- /dev/null
++++ b/new.py
+@@ -0,0 +1 @@
++x = 1
+\\ No newline at end of file
+"""
+
+
+def test_parses_files_hunks_and_stats_in_one_pass():
+    parsed = parse_patch(DIFF)
+    assert [fp.path for fp in parsed.files] == ["calc.py", "new.py"]
+    assert parsed.files[1].old_path is None
+    assert parsed.changed_lines == 3
+    assert parsed.stats() == {"calc.py": [1, 1], "new.py": [1, 0]}
+    hunk = parsed.files[0].hunks[0]
+    assert hunk.lines == [" ", " def sub(a, b):", "-    return a + b", "+    return a - b"]
+    assert not parsed.files[1].hunks[0].new_eof_newline
+
+
+def test_hunks_reference_the_buffer_and_crlf_is_tolerated():
+    parsed = parse_patch(DIFF.replace("\n", "\r\n"))
+    assert parsed.paths == {"calc.py", "new.py"}
+    assert parsed.files[0].hunks[0].lines[2] == "-    return a + b"
+    assert parse_patch(parsed) is parsed
+    assert count_changed_lines(parsed) == 3
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+import pytest
+
+from mechanic.diffmodel import parse_patch
+from mechanic.evaluate import best_set, evaluate_candidates
+from mechanic.tools import pytest_tool
+
+MATH = "def add(a, b):\n    return a - b\n\n\ndef neg(a):\n    return -a\n"
+TESTS = (
+    "from mathlib import add, neg\n\n\n"
+    "def test_add():\n    assert add(1, 2) == 3\n\n\n"
+    "def test_neg():\n    assert neg(2) == -2\n"
+)
+
+
+def _diff(old: str, new: str) -> str:
+    return (
+        "--- a/src/mathlib.py\n+++ b/src/mathlib.py\n"
+        f"@@ -1,2 +1,2 @@\n def add(a, b):\n-{old}\n+{new}\n"
+    )
+
+
+@pytest.fixture
+def target(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    root = tmp_path / "src"
+    root.mkdir()
+    (root / "mathlib.py").write_text(MATH, encoding="utf-8")
+    (root / "test_mathlib.py").write_text(TESTS, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    return root
+
+
+def test_ranks_candidates_and_leaves_the_real_tree_alone(target: Path):
+    before = pytest_tool.run(target, ["-p", "no:cacheprovider"])
+    patches = [
+        parse_patch(_diff("    return a - b", "    return a * b")),
+        parse_patch(_diff("    return a - b", "    return a + b")),
+        parse_patch(_diff("    return a / b", "    return 0")),
+    ]
+    ranking = evaluate_candidates(target, patches, before, max_workers=3)
+
+    assert best_set(ranking) == (1,)
+    assert ranking[0].fixed == ["test_mathlib.py::test_add"]
+    assert ranking[-1].patches == (2,) and not ranking[-1].applied
+    assert (target / "mathlib.py").read_text(encoding="utf-8") == MATH
+
+
+def test_no_winner_when_nothing_is_fixed(target: Path):
+    before = pytest_tool.run(target, ["-p", "no:cacheprovider"])
+    patches = [parse_patch(_diff("    return a - b", "    return a * b"))]
+    assert best_set(evaluate_candidates(target, patches, before)) == ()
@@ -0,0 +1,98 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from mechanic.impact import ImpactIndex, merge_results
+from mechanic.tools import pytest_tool
+
+pytest.importorskip("pytest_cov")
+
+
+def _make_target(root: Path) -> None:
+    (root / "alpha.py").write_text("def a():\n    return 1\n", encoding="utf-8")
+    (root / "beta.py").write_text("def b():\n    return 2\n", encoding="utf-8")
+    (root / "test_alpha.py").write_text(
+        "from alpha import a\n\n\ndef test_a():\n    assert a() == 1\n", encoding="utf-8"
+    )
+    (root / "test_beta.py").write_text(
+        "from beta import b\n\n\ndef test_b():\n    assert b() == 3\n", encoding="utf-8"
+    )
+
+
+def test_index_maps_tests_to_files_and_selects_impacted(tmp_path: Path):
+    _make_target(tmp_path)
+    index = ImpactIndex(tmp_path)
+    res = pytest_tool.run(tmp_path, ["-p", "no:cacheprovider"] + index.pytest_args())
+    index.update(t["nodeid"] for t in res["tests"])
+    index.save()
+
+    loaded = ImpactIndex.load(tmp_path)
+    assert loaded.tests["test_alpha.py::test_a"]["alpha.py"] == [2]
+    assert "beta.py" not in loaded.tests["test_alpha.py::test_a"]
+    assert loaded.impacted({"beta.py"}) == {"test_beta.py::test_b"}
+    assert loaded.impacted({"test_alpha.py"}) == {"test_alpha.py::test_a"}
+    assert loaded.changed_files() == set()
+
+    (tmp_path / "alpha.py").write_text("def a():\n    return 10\n", encoding="utf-8")
+    assert loaded.changed_files() == {"alpha.py"}
+
+
+def test_merge_results_keeps_outcomes_of_tests_not_rerun():
+    before = {
+        "tests": [
+            {"nodeid": "t::a", "outcome": "failed"},
+            {"nodeid": "t::b", "outcome": "failed"},
+            {"nodeid": "t::c", "outcome": "passed"},
+        ],
+        "failures": [
+            {"nodeid": "t::a", "outcome": "failed"},
+            {"nodeid": "t::b", "outcome": "failed"},
+        ],
+    }
+    subset = {"tests": [{"nodeid": "t::a", "outcome": "passed"}], "failures": []}
+
+    merged = merge_results(before, subset)
+    assert [f["nodeid"] for f in merged["failures"]] == ["t::b"]
+    assert merged["counts"] == {"failed": 1, "passed": 2}
+    assert merged["selected"] == ["t::a"]
+
+
+def test_state_dir_ignores_itself_in_the_target_repo(tmp_path: Path):
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    ImpactIndex(tmp_path).save()
+    assert (tmp_path / ".mechanic" / "impact.json").exists()
+    status = subprocess.run(
+        ["git", "status", "--porcelain", "--untracked-files=all"],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert status.stdout == ""
+
+
+def test_verify_runs_changed_test_modules_the_index_does_not_know(tmp_path: Path):
+    from mechanic.cli import _verify
+
+    _make_target(tmp_path)
+    index = ImpactIndex(tmp_path)
+    before = pytest_tool.run(tmp_path, index.pytest_args())
+    index.update(t["nodeid"] for t in before["tests"])
+    (tmp_path / "test_gamma.py").write_text("def test_g():\n    assert False\n", encoding="utf-8")
+    with (tmp_path / "test_alpha.py").open("a", encoding="utf-8") as f:
+        f.write("\n\ndef test_a2():\n    assert a() == 2\n")
+
+    after = _verify(tmp_path, before, {"test_gamma.py", "test_alpha.py"}, index, warm=False)
+    assert after["selected"] == [
+        "test_alpha.py::test_a",
+        "test_alpha.py::test_a2",
+        "test_beta.py::test_b",
+        "test_gamma.py::test_g",
+    ]
+    assert sorted(f["nodeid"] for f in after["failures"]) == [
+        "test_alpha.py::test_a2",
+        "test_beta.py::test_b",
+        "test_gamma.py::test_g",
+    ]
+    assert "test_gamma.py::test_g" in index.tests
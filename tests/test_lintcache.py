@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from mechanic.tools import black_tool, ruff_tool
+
+
+def _repo(root: Path) -> Path:
+    (root / "pkg").mkdir(parents=True)
+    (root / "pyproject.toml").write_text("[tool.ruff]\nline-length = 100\n", encoding="utf-8")
+    (root / "pkg" / "a.py").write_text("x = 1\n", encoding="utf-8")
+    (root / "pkg" / "b.py").write_text("import os\n", encoding="utf-8")
+    (root / "pkg" / "c.py").write_text("y=2\n", encoding="utf-8")
+    return root
+
+
+def test_ruff_only_rechecks_changed_files_and_merges_cached_diagnostics(tmp_path: Path):
+    root = _repo(tmp_path)
+    first = ruff_tool.run(root, cache=True)
+    assert first["code"] == 1 and first["cache"] == {"files": 3, "hits": 0, "misses": 3}
+    assert "pkg/b.py:1:8: F401" in first["out"]
+
+    (root / "pkg" / "a.py").write_text("import sys\n", encoding="utf-8")
+    second = ruff_tool.run(root, cache=True)
+    assert second["cache"] == {"files": 3, "hits": 2, "misses": 1}
+    assert "pkg/a.py:1:8: F401" in second["out"] and "pkg/b.py:1:8: F401" in second["out"]
+
+    (root / "pkg" / "a.py").write_text("x = 1\n", encoding="utf-8")
+    (root / "pkg" / "b.py").write_text("x = 2\n", encoding="utf-8")
+    clean = ruff_tool.run(root, cache=True)
+    assert clean["code"] == 0 and clean["cache"]["misses"] == 2
+
+    # Any config edit invalidates every cached verdict.
+    (root / "pyproject.toml").write_text("[tool.ruff]\nline-length = 88\n", encoding="utf-8")
+    assert ruff_tool.run(root, cache=True)["cache"]["hits"] == 0
+    assert ruff_tool.run(root, cache=True)["cache"]["hits"] == 3
+
+
+def test_black_caches_verdicts_but_not_parse_errors(tmp_path: Path):
+    root = _repo(tmp_path)
+    (root / "pkg" / "d.py").write_text("def (\n", encoding="utf-8")
+    first = black_tool.run(root, cache=True)
+    assert first["code"] == 123 and "would reformat pkg/c.py" in first["err"]
+
+    second = black_tool.run(root, cache=True)
+    assert second["code"] == 123 and second["cache"] == {"files": 4, "hits": 3, "misses": 1}
+    assert "would reformat pkg/c.py" in second["err"] and "pkg/d.py" in second["err"]
+
+    (root / "pkg" / "d.py").unlink()
+    (root / "pkg" / "c.py").write_text("y = 2\n", encoding="utf-8")
+    done = black_tool.run(root, cache=True)
+    assert done["code"] == 0 and done["cache"]["misses"] == 1
+
+
+def test_black_config_excludes_apply_to_explicit_files(tmp_path: Path):
+    root = _repo(tmp_path)
+    (root / "pkg" / "c.py").write_text("y = 2\n", encoding="utf-8")
+    (root / "gen").mkdir()
+    (root / "gen" / "out.py").write_text("z=3\n", encoding="utf-8")
+    text = (root / "pyproject.toml").read_text(encoding="utf-8")
+    (root / "pyproject.toml").write_text(
+        text + "\n[tool.black]\nextend-exclude = '^/gen/'\n", encoding="utf-8"
+    )
+    assert black_tool.run(root, check=True)["code"] == 0
+    res = black_tool.run(root, cache=True)
+    assert res["code"] == 0 and res["cache"]["files"] == 4
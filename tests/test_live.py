@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+from mechanic.receipts import ReceiptRun
+from mechanic.ui.live import RunFollower, Tail, Watcher, describe
+from mechanic.ui.serve import events_payload, make_server
+
+
+def test_tail_returns_only_complete_new_lines(tmp_path: Path):
+    path = tmp_path / "steps.jsonl"
+    tail = Tail(path)
+    assert tail.read_events() == []
+    path.write_text('{"type": "meta"}\n{"type": "pa', encoding="utf-8")
+    assert tail.read_events() == [{"type": "meta"}]
+    with path.open("a", encoding="utf-8") as f:
+        f.write('tch"}\n')
+    assert tail.read_events() == [{"type": "patch"}]
+    assert tail.read_events() == []
+
+    path.write_text('{"type": "new"}\n', encoding="utf-8")  # replaced by a shorter file
+    assert tail.read_events() == [{"type": "new"}]
+
+
+def test_tail_reads_past_lines_longer_than_its_window(tmp_path: Path, monkeypatch):
+    path = tmp_path / "steps.jsonl"
+    tail = Tail(path)
+    long = json.dumps({"type": "lint", "out": "x" * 100})
+    path.write_text(long[:50], encoding="utf-8")
+    assert tail.read_lines(limit=16) == [] and tail.offset == 0
+    with path.open("a", encoding="utf-8") as f:
+        f.write(long[50:] + '\n{"type": "next"}\n')
+    assert tail.read_lines(limit=16) == [long]
+    assert tail.read_events() == [{"type": "next"}]
+
+    monkeypatch.setattr(Tail, "MAX_LINE", 64)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(long + '\n{"type": "after"}\n')
+    assert tail.read_lines(limit=16) == []
+    assert tail.read_events() == [{"type": "after"}]
+
+
+def test_watcher_wakes_on_append_in_both_modes(tmp_path: Path):
+    (tmp_path / "steps.jsonl").write_text("", encoding="utf-8")
+    for force_poll in (False, True):
+        watcher = Watcher([tmp_path], poll_interval=0.02)
+        if force_poll:
+            watcher.close()
+            assert watcher.mode == "poll"
+        assert watcher.wait(0.05) is False
+
+        def append() -> None:
+            time.sleep(0.1)
+            with (tmp_path / "steps.jsonl").open("a", encoding="utf-8") as f:
+                f.write("{}\n")
+
+        t = threading.Thread(target=append)
+        t.start()
+        assert watcher.wait(5.0) is True
+        t.join()
+        watcher.close()
+
+
+def test_run_streams_output_and_timing_to_followers(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run = ReceiptRun.start_run(meta={"path": "x"}, durability="none")
+    follower = RunFollower(run.run_dir)
+    assert [e["type"] for e in follower.poll()["events"]] == ["meta"]
+
+    run.log_event({"type": "pytest", "phase": "before", "code": 1, "counts": {"failed": 1}})
+    run.flush_interval = 0.0
+    run.output("out", "F.")
+    run.output("err", "warning")
+    data = follower.poll()
+    assert data["output"] == ["F.", "[err] warning"]
+    (event,) = data["events"]
+    assert event["t"] >= 0 and "failed=1" in describe(event)
+
+    run.write_summary("done", [])
+    run.close()
+    assert follower.poll()["finished"] is True
+
+
+def test_serve_long_polls_from_offsets(tmp_path: Path):
+    run_dir = tmp_path / "receipts" / "r1"
+    run_dir.mkdir(parents=True)
+    steps = run_dir / "steps.jsonl"
+    steps.write_text(json.dumps({"type": "meta"}) + "\n", encoding="utf-8")
+    first = events_payload(run_dir)
+    assert len(first["events"]) == 1 and not first["finished"]
+
+    server = make_server(tmp_path / "receipts", port=0, long_poll=5.0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        assert "r1" in urllib.request.urlopen(base + "/").read().decode()
+
+        def append() -> None:
+            time.sleep(0.2)
+            with steps.open("a", encoding="utf-8") as f:
+                f.write(json.dumps({"type": "patch", "index": 0}) + "\n")
+
+        threading.Thread(target=append).start()
+        ev, out = first["offsets"]
+        url = f"{base}/runs/r1/events?events={ev}&output={out}"
+        data = json.loads(urllib.request.urlopen(url).read())
+        assert [e["type"] for e in data["events"]] == ["patch"]
+        assert data["offsets"][0] == steps.stat().st_size
+
+        for bad in ("/runs/..%2F/events", "/runs/r1/..%2F..%2Fsecret"):
+            try:
+                urllib.request.urlopen(base + bad)
+                raise AssertionError(bad)
+            except urllib.error.HTTPError as e:
+                assert e.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,4 +1,6 @@
+from mechanic import applier
 from mechanic.guards import count_changed_lines, is_path_allowed, validate_patch
+from mechanic.patches import apply_patches
 
 
 def test_is_path_allowed_basic():
@@ -39,3 +41,60 @@ index 1111111..2222222 100644
     assert not ok
     assert any("paths not allowed" in r for r in reasons)
     assert any("exceeds max" in r for r in reasons)
+
+
+CALC = "def add(a, b):\n    return a + b\n\n\ndef sub(a, b):\n    return a + b\n"
+
+
+def _fix(old: str, new: str, start: int) -> str:
+    return f"--- a/src/calc.py\n+++ b/src/calc.py\n@@ -{start},1 +{start},1 @@\n-{old}\n+{new}\n"
+
+
+def test_apply_patches_batches_diffs_and_flushes_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "calc.py").write_text(CALC, encoding="utf-8")
+    diffs = [
+        _fix("    return a + b", "    return a - b", 6),
+        _fix("    return a + b", "    return b + a", 2),
+        _fix("    return a + b", "    return a * b", 6),  # same line as the first diff
+    ]
+    res = apply_patches(diffs, root=tmp_path, dry_run=False)
+
+    assert [r.ok for r in res] == [True, True, False]
+    assert res[2].reasons == ["overlaps patch #0 in src/calc.py"]
+    text = (tmp_path / "src" / "calc.py").read_text(encoding="utf-8")
+    assert text == CALC.replace("a + b", "b + a", 1).replace("return a + b", "return a - b")
+
+
+def test_apply_patches_rolls_back_when_flush_fails(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "src" / "b.py").write_text("y = 1\n", encoding="utf-8")
+    diffs = [
+        "--- a/src/a.py\n+++ b/src/a.py\n@@ -1 +1 @@\n-x = 1\n+x = 2\n",
+        "--- a/src/b.py\n+++ b/src/b.py\n@@ -1 +1 @@\n-y = 1\n+y = 2\n",
+    ]
+    real_write = applier.atomic_write
+
+    def flaky_write(path, data):
+        if path.name == "b.py":
+            raise OSError("disk full")
+        real_write(path, data)
+
+    monkeypatch.setattr(applier, "atomic_write", flaky_write)
+    res = apply_patches(diffs, root=tmp_path, dry_run=False)
+
+    assert not any(r.ok for r in res)
+    assert "disk full" in res[0].reasons[-1]
+    assert (tmp_path / "src" / "a.py").read_text(encoding="utf-8") == "x = 1\n"
+
+
+def test_diff_without_hunks_is_rejected_not_applied_as_a_no_op(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "x.py").write_text("old\n", encoding="utf-8")
+    (res,) = apply_patches(["--- a/src/x.py\n+++ b/src/x.py\n-old\n+new\n"], dry_run=False)
+    assert not res.ok and res.reasons == ["no hunks in src/x.py"]
+    assert (tmp_path / "src" / "x.py").read_text(encoding="utf-8") == "old\n"
@@ -0,0 +1,100 @@
+from pathlib import Path
+
+import pytest
+
+from mechanic.tools import pytest_shards, pytest_tool
+
+
+def test_plan_balances_by_duration_and_keeps_collection_order():
+    ids = [f"t{i}" for i in range(6)]
+    plan = pytest_shards.plan_shards(ids, [5.0, 1.0, 1.0, 4.0, 2.0, 2.0], 2)
+    assert plan == [(["t0", "t2", "t5"], 8.0), (["t1", "t3", "t4"], 7.0)]
+    assert pytest_shards.plan_shards(ids[:1], [1.0], 4) == [(["t0"], 1.0)]
+
+
+def test_sharded_run_merges_results_and_handles_flaky_and_crashing_tests(
+    tmp_path: Path, monkeypatch
+):
+    monkeypatch.setattr(pytest_shards, "MIN_SHARD_TESTS", 2)
+    (tmp_path / "test_many.py").write_text(
+        "import pytest\n\n\n"
+        "@pytest.mark.parametrize('n', range(10))\n"
+        "def test_n(n):\n"
+        "    assert n >= 0\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "test_odd.py").write_text(
+        "import os\n"
+        "from pathlib import Path\n\n\n"
+        "def test_flaky():\n"
+        "    marker = Path(__file__).with_name('ran-once')\n"
+        "    if not marker.exists():\n"
+        "        marker.touch()\n"
+        "        assert False\n\n\n"
+        "def test_crash():\n"
+        "    os._exit(3)\n\n\n"
+        "def test_after_crash():\n"
+        "    pass\n\n\n"
+        "def test_broken():\n"
+        "    assert 1 == 2\n",
+        encoding="utf-8",
+    )
+    res = pytest_tool.run(tmp_path, shards=2)
+
+    assert res["shards"]["count"] == 2 and sum(res["shards"]["tests"]) == 14
+    assert res["shards"]["crashed"] == ["test_odd.py::test_crash"]
+    assert res["flaky"] == ["test_odd.py::test_flaky"]
+    # The shard's own exit status survives the merge: os._exit(3) reads as an internal error.
+    assert res["code"] == 3 and res["counts"] == {"passed": 11, "failed": 2, "error": 1}
+    assert [t["nodeid"] for t in res["tests"]][-4:] == [
+        "test_odd.py::test_flaky",
+        "test_odd.py::test_crash",
+        "test_odd.py::test_after_crash",
+        "test_odd.py::test_broken",
+    ]
+    assert {f["nodeid"]: (f["when"], f.get("flaky")) for f in res["failures"]} == {
+        "test_odd.py::test_flaky": ("call", True),
+        "test_odd.py::test_crash": ("crash", None),
+        "test_odd.py::test_broken": ("call", None),
+    }
+    store = pytest_shards.DurationStore.load(tmp_path)
+    assert "test_many.py::test_n[3]" in store.tests and "test_odd.py::test_crash" not in store.tests
+
+
+def test_merged_code_keeps_the_worst_abnormal_status():
+    failed = [{"nodeid": "t", "outcome": "failed"}]
+    assert pytest_shards.merge_codes([0, 1], failed) == 1
+    assert pytest_shards.merge_codes([0, 0], []) == 5
+    assert pytest_shards.merge_codes([1, 2, 4], failed) == 4
+    assert pytest_shards.merge_codes([3, -9, None], failed) == -9
+
+
+def test_small_or_uncollectable_suites_run_serially(tmp_path: Path):
+    (tmp_path / "test_bad.py").write_text("import does_not_exist\n", encoding="utf-8")
+    res = pytest_tool.run(tmp_path, ["-p", "no:cacheprovider"], shards=4)
+    assert "shards" not in res and res["failures"][0]["when"] == "collect"
+
+
+def test_per_shard_coverage_is_combined_for_the_impact_index(tmp_path: Path, monkeypatch):
+    pytest.importorskip("pytest_cov")
+    from mechanic.impact import ImpactIndex
+
+    monkeypatch.setattr(pytest_shards, "MIN_SHARD_TESTS", 2)
+    for name in ("alpha", "beta"):
+        (tmp_path / f"{name}.py").write_text(f"def {name}():\n    return 1\n", encoding="utf-8")
+        (tmp_path / f"test_{name}.py").write_text(
+            f"import pytest\nfrom {name} import {name}\n\n\n"
+            "@pytest.mark.parametrize('n', range(3))\n"
+            f"def test_{name}(n):\n    assert {name}() == 1\n",
+            encoding="utf-8",
+        )
+    index = ImpactIndex(tmp_path)
+    res = pytest_tool.run(tmp_path, index.pytest_args(), shards=2)
+    assert res["code"] == 0 and res["shards"]["count"] == 2
+    index.update(t["nodeid"] for t in res["tests"])
+    assert index.impacted({"beta.py"}) == {f"test_beta.py::test_beta[{n}]" for n in range(3)}
+    assert sorted(p.name for p in index.state_dir.iterdir()) == [
+        ".gitignore",
+        "durations.json",
+        "impact.coveragerc",
+    ]
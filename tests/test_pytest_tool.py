@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from mechanic.tools import pytest_tool
+
+
+def test_run_returns_structured_records(tmp_path: Path):
+    (tmp_path / "test_things.py").write_text(
+        "import pytest\n\n\n"
+        "@pytest.fixture\n"
+        "def broken():\n"
+        "    raise RuntimeError('boom')\n\n\n"
+        "def test_ok():\n"
+        "    assert True\n\n\n"
+        "def test_div():\n"
+        "    assert 1 / 0\n\n\n"
+        "def test_setup(broken):\n"
+        "    pass\n",
+        encoding="utf-8",
+    )
+    res = pytest_tool.run(tmp_path, extra_args=["-p", "no:cacheprovider"])
+
+    assert res["code"] == 1
+    assert res["counts"] == {"passed": 1, "failed": 1, "error": 1}
+    by_id = {t["nodeid"]: t for t in res["tests"]}
+    div = by_id["test_things.py::test_div"]
+    assert div["exc_type"] == "ZeroDivisionError"
+    assert div["file"] == "test_things.py" and div["line"] == 14
+    assert by_id["test_things.py::test_setup"]["when"] == "setup"
+    assert {f["nodeid"] for f in res["failures"]} == {
+        "test_things.py::test_div",
+        "test_things.py::test_setup",
+    }
+
+
+def test_collection_errors_are_reported(tmp_path: Path):
+    (tmp_path / "test_bad.py").write_text("import does_not_exist\n", encoding="utf-8")
+    res = pytest_tool.run(tmp_path, extra_args=["-p", "no:cacheprovider"])
+
+    assert res["failures"][0]["nodeid"] == "test_bad.py"
+    assert res["failures"][0]["when"] == "collect"
+    assert "does_not_exist" in res["failures"][0]["msg"]
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from mechanic.tools import pytest_tool
+from mechanic.tools.pytest_worker import PytestWorker
+
+
+def _make_target(root: Path) -> None:
+    (root / "mod.py").write_text("def value():\n    return 1\n", encoding="utf-8")
+    (root / "test_mod.py").write_text(
+        "from mod import value\n\n\ndef test_value():\n    assert value() == 2\n",
+        encoding="utf-8",
+    )
+
+
+def test_worker_reuses_process_and_sees_source_changes(tmp_path: Path):
+    _make_target(tmp_path)
+    worker = PytestWorker(tmp_path)
+    try:
+        first = worker.run(["-q", "-p", "no:cacheprovider"])
+        pid = worker._proc.pid
+        assert first["code"] == 1
+
+        (tmp_path / "mod.py").write_text("def value():\n    return 2\n", encoding="utf-8")
+        second = worker.run(["-q", "-p", "no:cacheprovider"])
+        assert second["code"] == 0
+        assert worker._proc.pid == pid
+    finally:
+        worker.close()
+
+
+def test_warm_run_parses_failures(tmp_path: Path):
+    _make_target(tmp_path)
+    res = pytest_tool.run(tmp_path, extra_args=["-p", "no:cacheprovider"], warm=True)
+    assert res["code"] == 1
+    assert any(f["file"] == "test_mod.py" for f in res["failures"])
+
+
+def test_hung_worker_is_killed_and_replaced_and_output_streams(tmp_path: Path):
+    (tmp_path / "test_hang.py").write_text(
+        "import os, time\n\n\n"
+        "def test_hang():\n"
+        "    if not os.path.exists('hung'):\n"
+        "        open('hung', 'w').close()\n"
+        "        time.sleep(60)\n\n\n"
+        "def test_pdb():\n"
+        "    breakpoint()\n",
+        encoding="utf-8",
+    )
+    worker = PytestWorker(tmp_path)
+    try:
+        hung = worker.run(["-p", "no:cacheprovider", "test_hang.py::test_hang"], timeout=2)
+        assert hung["timed_out"] == "wall" and hung["code"] == -1 and worker._proc is None
+
+        # A fresh worker; breakpoint() with capture off reads EOF rather than blocking.
+        lines: list[str] = []
+        res = worker.run(["-p", "no:cacheprovider", "-s"], on_line=lambda _, ln: lines.append(ln))
+        assert res["code"] in (0, 1) and res["timed_out"] is None
+        assert any("passed" in line for line in lines) and "passed" in res["out"]
+    finally:
+        worker.close()
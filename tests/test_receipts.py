@@ -1,5 +1,9 @@
+import json
+import time
 from pathlib import Path
 
+import pytest
+
 from mechanic.receipts import ReceiptRun
 
 
@@ -16,3 +20,98 @@ def test_receipts_run_creates_files(tmp_path: Path, monkeypatch):
     data = run.steps_path.read_text(encoding="utf-8").strip().splitlines()
     assert any('"type": "meta"' in line for line in data)
     assert any('"type": "event"' in line for line in data)
+
+
+def test_events_are_buffered_until_a_checkpoint(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run = ReceiptRun.start_run(meta={"test": True}, durability="none")
+    run.flush_interval = 3600
+    for i in range(3):
+        assert run.log_event({"type": "event", "i": i})
+    assert len(run.steps_path.read_text(encoding="utf-8").splitlines()) == 1  # meta only
+
+    assert run.write_summary(title="Test Run", lines=["OK"])
+    assert len(run.steps_path.read_text(encoding="utf-8").splitlines()) == 4
+    run.log_event({"type": "event", "i": 3})
+    assert run.close()
+    assert len(run.steps_path.read_text(encoding="utf-8").splitlines()) == 5
+
+
+def test_buffered_events_are_flushed_on_time_without_further_logging(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run = ReceiptRun.start_run(meta={"test": True}, durability="none")
+    run.flush_interval = 0.2
+    run.log_event({"type": "event"})
+    assert len(run.steps_path.read_text(encoding="utf-8").splitlines()) == 1
+    deadline = time.monotonic() + 5
+    while len(run.steps_path.read_text(encoding="utf-8").splitlines()) < 2:
+        assert time.monotonic() < deadline, "buffered event was never flushed"
+        time.sleep(0.02)
+    assert run._timer is None
+    assert run.close()
+
+
+def test_size_threshold_and_flush_mode_write_through(tmp_path: Path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    run = ReceiptRun.start_run(durability="none")
+    run.flush_bytes, run.flush_interval = 100, 3600
+    run.log_event({"type": "event", "pad": "x" * 200})
+    assert run.steps_path.read_text(encoding="utf-8").count("\n") == 1
+    run.close()
+
+    (tmp_path / "live").mkdir()
+    monkeypatch.chdir(tmp_path / "live")
+    live = ReceiptRun.start_run(durability="flush")
+    live.log_event({"type": "event"})
+    assert live.steps_path.read_text(encoding="utf-8").count("\n") == 1
+    live.close()
+
+
+def test_html_streams_diff_fragments_and_is_cached(tmp_path: Path, monkeypatch):
+    from mechanic.ui.receipts_html import build_html
+
+    monkeypatch.chdir(tmp_path)
+    run = ReceiptRun.start_run(meta={"test": True})
+    diff = (
+        "--- a/src/a.py\n+++ b/src/a.py\n@@ -1 +1 @@\n-a = 1\n+a = <2>\n"
+        "--- a/src/b.py\n+++ b/src/b.py\n@@ -1 +1 @@\n-b = 1\n+b = 2\n"
+    )
+    run.log_event({"type": "pytest", "phase": "before", "code": 1})
+    run.log_event({"type": "patch", "diff": diff})
+    run.log_event({"type": "patch", "diff": diff})
+    run.write_summary(title="Test Run", lines=["OK"])
+    run.close()
+
+    html = build_html(run.run_dir)
+    page = html.read_text(encoding="utf-8")
+    assert page.count("<details>") == 4 and "src/b.py +1 -1" in page
+    fragments = sorted((run.run_dir / "fragments").iterdir())
+    assert len(fragments) == 2  # identical diffs share fragments
+    assert "a = &lt;2&gt;" in fragments[0].read_text(encoding="utf-8")
+    assert "b = 2" not in fragments[0].read_text(encoding="utf-8")
+
+    mtime = html.stat().st_mtime_ns
+    assert build_html(run.run_dir).stat().st_mtime_ns == mtime
+    run.summary_path.write_text("# Changed\n", encoding="utf-8")
+    assert "Changed" in build_html(run.run_dir).read_text(encoding="utf-8")
+
+
+def test_a_run_that_raises_still_closes_its_receipts(tmp_path: Path, monkeypatch):
+    from mechanic.cli import run_core
+    from mechanic.daemon import RUN_OPTIONS
+    from mechanic.tools import pytest_tool
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    closed = []
+    close = ReceiptRun.close
+    monkeypatch.setattr(ReceiptRun, "close", lambda self: closed.append(self) or close(self))
+    monkeypatch.setattr(pytest_tool, "run", boom)
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(RuntimeError, match="boom"):
+        run_core(**{**RUN_OPTIONS, "path": str(tmp_path)})
+    (run,) = closed
+    assert run._f is None and run.catalog is None
+    events = [json.loads(line)["type"] for line in run.steps_path.open(encoding="utf-8")]
+    assert events == ["meta", "start", "plan"]
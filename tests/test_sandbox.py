@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import pytest
+
+from mechanic.applier import atomic_write
+from mechanic.sandbox import Sandbox
+
+
+def _tree(root: Path) -> None:
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (root / "pkg" / "b.py").write_text("b = 1\n", encoding="utf-8")
+    (root / ".git").mkdir()
+    (root / ".git" / "HEAD").write_text("ref\n", encoding="utf-8")
+
+
+def test_within_rejects_sibling_with_common_prefix(tmp_path: Path):
+    box = Sandbox.from_path(tmp_path / "repo")
+    with pytest.raises(PermissionError):
+        box.within("../repo-other/x.py")
+
+
+def test_scratch_tracks_changes_and_syncs_back_only_those(tmp_path: Path):
+    origin = tmp_path / "repo"
+    _tree(origin)
+    box = Sandbox.from_path(origin).scratch(at="sub/repo", dir=tmp_path)
+    try:
+        assert box.root == box.base / "sub" / "repo"
+        assert box.mode in {"reflink", "hardlink", "copy"}
+        assert not (box.root / ".git").exists()
+        assert box.changed_files() == []
+
+        atomic_write(box.root / "pkg" / "a.py", "a = 2\n")
+        (box.root / "pkg" / "b.py").unlink()
+        (box.root / "pkg" / "c.py").write_text("c = 1\n", encoding="utf-8")
+        own = box.own("pkg/c.py")
+        assert own.stat().st_nlink == 1
+        assert box.changed_files() == ["pkg/a.py", "pkg/b.py", "pkg/c.py"]
+        assert (origin / "pkg" / "a.py").read_text(encoding="utf-8") == "a = 1\n"
+
+        assert box.sync_back(["pkg/a.py"]) == ["pkg/a.py"]
+        assert (origin / "pkg" / "a.py").read_text(encoding="utf-8") == "a = 2\n"
+        assert (origin / "pkg" / "b.py").exists()
+    finally:
+        box.cleanup()
+    assert not box.base.exists()
+
+
+def test_in_place_writes_in_a_scratch_copy_never_reach_the_origin(tmp_path: Path):
+    origin = tmp_path / "repo"
+    _tree(origin)
+    box = Sandbox.from_path(origin).scratch(dir=tmp_path)
+    try:
+        assert box.mode in {"reflink", "copy"}
+        with (box.root / "pkg" / "a.py").open("a", encoding="utf-8") as f:
+            f.write("x = 2\n")
+        assert (origin / "pkg" / "a.py").read_text(encoding="utf-8") == "a = 1\n"
+        assert box.changed_files() == ["pkg/a.py"]
+    finally:
+        box.cleanup()
+
+
+def test_own_breaks_hardlinks_before_in_place_writes(tmp_path: Path):
+    origin = tmp_path / "repo"
+    _tree(origin)
+    box = Sandbox.from_path(origin).scratch(dir=tmp_path, hardlinks=True)
+    try:
+        with box.own("pkg/a.py").open("a", encoding="utf-8") as f:
+            f.write("x = 2\n")
+        assert (origin / "pkg" / "a.py").read_text(encoding="utf-8") == "a = 1\n"
+        assert box.changed_files() == ["pkg/a.py"]
+    finally:
+        box.cleanup()
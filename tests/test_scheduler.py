@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from mechanic.scheduler import Stage, run_stages
+
+
+def test_independent_stages_overlap_and_results_keep_declaration_order():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(value):
+        def fn():
+            barrier.wait()  # deadlocks (and times out) unless both run at once
+            return value
+
+        return fn
+
+    res = run_stages([Stage("slow", meet(1)), Stage("fast", meet(2))])
+    assert list(res) == ["slow", "fast"]
+    assert res == {"slow": 1, "fast": 2}
+
+
+def test_dependent_stage_waits_for_its_dependencies():
+    order: list[str] = []
+
+    def step(name, delay=0.0):
+        def fn():
+            time.sleep(delay)
+            order.append(name)
+            return name
+
+        return fn
+
+    run_stages(
+        [
+            Stage("patch", step("patch"), after=("before",)),
+            Stage("before", step("before", 0.05)),
+        ]
+    )
+    assert order == ["before", "patch"]
+
+
+def test_stage_errors_propagate_and_skip_dependents():
+    ran: list[str] = []
+
+    def boom():
+        raise RuntimeError("tool crashed")
+
+    with pytest.raises(RuntimeError, match="tool crashed"):
+        run_stages([Stage("a", boom), Stage("b", lambda: ran.append("b"), after=("a",))])
+    assert ran == []
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        run_stages([Stage("a", lambda: None, after=("missing",))])
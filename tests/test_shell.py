@@ -0,0 +1,78 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from mechanic.tools.shell import run
+
+
+def _py(code: str) -> list[str]:
+    return [sys.executable, "-c", code]
+
+
+def test_run_streams_lines_and_reports_duration():
+    seen: list[tuple[str, str]] = []
+    res = run(
+        _py("import sys; print('a'); print('b', file=sys.stderr)"),
+        on_line=lambda stream, line: seen.append((stream, line)),
+    )
+    assert res["code"] == 0
+    assert res["out"].strip() == "a"
+    assert sorted(seen) == [("err", "b"), ("out", "a")]
+    assert res["duration"] > 0
+    if os.name != "nt":
+        assert res["peak_rss"] and res["peak_rss"] > 0
+
+
+def test_run_keeps_head_and_tail_and_spills_full_output(tmp_path: Path):
+    code = "for i in range(2000): print(f'line{i:05d}')"
+    res = run(_py(code), head_bytes=100, tail_bytes=100, spill_dir=tmp_path)
+    assert res["out"].startswith("line00000")
+    assert res["out"].rstrip().endswith("line01999")
+    assert "bytes truncated" in res["out"]
+    assert len(res["out"]) < 400
+    full = Path(res["out_file"]).read_text()
+    assert full.splitlines() == [f"line{i:05d}" for i in range(2000)]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="process groups are POSIX-specific here")
+def test_wall_timeout_kills_process_group(tmp_path: Path):
+    marker = tmp_path / "child.pid"
+    code = (
+        "import subprocess, sys, time;"
+        "p = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']);"
+        f"open({str(marker)!r}, 'w').write(str(p.pid));"
+        "time.sleep(60)"
+    )
+    start = time.monotonic()
+    res = run(_py(code), timeout=1)
+    assert time.monotonic() - start < 10
+    assert res["timed_out"] == "wall"
+    assert res["code"] == -1
+    child = int(marker.read_text())
+    time.sleep(0.2)
+    assert not _alive(child)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    stat = Path(f"/proc/{pid}/stat")
+    # An orphaned zombie still answers kill(0) until init reaps it.
+    return not (stat.exists() and stat.read_text().split(")")[-1].split()[0] == "Z")
+
+
+def test_idle_timeout_triggers_without_output():
+    res = run(_py("import time; print('hi', flush=True); time.sleep(60)"), idle_timeout=0.5)
+    assert res["timed_out"] == "idle"
+    assert "hi" in res["out"]
+
+
+def test_missing_executable_reports_error():
+    res = run(["definitely-not-a-real-binary-xyz"])
+    assert res["code"] == -1
+    assert res["err"]
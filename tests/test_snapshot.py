@@ -0,0 +1,90 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from mechanic.snapshot import Snapshot, bisect_culprits
+
+
+def _git(root: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=root, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.mark.parametrize("use_git", [True, False])
+def test_restore_puts_back_only_snapshotted_files(tmp_path: Path, use_git: bool):
+    if use_git:
+        if shutil.which("git") is None:
+            pytest.skip("git not installed")
+        _git(tmp_path, "init", "-q")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (tmp_path / "other.py").write_text("o = 1\n", encoding="utf-8")
+
+    snap = Snapshot.take(tmp_path, ["pkg/a.py", "pkg/new.py"], use_git=use_git)
+    assert (snap.tree is not None) is use_git
+    (tmp_path / "pkg" / "a.py").write_text("a = 2\n", encoding="utf-8")
+    (tmp_path / "pkg" / "new.py").write_text("n = 1\n", encoding="utf-8")
+    (tmp_path / "other.py").write_text("o = 2\n", encoding="utf-8")
+
+    assert snap.restore() == ["pkg/a.py", "pkg/new.py"]
+    assert (tmp_path / "pkg" / "a.py").read_text(encoding="utf-8") == "a = 1\n"
+    assert not (tmp_path / "pkg" / "new.py").exists()
+    assert (tmp_path / "other.py").read_text(encoding="utf-8") == "o = 2\n"
+    if use_git:
+        assert _git(tmp_path, "status", "--porcelain") == "?? other.py\n?? pkg/"
+
+
+def test_bisect_finds_independent_culprits():
+    calls: list[list[int]] = []
+
+    def is_bad(subset: list[int]) -> bool:
+        calls.append(subset)
+        return bool({2, 6} & set(subset))
+
+    assert bisect_culprits(range(8), is_bad) == [2, 6]
+    assert len(calls) < 14
+
+
+def test_bisect_returns_group_that_only_fails_together():
+    assert bisect_culprits([0, 1, 2, 3], lambda s: {1, 2} <= set(s)) == [0, 1, 2, 3]
+    assert bisect_culprits([0, 1], lambda s: {0, 1} <= set(s)) == [0, 1]
+
+
+def test_revert_restores_culprit_files_outside_the_target(tmp_path: Path, monkeypatch):
+    from mechanic import planner
+    from mechanic.cli import run_core
+    from mechanic.daemon import RUN_OPTIONS
+    from mechanic.diffmodel import parse_patch
+
+    monkeypatch.chdir(tmp_path)
+    app = tmp_path / "fixtures" / "app"
+    app.mkdir(parents=True)
+    (tmp_path / "src").mkdir()
+    shared = tmp_path / "src" / "shared.txt"
+    shared.write_text("ok\n", encoding="utf-8")
+    (app / "note.txt").write_text("a\n", encoding="utf-8")
+    (app / "test_app.py").write_text(
+        "from pathlib import Path\n\n\ndef test_shared():\n"
+        "    assert (Path(__file__).parents[2] / 'src' / 'shared.txt').read_text() == 'ok\\n'\n",
+        encoding="utf-8",
+    )
+    diffs = [
+        "--- a/src/shared.txt\n+++ b/src/shared.txt\n@@ -1 +1 @@\n-ok\n+broken\n",
+        "--- a/fixtures/app/note.txt\n+++ b/fixtures/app/note.txt\n@@ -1 +1 @@\n-a\n+b\n",
+    ]
+    monkeypatch.setattr(
+        planner, "suggest_minimal_fixes", lambda target, failures: [parse_patch(d) for d in diffs]
+    )
+    options = {"fix_tests": True, "dry_run": False, "evaluate": False, "full_verify": True}
+    run_dir = run_core(**{**RUN_OPTIONS, "path": str(app), **options})
+
+    assert shared.read_text(encoding="utf-8") == "ok\n"
+    assert (app / "note.txt").read_text(encoding="utf-8") == "b\n"
+    events = [json.loads(line) for line in (run_dir / "steps.jsonl").open(encoding="utf-8")]
+    (revert,) = [e for e in events if e["type"] == "revert"]
+    assert revert["culprits"] == [0] and revert["restored"] == ["src/shared.txt"]
+    assert revert["failures"] == []
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.harness import STARTUP_BUDGET_MS, cli_import_ms
+
+# Subsystems only the commands that need them may import.
+LAZY = (
+    "markdown_it",
+    "rich",
+    "sqlite3",
+    "mechanic.evaluate",
+    "mechanic.planner",
+    "mechanic.receipts",
+    "mechanic.tools",
+    "mechanic.ui",
+)
+
+
+def test_cli_import_leaves_subsystems_unloaded():
+    code = "import sys, mechanic.cli; print('\\n'.join(sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    loaded = [m for m in out.stdout.split() if m.split(".")[0] in LAZY or m.startswith(LAZY)]
+    assert loaded == []
+
+
+def test_cli_import_time_within_budget(tmp_path):
+    env = {**os.environ, "PYTHONPYCACHEPREFIX": str(tmp_path)}
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    cli_import_ms(env)  # write bytecode first: the budget is for a warm-disk cold start
+    own = min(cli_import_ms(env)[1] for _ in range(3))
+    assert own <= STARTUP_BUDGET_MS, f"mechanic.cli imports cost {own:.1f} ms beyond typer"
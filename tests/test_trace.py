@@ -0,0 +1,70 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from mechanic import trace
+from mechanic.scheduler import Stage, run_stages
+from mechanic.tools.shell import run
+
+
+def test_disabled_tracing_is_a_shared_noop():
+    assert trace.disable() is None
+    a, b = trace.span("x"), trace.span("y", "tool", argv=[1])
+    assert a is b
+    with a as sp:
+        sp.set(code=0)
+    fn = lambda: 1  # noqa: E731
+    assert trace.bind(fn) is fn
+
+
+def test_spans_nest_across_stage_threads_and_record_tools(tmp_path: Path):
+    tracer = trace.enable()
+    try:
+        with trace.span("outer"):
+            run_stages(
+                [
+                    Stage("a", lambda: run([sys.executable, "-c", "pass"])),
+                    Stage("b", lambda: 2),
+                ]
+            )
+    finally:
+        assert trace.disable() is tracer
+    by_name = {s.name: s for s in tracer.spans}
+    outer, a, tool = by_name["outer"], by_name["a"], by_name[Path(sys.executable).name]
+    assert by_name["b"].parent == a.parent == outer.id and tool.parent == a.id
+    assert outer.start <= a.start <= tool.start <= tool.end <= a.end <= outer.end
+    assert tool.args["code"] == 0 and tool.cat == "tool"
+
+    chrome = json.loads(trace.write(tracer.spans, tmp_path / "t.json").read_text())
+    assert {e["name"] for e in chrome["traceEvents"]} >= {"outer", "a", "b"}
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in chrome["traceEvents"])
+
+    scope = trace.to_speedscope(tracer.spans)
+    for profile in scope["profiles"]:
+        depth = 0
+        for ev in profile["events"]:
+            depth += 1 if ev["type"] == "O" else -1
+            assert depth >= 0
+        assert depth == 0
+
+    table = trace.summary_table(tracer.spans)
+    assert table.splitlines()[0].startswith("| Span |") and "| outer | stage | 1 |" in table
+    events = [{"type": "trace", "spans": [s.to_dict() for s in tracer.spans]}]
+    assert [s.name for s in trace.spans_from_events(events)] == [s.name for s in tracer.spans]
+
+
+def test_a_traced_run_that_raises_disables_its_tracer(tmp_path: Path, monkeypatch):
+    from mechanic.cli import run_core
+    from mechanic.daemon import RUN_OPTIONS
+    from mechanic.tools import pytest_tool
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(pytest_tool, "run", boom)
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(RuntimeError, match="boom"):
+        run_core(**{**RUN_OPTIONS, "path": str(tmp_path), "with_trace": True})
+    assert trace.disable() is None
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+from mechanic.ui.runs import RunCache, StepsIndex, window
+
+
+def _write(path: Path, events: list[dict]) -> None:
+    with path.open("a", encoding="utf-8") as f:
+        for ev in events:
+            f.write(json.dumps(ev) + "\n")
+
+
+def test_index_finds_patches_and_follows_appends(tmp_path: Path):
+    steps = tmp_path / "steps.jsonl"
+    _write(steps, [{"type": "meta"}, {"type": "patch", "diff": "one"}, {"ok": 1, "type": "patch"}])
+    index = StepsIndex(steps)
+    index.refresh()
+    assert len(index) == 2 and index.events == 3
+    assert index.diff(0, tmp_path) == "one"
+
+    with steps.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"type": "patch", "diff": "two"}) + "\n" + '{"type": "pa')
+    index.refresh()
+    assert len(index) == 3 and index.diff(2, tmp_path) == "two"
+
+
+def test_cache_evicts_lru_and_reloads_changed_runs(tmp_path: Path):
+    runs = []
+    for name in ("a", "b", "c"):
+        run = tmp_path / name
+        run.mkdir()
+        _write(run / "steps.jsonl", [{"type": "patch", "diff": name}])
+        runs.append(run)
+    cache = RunCache(maxsize=2)
+    first = cache.get(runs[0])
+    assert cache.get(runs[0]) is first
+    cache.get(runs[1])
+    cache.get(runs[2])
+    assert len(cache) == 2 and cache.get(runs[0]) is not first
+
+    _write(runs[0] / "steps.jsonl", [{"type": "patch", "diff": "again"}])
+    assert len(cache.get(runs[0]).index) == 2
+    (runs[0] / "summary.md").write_text("# Done\n", encoding="utf-8")
+    assert cache.get(runs[0]).summary == "# Done\n"
+
+
+def test_window_stays_within_bounds():
+    assert window(10, 3, 50) == (0, 10)
+    assert window(1000, 0, 100) == (0, 100)
+    assert window(1000, 500, 100) == (450, 550)
+    assert window(1000, 999, 100) == (900, 1000)